@@ -3,18 +3,12 @@ FaceRunner CLI - Automate Ollama and Open WebUI setup for Hugging Face models.
 """
 
 import click
-import docker
-import requests
-import socket
-import platform
 import subprocess
 import sys
-import json
 import os
 import time
 import re
 import itertools
-import threading
 from pathlib import Path
 
 WEBUI_IMAGE = "ghcr.io/open-webui/open-webui:main"
@@ -26,18 +20,16 @@ WEBUI_PORT = 8080
 STREAMLIT_PORT = 8501
 
 def get_host_ip():
-    """Get the host's IP address."""
+    """Get the host's IP address (from the saved hardware inventory)."""
+    from facerunner.hardware_utils import get_primary_ip
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        return get_primary_ip()
     except Exception:
         return "127.0.0.1"
 
 def get_os():
     """Get the operating system."""
+    import platform
     return platform.system().lower()
 
 def configure_firewall_linux():
@@ -70,6 +62,7 @@ def configure_firewall_macos():
 
 def check_webui_running():
     """Check if FaceRunner web UI is already running on port 8501."""
+    import socket
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         result = sock.connect_ex(('localhost', STREAMLIT_PORT))
@@ -78,12 +71,38 @@ def check_webui_running():
     except Exception:
         return False
 
+def port_bound(port):
+    """
+    Return True if something listens on a local TCP port. Checked by binding it, since
+    a connection to a socket-activated port would start its service.
+    """
+    import socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("0.0.0.0", port))
+        return False
+    except OSError:
+        return True
+    finally:
+        sock.close()
+
+def wait_for_ports(ports, bound, timeout=10, process=None):
+    """Wait until every port is bound (or every port is free); return the ports that are not, if any."""
+    deadline = time.monotonic() + timeout
+    while True:
+        pending = [port for port in ports if port_bound(port) != bound]
+        if not pending or time.monotonic() >= deadline or (process and process.poll() is not None):
+            return pending
+        time.sleep(0.2)
+
 def kill_existing_webui():
     """Kill any existing FaceRunner web UI processes."""
     try:
-        if platform.system().lower() == 'windows':
+        if get_os() == 'windows':
             subprocess.run(["taskkill", "/f", "/im", "streamlit.exe"], capture_output=True)
         else:
+            subprocess.run(["pkill", "-f", "streamlit.*main.py"], capture_output=True)
             subprocess.run(["pkill", "-f", "streamlit.*webui.py"], capture_output=True)
         time.sleep(1)
         return True
@@ -161,10 +180,14 @@ def wait_for_containers_removal(patterns, max_wait=10):
 
 def launch_webui_background():
     """Launch FaceRunner web UI in the background."""
+    from facerunner.profile_utils import span
     try:
-        if check_webui_running():
+        with span("check web UI port", "detection"):
+            running = check_webui_running()
+        if running:
             click.echo("🔄 Existing web UI found. Terminating...")
-            kill_existing_webui()
+            with span("stop existing web UI", "launch"):
+                kill_existing_webui()
             click.echo("✅ Existing web UI terminated.")
 
         click.echo("🚀 Launching FaceRunner web UI in background...")
@@ -172,15 +195,21 @@ def launch_webui_background():
         log_path = os.path.expanduser("~/.facerunner/logs/facerunner.log")
         os.makedirs(os.path.dirname(log_path), exist_ok=True)
         log_file = open(log_path, "a")
-        process = subprocess.Popen([
-            "streamlit", "run", "src/main.py",
-            "--server.address", "0.0.0.0",
-            "--server.port", str(STREAMLIT_PORT),
-            "--server.headless", "true"
-        ], stdout=log_file, stderr=log_file)
-
-        time.sleep(2)
-        if check_webui_running():
+        with span("launch web UI", "launch"):
+            process = subprocess.Popen([
+                "streamlit", "run", "src/main.py",
+                "--server.address", "0.0.0.0",
+                "--server.port", str(STREAMLIT_PORT),
+                "--server.headless", "true"
+            ], stdout=log_file, stderr=log_file)
+
+        with span("wait for web UI", "readiness"):
+            deadline = time.monotonic() + 10
+            running = check_webui_running()
+            while not running and process.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.2)
+                running = check_webui_running()
+        if running:
             click.echo("✅ FaceRunner web UI launched successfully!")
             click.echo(f"🌐 Web UI available at: http://localhost:{STREAMLIT_PORT}")
             return True
@@ -192,89 +221,125 @@ def launch_webui_background():
         return False
 
 @click.group()
-def cli():
+@click.option('--profile', is_flag=True, envvar='FACERUNNER_PROFILE',
+              help='Time each phase and write a Chrome trace to ~/.facerunner/traces/ (env FACERUNNER_PROFILE=1).')
+@click.option('--cprofile', is_flag=True, envvar='FACERUNNER_CPROFILE',
+              help='With --profile, also write a cProfile dump next to the trace (env FACERUNNER_CPROFILE=1).')
+@click.pass_context
+def cli(ctx, profile, cprofile):
     """FaceRunner CLI for managing Ollama and Open WebUI."""
-    pass
+    if profile or cprofile:
+        from facerunner.profile_utils import start_profiling
+        # Background services and helper processes this command launches are not profiled
+        os.environ.pop("FACERUNNER_PROFILE", None)
+        os.environ.pop("FACERUNNER_CPROFILE", None)
+        start_profiling(ctx.invoked_subcommand or "facerunner", with_cprofile=cprofile)
+        ctx.call_on_close(echo_profile_summary)
+
+def echo_profile_summary():
+    """Write the trace and print per-span and per-phase timings (to stderr, so piped output stays clean)."""
+    from facerunner.profile_utils import stop_profiling
+    profiler = stop_profiling()
+    if profiler is None:
+        return
+    trace_path, prof_path, wall, cpu = profiler.finish()
+    spans, phases = profiler.summary()
+    click.echo(f"\n⏱️  Profile: {profiler.command} took {wall:.2f}s wall, {cpu:.2f}s CPU", err=True)
+    if spans:
+        click.echo(f"  {'Span':<32} {'Phase':<10} {'Wall (s)':>9} {'CPU (s)':>8}", err=True)
+        for name, phase, span_wall, span_cpu in spans:
+            click.echo(f"  {name[:32]:<32} {phase:<10} {span_wall:>9.3f} {span_cpu:>8.3f}", err=True)
+        click.echo(f"  {'Phase':<32} {'Spans':<10} {'Wall (s)':>9} {'CPU (s)':>8}", err=True)
+        for phase, count, phase_wall, phase_cpu in phases:
+            click.echo(f"  {phase:<32} {count:<10} {phase_wall:>9.3f} {phase_cpu:>8.3f}", err=True)
+    click.echo(f"  Trace: {trace_path}", err=True)
+    if prof_path:
+        click.echo(f"  cProfile: {prof_path}", err=True)
 
 @cli.command()
 @click.option('--verbose', is_flag=True, help='Show detailed Docker Compose logs during setup.')
-def setup(verbose):
-    def is_ollama_running():
-        try:
-            result = subprocess.run(["pgrep", "-f", "ollama"], capture_output=True)
-            return result.returncode == 0
-        except Exception:
-            return False
+@click.option('--offline', is_flag=True, help='Install only from the setup cache (no network).')
+@click.option('--cache-dir', default=None, type=click.Path(file_okay=False),
+              help='Wheel and installer cache (default: setup_cache_dir or ~/.facerunner/cache).')
+def setup(verbose, offline, cache_dir):
+    """Install what is missing, then start Ollama, Open WebUI and the FaceRunner web UI."""
+    from facerunner.hardware_utils import refresh_inventory
+    from facerunner.setup_utils import (get_cache_dir, detect_installed, find_executable, install_ollama,
+                                        install_openwebui, run_concurrently, timed_step, url_ready)
+    started = time.perf_counter()
+    timings = []
+    cache_dir = get_cache_dir(cache_dir)
+    click.echo("🔧 Starting FaceRunner local setup...")
+    with timed_step("detect installed", "detection", timings):
+        installed = detect_installed()
+    ollama, openwebui = installed["ollama"], installed["open-webui"]
+    if ollama["path"]:
+        running = f" (v{ollama['version']}, running)" if ollama["running"] else ""
+        click.echo(f"✅ Ollama found at {ollama['path']}{running}")
+    if openwebui["path"]:
+        click.echo(f"✅ Open WebUI {openwebui['version'] or ''} found at {openwebui['path']}")
 
-    def start_ollama():
-      click.echo("🚀 Starting Ollama service on localhost...")
-      env = os.environ.copy()
-      env["OLLAMA_HOST"] = "localhost"
-      log_path = os.path.expanduser("~/.facerunner/logs/ollama.log")
-      os.makedirs(os.path.dirname(log_path), exist_ok=True)
-      log_file = open(log_path, "a")
-      proc = subprocess.Popen(["ollama", "serve"], stdout=log_file, stderr=log_file, env=env)
-      time.sleep(2)
-      return proc
-    # Check if ollama is installed
-    def is_ollama_installed():
-        return subprocess.run(["which", "ollama"], capture_output=True).returncode == 0
-
-    def install_ollama():
-        os_type = get_os()
-        if os_type == "linux":
-            click.echo("Ollama not found. Installing Ollama for Linux...")
-            result = subprocess.run("curl -fsSL https://ollama.com/install.sh | sh", shell=True)
-            if result.returncode == 0:
-                click.echo("✅ Ollama installed successfully.")
-            else:
-                click.echo("❌ Failed to install Ollama automatically. Please install manually from https://ollama.com/download.")
-        else:
-            click.echo(f"Ollama installation not automated for {os_type}. Please install manually from https://ollama.com/download.")
+    # Installs and the hardware probe do not depend on each other, so they run at the same time
+    steps = [("hardware inventory", "detection", refresh_inventory)]
+    if not ollama["path"]:
+        steps.append(("install ollama", "install", lambda: install_ollama(cache_dir, offline=offline)))
+    if not openwebui["path"]:
+        steps.append(("install open-webui", "install", lambda: install_openwebui(cache_dir, offline=offline)))
+    if len(steps) > 1:
+        names = " and ".join(name.split(" ", 1)[1] for name, _, _ in steps[1:])
+        click.echo(f"📦 Installing {names} (cache: {cache_dir}{', offline' if offline else ''})...")
+    install_failed = False
+    for name, result, error in run_concurrently(steps, timings):
+        if error is not None:
+            click.echo(f"❌ {name} failed: {error}")
+            install_failed = install_failed or name.startswith("install")
+        elif isinstance(result, str):
+            click.echo(f"✅ {result}")
+    if install_failed:
+        click.echo("Please install the missing service manually (https://ollama.com/download, pip install open-webui).")
+        echo_setup_timings(timings, started)
+        return
 
-    if not is_ollama_installed():
-        install_ollama()
-    click.echo("🔧 Starting FaceRunner local setup...")
-    def is_openwebui_installed():
-        return subprocess.run(["which", "open-webui"], capture_output=True).returncode == 0
-    def install_openwebui():
-        click.echo("🔎 Installing Open WebUI via pip...")
-        result = subprocess.run([sys.executable, "-m", "pip", "install", "open-webui"], capture_output=True, text=True)
-        if result.returncode == 0:
-            click.echo("✅ Open WebUI installed successfully.")
-            return True
+    try:
+        # Leave a healthy Ollama alone so re-running setup does not interrupt it
+        if ollama["running"]:
+            click.echo("🔄 Ollama is already running; leaving it up.")
         else:
-            click.echo(f"❌ Failed to install Open WebUI: {result.stderr}")
-            click.echo("Please install manually: pip install open-webui")
-            return False
+            click.echo("🚀 Starting Ollama service on localhost...")
+            env = os.environ.copy()
+            env["OLLAMA_HOST"] = "localhost"
+            log_path = os.path.expanduser("~/.facerunner/logs/ollama.log")
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            log_file = open(log_path, "a")
+            with timed_step("launch ollama", "launch", timings):
+                subprocess.Popen([find_executable("ollama") or "ollama", "serve"], stdout=log_file, stderr=log_file, env=env)
+            with timed_step("wait for ollama", "readiness", timings):
+                ready = url_ready(f"http://localhost:{OLLAMA_PORT}/api/version", timeout=30)
+            if not ready:
+                click.echo(f"⚠️  Ollama did not answer within 30s; see {log_path}")
+        click.echo(f"🤖 Ollama service on port {OLLAMA_PORT}")
 
-    try:
-        # Ensure Ollama service is running
-        if is_ollama_running():
-            click.echo("🔄 Ollama is already running. Restarting...")
-            subprocess.run(["pkill", "-f", "ollama"], capture_output=True)
-            time.sleep(2)
-        start_ollama()
-        click.echo(f"🤖 Ollama service started on port {OLLAMA_PORT}")
-        # Ensure Open WebUI is installed
-        if not is_openwebui_installed():
-            if not install_openwebui():
-                return
-        # Start Open WebUI locally
-        click.echo("🚀 Starting Open WebUI locally...")
-        log_path = os.path.expanduser("~/.facerunner/logs/openwebui.log")
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        log_file = open(log_path, "a")
-        webui_proc = subprocess.Popen([
-            "open-webui", "serve",
-            "--host", "0.0.0.0",
-            "--port", str(WEBUI_PORT)
-        ], stdout=log_file, stderr=log_file)
-        time.sleep(2)
+        with timed_step("check open-webui", "detection", timings):
+            webui_up = url_ready(f"http://localhost:{WEBUI_PORT}", timeout=0)
+        if webui_up:
+            click.echo("🔄 Open WebUI is already running; leaving it up.")
+        else:
+            click.echo("🚀 Starting Open WebUI locally...")
+            log_path = os.path.expanduser("~/.facerunner/logs/openwebui.log")
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            log_file = open(log_path, "a")
+            with timed_step("launch open-webui", "launch", timings):
+                subprocess.Popen([
+                    find_executable("open-webui") or "open-webui", "serve",
+                    "--host", "0.0.0.0",
+                    "--port", str(WEBUI_PORT)
+                ], stdout=log_file, stderr=log_file)
+            click.echo(f"   Open WebUI takes a minute to start the first time; its log is {log_path}")
         click.echo(f"🌐 Open WebUI (chat interface): http://localhost:{WEBUI_PORT}")
         # Start FaceRunner web UI (Streamlit)
         click.echo("🚀 Starting FaceRunner web UI locally...")
-        launch_webui_background()
+        with timed_step("launch web UI", "launch", timings):
+            launch_webui_background()
         click.echo("🎉 Setup complete!")
         click.echo("\n🔗 Access your services:")
         click.echo(f"  🤖 Ollama API:        http://localhost:{OLLAMA_PORT}")
@@ -282,65 +347,907 @@ def setup(verbose):
         click.echo(f"  🖥️ FaceRunner Web UI: http://localhost:{STREAMLIT_PORT}")
     except Exception as e:
         click.echo(f"❌ Error during local setup: {e}")
+    echo_setup_timings(timings, started)
+
+def echo_setup_timings(timings, started):
+    """Print how long each setup step took, slowest first, so regressions stand out."""
+    click.echo("\n⏱️  Setup steps:")
+    for name, seconds, ok in sorted(timings, key=lambda t: -t[1]):
+        click.echo(f"   {name:<24} {seconds:>7.2f}s {'✅' if ok else '❌'}")
+    click.echo(f"   {'total (wall)':<24} {time.perf_counter() - started:>7.2f}s")
+
+def report_admission(report):
+    """Print the result of a memory/disk admission check; return False if the model must not proceed."""
+    from facerunner.memory_utils import admission_allows
+    for name in report["evicted"]:
+        click.echo(f"♻️  Unloaded least-recently-used model {name} to free memory.")
+    for msg in report["messages"]:
+        click.echo(f"⚠️  {msg}")
+    if not admission_allows(report):
+        click.echo("❌ Refusing to continue (admission policy is 'refuse'). Use --force to override.")
+        return False
+    return True
 
 @cli.command()
 @click.argument('model')
-def pull(model):
+@click.option('--force', is_flag=True, help='Skip the memory and disk admission check.')
+@click.option('--limit', default=None, help='Cap this pull, e.g. 20M (bytes/s) or 100mbit; the global pull_bandwidth_limit still applies.')
+@click.option('--now', is_flag=True, help='Start now even outside the configured pull_windows.')
+def pull(model, force, limit, now):
     """Pull a Hugging Face model into Ollama with automatic format conversion."""
+    from facerunner.shaping_utils import shaped_pull, parse_rate, format_rate, shaping_summary
     click.echo(f"📥 Pulling model: {model}")
 
     try:
         ollama_model, conversion_msg = parse_model_name(model)
         if conversion_msg:
             click.echo(f"🤖 {conversion_msg}")
-        click.echo("� Executing pull command in local Ollama...")
-        result = subprocess.run([
-            "ollama", "pull", ollama_model
-        ], capture_output=True, text=True)
-        if result.returncode == 0:
-            click.echo(f"✅ Model {ollama_model} pulled successfully!")
-            if conversion_msg and "Converted" in conversion_msg:
-                click.echo(f"📝 {conversion_msg}")
-        else:
-            click.echo(f"❌ Error pulling model: {result.stderr}")
+        rate_limit = parse_rate(limit)
+        if not force:
+            from facerunner.memory_utils import check_admission
+            if not report_admission(check_admission(ollama_model, for_pull=True)):
+                return
+        shaping = shaping_summary()
+        if shaping or rate_limit:
+            click.echo(f"🚦 Pull shaping: {shaping or ''}{', ' if shaping and rate_limit else ''}"
+                       f"{f'limit {format_rate(rate_limit)}' if rate_limit else ''}")
+        gb = 1024 ** 3
+
+        def show(stats):
+            line = f"   {stats.status[:48]:<48}"
+            if stats.total:
+                line += f" {stats.completed / gb:.2f}/{stats.total / gb:.2f} GB"
+            line += f" · {format_rate(stats.rate())}"
+            sys.stdout.write(f"\r{line}\033[K")
+            sys.stdout.flush()
+
+        stats = shaped_pull(ollama_model, limit=rate_limit, ignore_window=now, progress=show)
+        click.echo("")
+        click.echo(f"✅ Model {ollama_model} pulled successfully! "
+                   f"({format_rate(stats.rate())} effective, paused {stats.paused / 60:.1f} min)")
+        if conversion_msg and "Converted" in conversion_msg:
+            click.echo(f"📝 {conversion_msg}")
     except Exception as e:
+        click.echo("")
         click.echo(f"❌ Error during model pull: {e}")
 
+def prefetch_to_page_cache(model, workers, method):
+    """Prefetch a model's blobs into the page cache and report how much of it is now resident."""
+    from facerunner.prefetch_utils import prefetch_model, resident_fraction
+    gb = 1024 ** 3
+
+    def show(done, total):
+        sys.stdout.write(f"\r   📀 {done / gb:.1f}/{total / gb:.1f} GB")
+        sys.stdout.flush()
+
+    start_time = time.time()
+    prefetched = prefetch_model(model, workers=workers, method=method, progress=show)
+    elapsed = max(time.time() - start_time, 1e-9)
+    click.echo("")
+    fraction = resident_fraction(model)
+    resident = f"{fraction * 100:.0f}% resident" if fraction is not None else "residency unknown"
+    click.echo(f"✅ {model}: {prefetched / gb:.1f} GB in {elapsed:.1f}s "
+               f"({prefetched / elapsed / 1024 ** 2:.0f} MB/s), {resident}")
+
 @cli.command()
-def start():
-    """Start all FaceRunner services locally (no Docker)."""
-    # Start Ollama
-    click.echo("🚀 Starting FaceRunner services...")
-    # Start Ollama
-    click.echo("✅ Starting Ollama server...")
+@click.argument('models', nargs=-1, required=True)
+@click.option('--keep-alive', default=None, help='How long Ollama keeps the model loaded (e.g. 30m, -1).')
+@click.option('--evict/--no-evict', default=None, help='Unload least-recently-used models to make room.')
+@click.option('--force', is_flag=True, help='Skip the memory admission check.')
+@click.option('--disk', is_flag=True, help="Only prefetch the model's blobs into the OS page cache.")
+@click.option('--check', is_flag=True, help='Only report how much of each model is in the page cache.')
+@click.option('--workers', default=4, type=int, help='Parallel readers for --disk.')
+@click.option('--fadvise', is_flag=True, help='With --disk, issue POSIX_FADV_WILLNEED instead of reading.')
+def warm(models, keep_alive, evict, force, disk, check, workers, fadvise):
+    """Load models into memory (or, with --disk, into the page cache) ahead of their first request."""
+    from facerunner.api_utils import load_model
+    from facerunner.usage_utils import record_use
+    for model in models:
+        if check:
+            from facerunner.prefetch_utils import resident_fraction
+            try:
+                fraction = resident_fraction(model)
+                click.echo(f"📀 {model}: " + (f"{fraction * 100:.0f}% resident" if fraction is not None
+                                              else "residency unknown on this platform"))
+            except FileNotFoundError as e:
+                click.echo(f"❌ {e}")
+            continue
+        if disk:
+            click.echo(f"📀 Prefetching blobs of {model} into the page cache...")
+            try:
+                prefetch_to_page_cache(model, workers, "fadvise" if fadvise else "read")
+            except FileNotFoundError as e:
+                click.echo(f"❌ {e}")
+            except Exception as e:
+                click.echo(f"❌ Error prefetching {model}: {e}")
+            continue
+        click.echo(f"🔥 Warming model: {model}")
+        if not force:
+            from facerunner.memory_utils import check_admission
+            if not report_admission(check_admission(model, evict=evict)):
+                continue
+        try:
+            record_use(model)
+            start_time = time.time()
+            if load_model(model, keep_alive=keep_alive):
+                click.echo(f"✅ {model} loaded in {time.time() - start_time:.1f}s")
+            else:
+                click.echo(f"❌ Ollama could not load {model}")
+        except Exception as e:
+            click.echo(f"❌ Error loading model: {e}")
+
+def prefetch_hot_models_background():
+    """Prefetch the configured hot_models into the page cache in a background process."""
+    from facerunner.config_utils import get_setting
+    hot_models = get_setting("hot_models", [])
+    if not hot_models:
+        return
+    log_path = os.path.expanduser("~/.facerunner/logs/prefetch.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    log_file = open(log_path, "a")
+    subprocess.Popen([sys.executable, "-m", "facerunner", "warm", "--disk", *hot_models],
+                     stdout=log_file, stderr=log_file)
+    click.echo(f"📀 Prefetching hot models in the background: {', '.join(hot_models)}")
+
+@cli.command()
+@click.argument('model')
+@click.option('--num-ctx', default=8192, type=int, help='Context length to size the KV cache for.')
+def plan(model, num_ctx):
+    """Estimate memory and speed of each size/quantisation variant of a model."""
+    from facerunner.planner_utils import get_host_resources, plan_model
+    base_name = model.split(':')[0]
+    host = get_host_resources()
+    rows = plan_model(base_name, num_ctx=num_ctx, host=host)
+    if not rows:
+        click.echo(f"❌ No planner data for {base_name}.")
+        return
+    gb = 1024 ** 3
+    click.echo(f"📐 {base_name} @ num_ctx={num_ctx} — {host['ram_free'] / gb:.1f} GB free RAM, "
+               f"{host['vram_free'] / gb:.1f} GB free VRAM, {host['cores']} cores")
+    click.echo(f"{'Tag':<40} {'Weights':>8} {'KV':>7} {'Total':>8} {'Where':>8} {'tok/s':>7}")
+    for r in rows:
+        click.echo(f"{('⭐ ' if r['recommended'] else '   ') + r['tag']:<40} {r['weights'] / gb:>7.1f}G "
+                   f"{r['kv_cache'] / gb:>6.1f}G {r['total'] / gb:>7.1f}G {r['placement'] or '-':>8} "
+                   f"{r['tokens_per_sec']:>7.1f}")
+
+@cli.command()
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_file', type=click.Path(dir_okay=False))
+@click.option('--model', '-m', default=None, help="Model for records without a 'model' field.")
+@click.option('--concurrency', '-j', default=4, type=int, help='Maximum requests in flight.')
+@click.option('--unordered', is_flag=True, help='Write results as they complete instead of in input order.')
+@click.option('--restart', is_flag=True,
+              help='Ignore any checkpoint and start from the first prompt (results are appended to OUTPUT_FILE).')
+def batch(input_file, output_file, model, concurrency, unordered, restart):
+    """Run a JSONL file of prompts through Ollama, resuming from the last checkpoint."""
+    from facerunner.batch_utils import run_batch
+
+    def show(snap):
+        sys.stdout.write(
+            f"\r⚙️  {snap['completed']} done ({snap['failed']} failed) | "
+            f"{snap['prompts_per_sec']:.2f} prompts/s | {snap['tokens_per_sec']:.1f} tokens/s | "
+            f"p95 {snap['p95_ms'] / 1000:.2f}s   "
+        )
+        sys.stdout.flush()
+
+    click.echo(f"📜 Batch: {input_file} → {output_file} (concurrency {concurrency})")
+    try:
+        final = run_batch(input_file, output_file, model=model, concurrency=max(1, concurrency),
+                          ordered=not unordered, resume=not restart, progress=show)
+        click.echo("")
+        click.echo(f"✅ Batch complete: {final['completed']} prompts in {final['elapsed']:.1f}s")
+    except KeyboardInterrupt:
+        click.echo("\n⏸️  Interrupted. Run the same command again to resume from the checkpoint.")
+    except Exception as e:
+        click.echo(f"\n❌ Batch failed: {e}")
+
+@cli.command()
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output', '-o', required=True, type=click.Path(dir_okay=False), help='Destination .npy file.')
+@click.option('--model', '-m', required=True, help='Ollama embedding model (e.g. nomic-embed-text).')
+@click.option('--concurrency', '-j', default=4, type=int, help='Maximum batches in flight.')
+@click.option('--batch-size', default=32, type=int, help='Initial batch size (adapted automatically).')
+@click.option('--restart', is_flag=True, help='Ignore any checkpoint and embed everything again.')
+def embed(inputs, output, model, concurrency, batch_size, restart):
+    """Embed text/JSONL inputs into a memory-mapped float32 .npy file plus an id sidecar."""
+    from facerunner.embed_utils import run_embed, sidecar_paths
+
+    def show(snap):
+        sys.stdout.write(
+            f"\r🧮 {snap['completed']}/{snap['rows']} vectors | {snap['vectors_per_sec']:.1f} vectors/s | "
+            f"batch {snap['batch_size']}   "
+        )
+        sys.stdout.flush()
+
+    click.echo(f"🧮 Embedding {len(inputs)} input(s) with {model} → {output}")
     try:
-        subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        click.echo("   Ollama started.")
+        final = run_embed(inputs, output, model, concurrency=max(1, concurrency), batch_size=max(1, batch_size),
+                          resume=not restart, progress=show)
+        click.echo("")
+        click.echo(f"✅ {final['rows']} x {final['dim']} vectors in {output}, ids in {sidecar_paths(output)[0]}")
+    except KeyboardInterrupt:
+        click.echo("\n⏸️  Interrupted. Run the same command again to resume from the last completed batch.")
     except Exception as e:
-        click.echo(f"❌ Error starting Ollama: {e}")
-    time.sleep(2)
-    # Start Open WebUI
-    click.echo("✅ Starting Open WebUI...")
+        click.echo(f"\n❌ Embedding failed: {e}")
+
+@cli.group(invoke_without_command=True)
+@click.pass_context
+def storage(ctx):
+    """Show and manage hot/cold placement of model blobs across storage tiers."""
+    if ctx.invoked_subcommand is not None:
+        return
+    from facerunner.tier_utils import get_tiers, storage_report
+    from facerunner.usage_utils import sample_running_models
+    sample_running_models()
+    gb = 1024 ** 3
+    click.echo("💽 Storage tiers (fastest first):")
+    for tier in get_tiers():
+        cap = f"{tier['capacity'] / gb:.0f} GB" if tier['capacity'] else "unlimited"
+        click.echo(f"   {tier['name']:<10} {tier['kind']:<5} {tier['read_mbps']:>6.0f} MB/s  {cap:<10} {tier['path']}")
+    click.echo("")
+    click.echo(f"{'Model':<36} {'Size':>8} {'Score':>7} {'Tier':>8} {'Plan':>8} {'Load now':>9} {'On fast':>8}")
+    for row in storage_report():
+        click.echo(f"{row['name']:<36} {row['size'] / gb:>7.1f}G {row['score']:>7.2f} {row['tier']:>8} "
+                   f"{row['planned']:>8} {row['load_seconds']:>8.1f}s {row['fast_load_seconds']:>7.1f}s")
+
+@storage.command('rebalance')
+@click.option('--dry-run', is_flag=True, help='Show the planned moves without copying anything.')
+def storage_rebalance(dry_run):
+    """Promote hot models to the fast tier and demote cold ones (loaded models are left alone)."""
+    from facerunner.tier_utils import rebalance
+    from facerunner.usage_utils import sample_running_models
+    sample_running_models()
     try:
-        subprocess.Popen(["open-webui", "serve", "--host", "0.0.0.0", "--port", str(WEBUI_PORT)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        click.echo("   Open WebUI started.")
+        result = rebalance(dry_run=dry_run, log=lambda msg: click.echo(f"   🚚 {msg}"))
     except Exception as e:
-        click.echo(f"❌ Error starting Open WebUI: {e}")
-    time.sleep(2)
-    # Start FaceRunner Web UI
-    click.echo("✅ Launching FaceRunner web UI in background...")
-    webui_started = launch_webui_background()
-    if webui_started:
-        click.echo("✅ FaceRunner web UI launched successfully!")
-        click.echo(f"🌐 Web UI available at: http://localhost:{STREAMLIT_PORT}")
+        click.echo(f"❌ Rebalance failed: {e}")
+        return
+    for name in result["skipped"]:
+        click.echo(f"   ⏭️  {name} is loaded; its blobs were not moved.")
+    verb = "Would move" if dry_run else "Moved"
+    click.echo(f"✅ {verb} {len(result['moved'])} blob(s), {result['bytes'] / 1024 ** 3:.1f} GB.")
+
+@storage.command('sample')
+def storage_sample():
+    """Record usage of the models Ollama has loaded right now (run periodically, e.g. from cron)."""
+    from facerunner.usage_utils import sample_running_models
+    names = sample_running_models()
+    click.echo(f"📈 Recorded use of: {', '.join(names)}" if names else "📈 No models loaded.")
+
+@cli.group()
+@click.option('--hosts', 'hosts_file', default=None, type=click.Path(dir_okay=False),
+              help='Hosts inventory (default: ~/.facerunner/hosts.yaml).')
+@click.option('--timeout', default=5.0, type=float, help='Per-host timeout in seconds.')
+@click.option('--concurrency', '-j', default=16, type=int, help='Hosts contacted at once.')
+@click.pass_context
+def fleet(ctx, hosts_file, timeout, concurrency):
+    """Probe and manage every Ollama host in the inventory at once."""
+    # The inventory is read by each subcommand, so --help works without one
+    ctx.obj = {"hosts_file": hosts_file, "timeout": timeout, "concurrency": concurrency}
+
+def fleet_hosts(obj):
+    """Load the hosts inventory for a fleet subcommand, exiting with an error if it is missing or empty."""
+    from facerunner.fleet_utils import load_hosts
+    ctx = click.get_current_context()
+    try:
+        hosts = load_hosts(obj["hosts_file"])
+    except FileNotFoundError:
+        click.echo("❌ No hosts inventory found. Create ~/.facerunner/hosts.yaml or pass --hosts.")
+        ctx.exit(1)
+    if not hosts:
+        click.echo("❌ The hosts inventory is empty.")
+        ctx.exit(1)
+    return hosts
+
+def echo_fleet_failures(results):
+    """Print one line per host that did not answer; return how many failed."""
+    failed = [r for r in results if not r["ok"]]
+    for r in failed:
+        click.echo(f"   ❌ {r['host']}: {r['error']}")
+    return len(failed)
+
+@fleet.command('status')
+@click.pass_obj
+def fleet_status_cmd(obj):
+    """Liveness, loaded models, free memory and version drift for every host."""
+    from facerunner.fleet_utils import fleet_status
+    gb = 1024 ** 3
+    results, baseline = fleet_status(fleet_hosts(obj), obj["timeout"], obj["concurrency"])
+    click.echo(f"{'Host':<24} {'Up':<3} {'Latency':>8} {'Version':<12} {'Model mem':>10} {'Free':>8}  Loaded")
+    for r in results:
+        if not r["ok"]:
+            click.echo(f"{r['host']:<24} ❌  {'-':>8} {'-':<12} {'-':>10} {'-':>8}  {r['error']}")
+            continue
+        version = r["version"] + (" ⚠️" if r["drift"] else "")
+        free = f"{r['free_bytes'] / gb:.1f}G" if r["free_bytes"] is not None else "?"
+        click.echo(f"{r['host']:<24} ✅  {r['latency'] * 1000:>6.0f}ms {version:<12} "
+                   f"{r['loaded_bytes'] / gb:>9.1f}G {free:>8}  {', '.join(r['loaded']) or '-'}")
+    up = sum(1 for r in results if r["ok"])
+    drift = sum(1 for r in results if r.get("drift"))
+    click.echo(f"\n{up}/{len(results)} host(s) up" + (f", {drift} not on {baseline}" if drift else ""))
+
+@fleet.command('models')
+@click.pass_obj
+def fleet_models(obj):
+    """Show which hosts have each model installed."""
+    from facerunner.fleet_utils import fleet_status, model_matrix
+    results, _ = fleet_status(fleet_hosts(obj), obj["timeout"], obj["concurrency"])
+    models, installed = model_matrix(results)
+    hosts = [r["host"] for r in results if r["ok"]]
+    width = max([len(m) for m in models] + [5])
+    click.echo(f"{'Model':<{width}}  " + "  ".join(f"{h:^{max(len(h), 3)}}" for h in hosts))
+    for model in models:
+        marks = "  ".join(f"{('✓' if model in installed[h] else '·'):^{max(len(h), 3)}}" for h in hosts)
+        click.echo(f"{model:<{width}}  {marks}")
+    echo_fleet_failures(results)
+
+@fleet.command('pull')
+@click.argument('model')
+@click.option('--timeout', default=3600.0, type=float, help='Per-host timeout for the pull in seconds.')
+@click.pass_obj
+def fleet_pull(obj, model, timeout):
+    """Pull a model on every host."""
+    from facerunner.fleet_utils import run_fleet, pull_on_host
+    hosts = fleet_hosts(obj)
+    click.echo(f"📥 Pulling {model} on {len(hosts)} host(s)...")
+    results = run_fleet(hosts, lambda host: pull_on_host(host, model), timeout, obj["concurrency"])
+    for r in results:
+        if r["ok"]:
+            click.echo(f"   ✅ {r['host']}: done in {r['elapsed']:.1f}s")
+    failed = echo_fleet_failures(results)
+    click.echo(f"{len(results) - failed}/{len(results)} host(s) have {model}.")
+
+@fleet.command('warm')
+@click.argument('model')
+@click.option('--keep-alive', default=None, help='How long Ollama keeps the model loaded (e.g. 30m, -1).')
+@click.option('--timeout', default=600.0, type=float, help='Per-host timeout for loading in seconds.')
+@click.pass_obj
+def fleet_warm(obj, model, keep_alive, timeout):
+    """Load a model into memory on every host."""
+    from facerunner.fleet_utils import run_fleet, warm_on_host
+    hosts = fleet_hosts(obj)
+    click.echo(f"🔥 Warming {model} on {len(hosts)} host(s)...")
+    results = run_fleet(hosts, lambda host: warm_on_host(host, model, keep_alive), timeout, obj["concurrency"])
+    for r in results:
+        if r["ok"]:
+            click.echo(f"   ✅ {r['host']}: loaded in {r['elapsed']:.1f}s")
+    failed = echo_fleet_failures(results)
+    click.echo(f"{len(results) - failed}/{len(results)} host(s) have {model} loaded.")
+
+@cli.command()
+@click.option('--workers', default=None, type=int, help='Hashing processes (default: CPU count).')
+@click.option('--no-cache', is_flag=True, help='Re-hash every blob, even ones unchanged since the last clean run.')
+@click.option('--repair', is_flag=True, help='Delete corrupt blobs and re-pull the affected models.')
+@click.option('--yes', '-y', is_flag=True, help='Do not ask before repairing.')
+@click.option('--now', is_flag=True, help='Re-pull now even outside the configured pull_windows.')
+def fsck(workers, no_cache, repair, yes, now):
+    """Verify every model blob's SHA-256 and the blobs each manifest references."""
+    from facerunner.fsck_utils import run_fsck, remove_corrupt_blobs
+
+    def show(checked, total):
+        sys.stdout.write(f"\r🔎 Hashed {checked}/{total} blobs")
+        sys.stdout.flush()
+
+    click.echo("🔎 Checking the Ollama model store...")
+    start_time = time.time()
+    report = run_fsck(workers=workers, use_cache=not no_cache, progress=show)
+    if report["checked"]:
+        click.echo("")
+    click.echo(f"   {report['checked']} blob(s) hashed, {report['skipped']} unchanged since last clean run "
+               f"({time.time() - start_time:.1f}s)")
+    for digest in report["corrupt"]:
+        click.echo(f"   ❌ Corrupt:  {digest}")
+    for digest in report["missing"]:
+        click.echo(f"   ❌ Missing:  {digest}")
+    for path in report["bad_manifests"]:
+        click.echo(f"   ❌ Unreadable manifest: {path}")
+    if report["orphaned"]:
+        click.echo(f"   ℹ️  {len(report['orphaned'])} blob(s) not referenced by any model")
+    if not report["affected_models"]:
+        click.echo("✅ All model blobs verified.")
+        return
+    click.echo(f"⚠️  Affected models: {', '.join(report['affected_models'])}")
+    if not repair:
+        click.echo("   Run 'facerunner fsck --repair' to re-pull them.")
+        return
+    if not yes and not click.confirm("Delete corrupt blobs and re-pull the affected models?"):
+        return
+    from facerunner.shaping_utils import shaped_pull, shaping_summary
+    remove_corrupt_blobs(report)
+    shaping = shaping_summary()
+    if shaping:
+        click.echo(f"🚦 Pull shaping: {shaping}")
+    for model in report["affected_models"]:
+        click.echo(f"📥 Re-pulling {model}...")
+        try:
+            shaped_pull(model, ignore_window=now)
+            click.echo(f"   ✅ {model} restored.")
+        except Exception as e:
+            click.echo(f"   ❌ Error pulling {model}: {e}")
+
+@cli.command('update-models')
+@click.argument('models', nargs=-1)
+@click.option('--check', is_flag=True, help='Only report which tags changed; do not pull.')
+@click.option('--workers', default=16, type=int, help='Concurrent registry checks.')
+@click.option('--pull-workers', default=2, type=int, help='Concurrent pulls of changed tags.')
+@click.option('--registry-url', envvar='FACERUNNER_REGISTRY_URL', default=None,
+              help='Registry base URL to check against instead of https://<registry> (e.g. a local mirror).')
+@click.option('--now', is_flag=True, help='Pull now even outside the configured pull_windows.')
+def update_models(models, check, workers, pull_workers, registry_url, now):
+    """Pull only the installed tags whose registry manifest has changed."""
+    from facerunner.update_utils import check_updates, pull_changed, bytes_saved
+    gb = 1024 ** 3
+
+    click.echo("🔄 Checking installed models against the registry...")
+    start_time = time.time()
+    results = check_updates(models, workers=workers, registry_url=registry_url)
+    if not results:
+        click.echo("ℹ️  No installed models to check.")
+        return
+    for r in results:
+        if r["status"] == "unchanged":
+            click.echo(f"   ✅ {r['model']}: up to date")
+        elif r["status"] == "changed":
+            click.echo(f"   🆕 {r['model']}: update available ({r['download'] / gb:.1f} GB to download)")
+        else:
+            click.echo(f"   ❌ {r['model']}: {r['error']}")
+    changed = [r for r in results if r["status"] == "changed"]
+    click.echo(f"   {len(results)} tag(s) checked in {time.time() - start_time:.1f}s, {len(changed)} changed")
+
+    if changed and not check:
+        def show(model, error):
+            click.echo(f"   ✅ {model} updated." if error is None else f"   ❌ Error pulling {model}: {error}")
+
+        from facerunner.shaping_utils import shaping_summary
+        click.echo(f"📥 Pulling {len(changed)} changed tag(s)...")
+        shaping = shaping_summary()
+        if shaping:
+            click.echo(f"🚦 Pull shaping: {shaping}")
+        pull_changed(results, workers=pull_workers, progress=show, ignore_window=now)
+    click.echo(f"💾 Skipped {bytes_saved(results) / gb:.1f} GB compared with re-pulling every tag.")
+
+@cli.command('export')
+@click.argument('models', nargs=-1, required=True)
+@click.option('--output', '-o', required=True, help="Bundle path: a .tar file, '-' for stdout, or a directory with --dir.")
+@click.option('--dir', 'as_dir', is_flag=True, help='Write a directory bundle (blobs hard-linked or reflinked when possible).')
+def export_models(models, output, as_dir):
+    """Export models (manifests plus de-duplicated blobs) into a bundle for offline hosts."""
+    from facerunner.bundle_utils import export_tar, export_dir
+    gb = 1024 ** 3
+    # Progress goes to stderr so the bundle can be streamed to stdout
+    def show(done, total):
+        click.echo(f"\r📦 {done / gb:.1f}/{total / gb:.1f} GB", nl=False, err=True)
+
+    try:
+        if as_dir:
+            result = export_dir(models, output, progress=show)
+        else:
+            result = export_tar(models, output, progress=show)
+        click.echo("", err=True)
+        click.echo(f"✅ Exported {', '.join(result['models'])}: {result['blobs']} blob(s), "
+                   f"{result['bytes'] / gb:.1f} GB → {output}", err=True)
+    except FileNotFoundError as e:
+        click.echo(f"❌ {e}", err=True)
+    except Exception as e:
+        click.echo(f"❌ Error exporting models: {e}", err=True)
+
+@cli.command('import')
+@click.argument('bundle')
+@click.option('--verify/--no-verify', default=True,
+              help='Hash directory-bundle blobs before linking them in (default; tar blobs are always hashed).')
+def import_models(bundle, verify):
+    """Import a bundle made by 'facerunner export' into the local Ollama store."""
+    from facerunner.bundle_utils import import_bundle
+    gb = 1024 ** 3
+
+    def show(done, total):
+        sys.stdout.write(f"\r📦 {done / gb:.1f}/{total / gb:.1f} GB")
+        sys.stdout.flush()
+
+    try:
+        report = import_bundle(bundle, verify=verify, progress=show)
+        click.echo("")
+        methods = ", ".join(f"{n} {m}" for m, n in report["methods"].items()) or "nothing new"
+        click.echo(f"✅ Imported {', '.join(report['models'])}: {report['imported']} new blob(s) "
+                   f"({report['bytes'] / gb:.1f} GB, {methods}), {report['skipped']} already present.")
+    except Exception as e:
+        click.echo(f"\n❌ Error importing bundle: {e}")
+
+@cli.command()
+@click.option('--port', default=None, type=int, help='Port to serve /metrics on (default: metrics_port or 9464).')
+@click.option('--interval', default=None, type=float, help='Seconds between samples (default: metrics_interval or 5).')
+def exporter(port, interval):
+    """Serve Prometheus metrics for the FaceRunner services at /metrics."""
+    from facerunner.config_utils import get_setting
+    from facerunner.metrics_utils import serve_metrics
+    port = port or get_setting("metrics_port", 9464)
+    interval = interval or get_setting("metrics_interval", 5)
+    click.echo(f"📊 Serving metrics at http://0.0.0.0:{port}/metrics (sampling every {interval:g}s)")
+    try:
+        serve_metrics(port=port, interval=interval)
+    except KeyboardInterrupt:
+        click.echo("\n👋 Metrics exporter stopped.")
+    except OSError as e:
+        click.echo(f"❌ Could not serve metrics on port {port}: {e}")
+
+def launch_exporter_background():
+    """Start the metrics exporter in a background process if metrics_exporter is enabled."""
+    from facerunner.config_utils import get_setting
+    if not get_setting("metrics_exporter", False):
+        return
+    log_path = os.path.expanduser("~/.facerunner/logs/exporter.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    log_file = open(log_path, "a")
+    subprocess.Popen([sys.executable, "-m", "facerunner", "exporter"], stdout=log_file, stderr=log_file)
+    click.echo(f"📊 Metrics exporter started on port {get_setting('metrics_port', 9464)}.")
+
+@cli.group(invoke_without_command=True)
+@click.option('--since', default='1h', help='Start of the range: 30m, 6h, 7d, 1y or a date like "2026-10-18 22:00".')
+@click.option('--until', default=None, help='End of the range (default: now), same formats as --since.')
+@click.option('--series', '-s', 'patterns', multiple=True, help='Series to show; shell patterns like "service.ollama.*" work.')
+@click.option('--points', default=40, type=int, help='Points per series (buckets are merged to fit).')
+@click.option('--json', 'as_json', is_flag=True, help='Print the points as JSON.')
+@click.pass_context
+def metrics(ctx, since, until, patterns, points, as_json):
+    """Query the recorded host and service history (~/.facerunner/telemetry.db)."""
+    if ctx.invoked_subcommand is not None:
+        return
+    import json
+    import fnmatch
+    from facerunner.telemetry_utils import list_series, query, parse_since, sparkline
+    now = time.time()
+    try:
+        start = parse_since(since, now)
+        end = parse_since(until, now) if until else now
+    except ValueError as e:
+        click.echo(f"❌ {e}")
+        return
+    names = list_series()
+    if patterns:
+        names = [n for n in names if any(fnmatch.fnmatch(n, p) for p in patterns)]
+    if not names:
+        click.echo("📭 No matching history recorded yet (it is written while the web UI or `facerunner start` runs).")
+        return
+    result = query(names, start, end, max_points=points, now=now)
+    if as_json:
+        click.echo(json.dumps({name: [{"ts": ts, "mean": mean, "min": low, "max": high}
+                                      for ts, mean, low, high in rows] for name, rows in result.items()}, indent=2))
+        return
+
+    def fmt(name, value):
+        if name.endswith("_bytes") or name.endswith("_bps"):
+            for unit in ("B", "KB", "MB", "GB", "TB"):
+                if abs(value) < 1024 or unit == "TB":
+                    return f"{value:.1f}{unit}{'/s' if name.endswith('_bps') else ''}"
+                value /= 1024
+        return f"{value:.1f}"
+
+    click.echo(f"📈 {time.strftime('%Y-%m-%d %H:%M', time.localtime(start))} → "
+               f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(end))}")
+    click.echo(f"{'Series':<36} {'Min':>10} {'Mean':>10} {'Max':>10}  History")
+    for name in names:
+        rows = result.get(name) or []
+        if not rows:
+            continue
+        total = sum(mean for _, mean, _, _ in rows) / len(rows)
+        click.echo(f"{name[:36]:<36} {fmt(name, min(r[2] for r in rows)):>10} {fmt(name, total):>10} "
+                   f"{fmt(name, max(r[3] for r in rows)):>10}  {sparkline([r[1] for r in rows], width=points)}")
+
+@metrics.command('record')
+@click.option('--interval', default=None, type=float, help='Seconds between samples (default: telemetry_interval or 1).')
+def metrics_record(interval):
+    """Record host and service samples until interrupted (`facerunner start` runs this in the background)."""
+    from facerunner.config_utils import get_setting
+    from facerunner.telemetry_utils import TelemetryRecorder, TELEMETRY_DB_PATH
+    recorder = TelemetryRecorder(interval=interval or get_setting("telemetry_interval", 1))
+    click.echo(f"📈 Recording telemetry to {TELEMETRY_DB_PATH} every {recorder.interval:g}s (Ctrl+C to stop)")
+    try:
+        recorder.run()
+    except KeyboardInterrupt:
+        recorder.release()
+        click.echo("\n👋 Telemetry recorder stopped.")
+
+@metrics.command('stats')
+def metrics_stats():
+    """Show how much history is stored per resolution."""
+    from facerunner.telemetry_utils import store_stats, TIERS, TELEMETRY_DB_PATH
+    stats = store_stats()
+    click.echo(f"📈 {TELEMETRY_DB_PATH}: {stats['series']} series, {stats['bytes'] / 1024 ** 2:.1f} MB")
+    for resolution, retention in TIERS:
+        kept = f"{retention / 86400:g} days" if retention >= 86400 else f"{retention / 3600:g} hour(s)"
+        click.echo(f"   {resolution:>4}s points kept {kept:<10} {stats['rows'].get(resolution, 0):>10,} rows")
+
+@cli.command()
+@click.option('--port', default=11434, type=int, help="Port to serve on (default: Ollama's 11434).")
+@click.option('--host', default='127.0.0.1', help='Address to bind (0.0.0.0 to reach it from other hosts).')
+@click.option('--tps', default=None, type=float, help='Generated tokens per second per request.')
+@click.option('--load-seconds', default=None, type=float, help='Cold-load time per GB of model.')
+@click.option('--parallel', default=None, type=int, help='Requests each model serves at once.')
+@click.option('--max-queue', default=None, type=int, help='Waiting requests before HTTP 503.')
+@click.option('--error-rate', default=None, type=float, help='Fraction of requests that fail (0-1).')
+@click.option('--pull-speed', default=None, help='Simulated download speed, e.g. 50M (bytes/s) or 1gbit.')
+@click.option('--pull-size-gb', default=None, type=float, help='Size of pulled models not in the simulator config.')
+@click.option('--log-requests', is_flag=True, help='Print one line per request.')
+def simulate(port, host, tps, load_seconds, parallel, max_queue, error_rate, pull_speed, pull_size_gb, log_requests):
+    """Serve a simulated Ollama API for load tests, benchmarks and CI (no models or GPU needed)."""
+    from facerunner.config_utils import get_setting
+    from facerunner.shaping_utils import parse_rate
+    from facerunner.simulator_utils import serve_simulator
+    settings = dict(get_setting("simulator", {}))
+    try:
+        overrides = {"tokens_per_second": tps, "load_seconds_per_gb": load_seconds, "num_parallel": parallel,
+                     "max_queue": max_queue, "error_rate": error_rate, "pull_bytes_per_second": parse_rate(pull_speed),
+                     "pull_size_gb": pull_size_gb}
+    except ValueError as e:
+        click.echo(f"❌ {e}")
+        return
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    click.echo(f"🧪 Simulated Ollama API at http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        serve_simulator(port=port, host=host, settings=settings, log=click.echo if log_requests else None)
+    except KeyboardInterrupt:
+        click.echo("\n👋 Simulator stopped.")
+    except OSError as e:
+        click.echo(f"❌ Could not serve on port {port}: {e}")
+
+@cli.command()
+@click.option('--status', is_flag=True, help='Show the state recorded by the running watchdog and exit.')
+@click.option('--no-webui', is_flag=True, help='Supervise only Ollama (e.g. when Open WebUI is started on demand).')
+def watchdog(status, no_webui):
+    """Run Ollama and Open WebUI under supervision, restarting them when they exit or stop answering."""
+    from facerunner.watchdog_utils import run_watchdog, load_watchdog_state
+    if status:
+        state = load_watchdog_state()
+        if not state:
+            click.echo("ℹ️  The watchdog has not run yet.")
+            return
+        updated = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state.get("updated", 0)))
+        click.echo(f"🐕 Watchdog (pid {state.get('pid')}), last update {updated}")
+        for name, svc in state.get("services", {}).items():
+            icon = {"running": "✅", "backoff": "⏳", "crash-loop": "❌"}.get(svc["state"], "⏹️")
+            click.echo(f"   {icon} {name:<12} {svc['state']:<10} restarts: {svc['restarts']:<3} "
+                       f"downtime: {svc['downtime_seconds']:.0f}s  last failure: {svc['last_exit'] or '-'}")
+        return
+    from facerunner.config_utils import get_setting
+    from facerunner.watchdog_utils import default_services
+    names = "Ollama" if no_webui else "Ollama and Open WebUI"
+    click.echo(f"🐕 Watchdog supervising {names} (Ctrl+C to stop)...")
+    run_watchdog(specs=default_services(include_webui=not no_webui),
+                 policy=get_setting("watchdog_policy", {}), log=click.echo)
+    click.echo("🛑 Watchdog stopped.")
+
+@cli.group(invoke_without_command=True)
+@click.pass_context
+def jobs(ctx):
+    """Show the background pull/removal queue shared with the web UI."""
+    if ctx.invoked_subcommand is not None:
+        return
+    from facerunner.job_utils import list_jobs
+    rows = list_jobs(limit=20)
+    if not rows:
+        click.echo("📋 No jobs.")
+        return
+    gb = 1024 ** 3
+    click.echo(f"{'ID':>5} {'Kind':<7} {'Model':<32} {'State':<10} {'Prio':>4} {'Progress':>17}  Status")
+    for job in rows:
+        progress = f"{job['completed'] / gb:.2f}/{job['total'] / gb:.2f} GB" if job["total"] else ""
+        status = f"{job['status']}: {job['error']}" if job["error"] else job["status"]
+        click.echo(f"{job['id']:>5} {job['kind']:<7} {job['model'][:32]:<32} {job['state']:<10} "
+                   f"{job['priority']:>4} {progress:>17}  {status}")
+
+@jobs.command('add')
+@click.argument('kind', type=click.Choice(['pull', 'remove']))
+@click.argument('model')
+@click.option('--priority', default=0, type=int, help='Higher priorities run first.')
+@click.option('--limit', default=None, help='Cap a pull, e.g. 20M (bytes/s) or 100mbit.')
+@click.option('--now', is_flag=True, help='Start a pull now even outside the configured pull_windows.')
+def jobs_add(kind, model, priority, limit, now):
+    """Queue a pull or removal (run by the web UI's workers or `facerunner jobs worker`)."""
+    from facerunner.job_utils import enqueue
+    from facerunner.shaping_utils import parse_rate
+    try:
+        rate_limit = parse_rate(limit)
+    except ValueError as e:
+        click.echo(f"❌ {e}")
+        return
+    job_id = enqueue(kind, parse_model_name(model)[0] if kind == "pull" else model, priority=priority,
+                     rate_limit=rate_limit, ignore_window=now)
+    click.echo(f"📋 Queued {kind} of {model} as job #{job_id}.")
+
+@jobs.command('cancel')
+@click.argument('job_id', type=int)
+def jobs_cancel(job_id):
+    """Cancel a queued or running job."""
+    from facerunner.job_utils import cancel_job
+    if cancel_job(job_id):
+        click.echo(f"✖️  Job #{job_id} cancelled (a running pull stops at its next progress update).")
+    else:
+        click.echo(f"⚠️  Job #{job_id} is not queued or running.")
+
+@jobs.command('priority')
+@click.argument('job_id', type=int)
+@click.argument('priority', type=int)
+def jobs_priority(job_id, priority):
+    """Change a queued job's priority."""
+    from facerunner.job_utils import set_priority
+    if set_priority(job_id, priority):
+        click.echo(f"✅ Job #{job_id} priority set to {priority}.")
     else:
-        click.echo("⚠️  Web UI failed to launch. Run 'facerunner webui' manually.")
+        click.echo(f"⚠️  Job #{job_id} is not queued.")
+
+@jobs.command('worker')
+@click.option('--workers', '-j', default=None, type=int, help='Jobs run at once (default: job_workers setting).')
+def jobs_worker(workers):
+    """Run queued jobs in the foreground (for hosts without the web UI)."""
+    from facerunner.job_utils import ensure_workers
+    pool = ensure_workers(workers)
+    click.echo(f"👷 Running jobs with {pool.workers} worker(s). Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
+        click.echo("\n🛑 Worker stopped; running jobs resume on the next worker.")
+
+@cli.command()
+@click.option('--refresh', is_flag=True, help='Probe the hardware again instead of using ~/.facerunner/hardware.json.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the inventory as JSON.')
+def hardware(refresh, as_json):
+    """Show the saved hardware inventory (GPUs, CPU flags, NUMA, RAM, disks, primary IP)."""
+    import json
+    from facerunner.hardware_utils import get_inventory, refresh_inventory, HARDWARE_PATH
+    inventory = refresh_inventory() if refresh else get_inventory()
+    if as_json:
+        click.echo(json.dumps(inventory, indent=2))
+        return
+    gb = 1024 ** 3
+    cpu = inventory["cpu"]
+    click.echo(f"🖥️  {inventory['hostname']} ({inventory['os']}), primary IP {inventory['primary_ip']}")
+    click.echo(f"🧠 CPU: {cpu['model']} ({cpu['arch']}), {cpu['physical_cores'] or '?'} cores / "
+               f"{cpu['logical_cores']} threads, {inventory['numa_nodes']} NUMA node(s)")
+    click.echo(f"   Flags: {', '.join(cpu['flags']) or 'none of interest'}")
+    click.echo(f"💾 RAM: {inventory['ram_total'] / gb:.1f} GB")
+    if inventory["gpus"]:
+        for gpu in inventory["gpus"]:
+            click.echo(f"🎮 GPU: {gpu['name']}, {gpu['memory_total'] / gb:.1f} GB (driver {gpu['driver']})")
+    else:
+        click.echo("🎮 GPU: none detected")
+    for disk in inventory["disks"]:
+        click.echo(f"📀 {disk['mountpoint']}: {disk['device']} ({disk['type']}, {disk['fstype']}), "
+                   f"{disk['total'] / gb:.0f} GB")
+    collected = time.strftime("%Y-%m-%d %H:%M", time.localtime(inventory["collected_at"]))
+    click.echo(f"   Collected {collected}; saved in {HARDWARE_PATH}")
+
+@cli.command()
+@click.option('--idle-minutes', default=None, type=float, help='Stop a service after this long without connections (default: idle_timeout_minutes).')
+def activate(idle_minutes):
+    """Serve Open WebUI and the FaceRunner UI on demand: start on first connection, stop when idle."""
+    from facerunner.config_utils import get_setting
+    from facerunner.activation_utils import run_activation
+    idle_minutes = idle_minutes or get_setting("idle_timeout_minutes", 30)
+    click.echo(f"🔌 Socket activation on ports {WEBUI_PORT} and {STREAMLIT_PORT} (idle shutdown after {idle_minutes:g} min)")
+    try:
+        run_activation(idle_timeout=idle_minutes * 60, log=click.echo)
+    except OSError as e:
+        click.echo(f"❌ Could not listen: {e}")
+    click.echo("🛑 Socket activation stopped.")
+
+def launch_background(args, log_name):
+    """Run a facerunner subcommand as a detached background process logging to ~/.facerunner/logs."""
+    log_path = os.path.expanduser(f"~/.facerunner/logs/{log_name}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a") as log_file:
+        return subprocess.Popen([sys.executable, "-m", "facerunner", *args], stdout=log_file, stderr=log_file,
+                                start_new_session=True)
+
+@cli.command()
+@click.option('--watchdog', 'use_watchdog', is_flag=True, default=None,
+              help='Run Ollama and Open WebUI under the restarting watchdog (default: watchdog setting).')
+@click.option('--on-demand', is_flag=True, default=None,
+              help='Start Open WebUI and the FaceRunner UI on first connection and stop them when idle (default: on_demand setting).')
+@click.option('--simulate', is_flag=True, help='Run the Ollama API simulator instead of Ollama (see `facerunner simulate`).')
+def start(use_watchdog, on_demand, simulate):
+    """Start all FaceRunner services locally (no Docker)."""
+    from facerunner.config_utils import get_setting
+    from facerunner.profile_utils import span
+    if use_watchdog is None:
+        use_watchdog = get_setting("watchdog", False)
+    if on_demand is None:
+        on_demand = get_setting("on_demand", False)
+    # Start Ollama
+    click.echo("🚀 Starting FaceRunner services...")
+    with span("hardware inventory", "detection"):
+        from facerunner.hardware_utils import get_inventory
+        get_inventory()
+    if on_demand:
+        ports = (WEBUI_PORT, STREAMLIT_PORT)
+        # The activator must own both ports, so stop whatever already serves them
+        with span("stop existing web UIs", "launch"):
+            subprocess.run(["pkill", "-f", "facerunner activate"], check=False)
+            subprocess.run(["pkill", "-f", "open-webui"], check=False)
+            kill_existing_webui()
+            busy = wait_for_ports(ports, bound=False)
+        if busy:
+            click.echo(f"❌ Port(s) {', '.join(map(str, busy))} still in use. Stop what listens there and run start again.")
+            click.get_current_context().exit(1)
+        with span("launch activator", "launch"):
+            process = launch_background(["activate"], "activate")
+        with span("wait for activator", "readiness"):
+            missing = wait_for_ports(ports, bound=True, process=process)
+        if missing:
+            click.echo(f"❌ Socket activation is not listening on port(s) {', '.join(map(str, missing))}. "
+                       "See ~/.facerunner/logs/activate.log.")
+            click.get_current_context().exit(1)
+        click.echo(f"🔌 Open WebUI (:{WEBUI_PORT}) and the FaceRunner UI (:{STREAMLIT_PORT}) start on first connection.")
+    if simulate:
+        click.echo("🧪 Starting the Ollama API simulator (no real models are used)...")
+        if port_bound(OLLAMA_PORT):
+            click.echo(f"❌ Port {OLLAMA_PORT} is already in use. Stop Ollama (facerunner stop) and run start again.")
+            click.get_current_context().exit(1)
+        with span("launch simulator", "launch"):
+            process = launch_background(["simulate"], "simulator")
+        if use_watchdog:
+            click.echo("   ⚠️  The watchdog is not used with --simulate.")
+            use_watchdog = False
+        with span("wait for simulator", "readiness"):
+            from facerunner.setup_utils import url_ready
+            ready = url_ready(f"http://localhost:{OLLAMA_PORT}/api/version", timeout=15)
+        if not ready or process.poll() is not None:
+            click.echo(f"❌ The simulator is not serving on port {OLLAMA_PORT}. See ~/.facerunner/logs/simulator.log.")
+            click.get_current_context().exit(1)
+    if use_watchdog:
+        click.echo("✅ Starting Ollama" + ("" if on_demand else " and Open WebUI") + " under the watchdog...")
+        with span("launch watchdog", "launch"):
+            launch_background(["watchdog", "--no-webui"] if on_demand else ["watchdog"], "watchdog")
+        click.echo("   Watchdog started. Run 'facerunner watchdog --status' for restarts and downtime.")
+        with span("wait for watchdog", "readiness"):
+            time.sleep(4)
+    elif not simulate:
+        # Start Ollama
+        click.echo("✅ Starting Ollama server...")
+        try:
+            with span("launch ollama", "launch"):
+                subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            click.echo("   Ollama started.")
+        except Exception as e:
+            click.echo(f"❌ Error starting Ollama: {e}")
+        with span("wait for ollama", "readiness"):
+            time.sleep(2)
+    if not use_watchdog and not on_demand:
+        # Start Open WebUI
+        click.echo("✅ Starting Open WebUI...")
+        try:
+            with span("launch open-webui", "launch"):
+                subprocess.Popen(["open-webui", "serve", "--host", "0.0.0.0", "--port", str(WEBUI_PORT)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            click.echo("   Open WebUI started.")
+        except Exception as e:
+            click.echo(f"❌ Error starting Open WebUI: {e}")
+        with span("wait for open-webui", "readiness"):
+            time.sleep(2)
+    if not on_demand:
+        # Start FaceRunner Web UI
+        click.echo("✅ Launching FaceRunner web UI in background...")
+        webui_started = launch_webui_background()
+        if webui_started:
+            click.echo("✅ FaceRunner web UI launched successfully!")
+            click.echo(f"🌐 Web UI available at: http://localhost:{STREAMLIT_PORT}")
+        else:
+            click.echo("⚠️  Web UI failed to launch. Run 'facerunner webui' manually.")
+    with span("launch exporter and prefetch", "launch"):
+        launch_exporter_background()
+        prefetch_hot_models_background()
+        if get_setting("telemetry", True):
+            launch_background(["metrics", "record"], "telemetry")
 
 @cli.command()
 def stop():
     """Stop all FaceRunner services (Ollama, Open WebUI, FaceRunner Web UI)."""
     click.echo("🛑 Stopping FaceRunner services...")
     errors = []
+    # Stop the watchdog and socket activation first so they do not restart the services below
+    subprocess.run(["pkill", "-f", "facerunner watchdog"], check=False)
+    subprocess.run(["pkill", "-f", "facerunner activate"], check=False)
+    subprocess.run(["pkill", "-f", "facerunner simulate"], check=False)
     # Stop Ollama
     try:
         subprocess.run(["pkill", "-f", "ollama"], check=False)
@@ -360,6 +1267,9 @@ def stop():
         click.echo("✅ FaceRunner Web UI stopped.")
     except Exception as e:
         errors.append(f"FaceRunner Web UI: {e}")
+    # Stop the metrics exporter (no-op if it was not started)
+    subprocess.run(["pkill", "-f", "facerunner exporter"], check=False)
+    subprocess.run(["pkill", "-f", "facerunner metrics record"], check=False)
     if errors:
         click.echo("⚠️  Some errors occurred:")
         for err in errors:
@@ -371,6 +1281,8 @@ def stop():
 @cli.command()
 def verify():
     """Verify Ollama, Open WebUI, and FaceRunner Web UI accessibility."""
+    import requests
+    from facerunner.profile_utils import span
     click.echo("🔍 Verifying FaceRunner services...")
 
     host_ip = get_host_ip()
@@ -380,8 +1292,9 @@ def verify():
     click.echo("🤖 Testing Ollama API...")
     try:
         click.echo("  📡 Testing local connection...")
-        response = requests.post(f"http://localhost:{OLLAMA_PORT}/api/generate",
-                                json={"model": "llama3.1", "prompt": "Hello"}, timeout=10)
+        with span("probe ollama local", "probe"):
+            response = requests.post(f"http://localhost:{OLLAMA_PORT}/api/generate",
+                                    json={"model": "llama3.1", "prompt": "Hello"}, timeout=10)
         if response.status_code == 200:
             click.echo("  ✅ Ollama accessible locally")
         else:
@@ -391,8 +1304,9 @@ def verify():
 
     try:
         click.echo(f"  🌐 Testing network connection ({host_ip})...")
-        response = requests.post(f"http://{host_ip}:{OLLAMA_PORT}/api/generate",
-                                json={"model": "llama3.1", "prompt": "Hello"}, timeout=10)
+        with span("probe ollama network", "probe"):
+            response = requests.post(f"http://{host_ip}:{OLLAMA_PORT}/api/generate",
+                                    json={"model": "llama3.1", "prompt": "Hello"}, timeout=10)
         if response.status_code == 200:
             click.echo(f"  ✅ Ollama accessible over network at {host_ip}")
         else:
@@ -404,7 +1318,8 @@ def verify():
     click.echo("🌐 Testing Open WebUI...")
     try:
         click.echo("  📡 Testing local connection...")
-        response = requests.get(f"http://localhost:{WEBUI_PORT}", timeout=10)
+        with span("probe open-webui local", "probe"):
+            response = requests.get(f"http://localhost:{WEBUI_PORT}", timeout=10)
         if response.status_code == 200:
             click.echo("  ✅ Open WebUI accessible locally")
         else:
@@ -414,7 +1329,8 @@ def verify():
 
     try:
         click.echo(f"  🌐 Testing network connection ({host_ip})...")
-        response = requests.get(f"http://{host_ip}:{WEBUI_PORT}", timeout=10)
+        with span("probe open-webui network", "probe"):
+            response = requests.get(f"http://{host_ip}:{WEBUI_PORT}", timeout=10)
         if response.status_code == 200:
             click.echo(f"  ✅ Open WebUI accessible over network at {host_ip}")
         else:
@@ -427,7 +1343,8 @@ def verify():
     click.echo("  💡 Note: Web UI runs locally - use 'facerunner webui' to start it")
     try:
         click.echo("  📡 Testing local connection...")
-        response = requests.get(f"http://localhost:{STREAMLIT_PORT}", timeout=10)
+        with span("probe web UI local", "probe"):
+            response = requests.get(f"http://localhost:{STREAMLIT_PORT}", timeout=10)
         if response.status_code == 200:
             click.echo("  ✅ FaceRunner Web UI accessible locally")
         else:
@@ -437,7 +1354,8 @@ def verify():
 
     try:
         click.echo(f"  🌐 Testing network connection ({host_ip})...")
-        response = requests.get(f"http://{host_ip}:{STREAMLIT_PORT}", timeout=10)
+        with span("probe web UI network", "probe"):
+            response = requests.get(f"http://{host_ip}:{STREAMLIT_PORT}", timeout=10)
         if response.status_code == 200:
             click.echo(f"  ✅ FaceRunner Web UI accessible over network at {host_ip}")
         else:
@@ -467,26 +1385,28 @@ def configure_network():
 
 @cli.command()
 @click.argument('ip')
-def integrate_vscode(ip):
-    """Generate VS Code Continue config for the given host IP."""
-    config = {
-        "models": [
-            {
-                "title": "Ollama Llama3.1",
-                "provider": "ollama",
-                "model": "llama3.1",
-                "apiBase": f"http://{ip}:{OLLAMA_PORT}"
-            }
-        ]
-    }
+@click.option('--refresh', is_flag=True, help='Re-measure every model instead of reusing stored latencies.')
+def integrate_vscode(ip, refresh):
+    """Generate VS Code Continue config, assigning autocomplete and chat models by measured latency."""
+    from facerunner.latency_utils import build_continue_config, write_continue_config
 
-    config_dir = Path.home() / ".continue"
-    config_dir.mkdir(exist_ok=True)
-    config_file = config_dir / "config.json"
-
-    with open(config_file, 'w') as f:
-        json.dump(config, f, indent=2)
+    def show(name, result, cached):
+        if result is None:
+            click.echo(f"   ❌ {name}: probe failed")
+        else:
+            source = "cached" if cached else "measured"
+            click.echo(f"   ⏱️  {name}: TTFT {result['ttft'] * 1000:.0f} ms, {result['tps']:.1f} tok/s ({source})")
 
+    click.echo("⏱️  Measuring installed models (stored results are reused)...")
+    try:
+        config, roles, _ = build_continue_config(f"http://{ip}:{OLLAMA_PORT}", refresh=refresh, progress=show)
+    except Exception as e:
+        click.echo(f"❌ Could not read models from Ollama: {e}")
+        return
+    config_file = Path.home() / ".continue" / "config.yaml"
+    write_continue_config(config, config_file)
+    click.echo(f"🧩 Autocomplete: {roles['autocomplete'] or '-'}  💬 Chat/Edit: {roles['chat'] or '-'}"
+               + (f"  🔎 Embed: {roles['embed']}" if roles['embed'] else ""))
     click.echo(f"VS Code config generated at {config_file}")
     click.echo("Restart VS Code and use the Continue extension.")
 
@@ -0,0 +1,8 @@
+"""
+Allow running the FaceRunner CLI as `python -m facerunner`.
+"""
+
+from facerunner import main
+
+if __name__ == '__main__':
+    main()
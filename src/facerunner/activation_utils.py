@@ -0,0 +1,182 @@
+"""
+FaceRunner Activation Utilities - Start web services on first connection and stop them when idle.
+
+FaceRunner listens on the public port itself, launches the real service on a loopback
+port when the first client connects, and relays bytes both ways (so HTTP and the
+websockets Streamlit and Open WebUI use both work). When no connection has been open
+for the idle timeout, the service is stopped and its memory is returned to the host.
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import subprocess
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+WEBUI_PORT = 8080
+STREAMLIT_PORT = 8501
+# The real service listens on 127.0.0.1 at public port + BACKEND_PORT_OFFSET
+BACKEND_PORT_OFFSET = 10000
+LOG_DIR = os.path.join(FACERUNNER_HOME, "logs")
+RELAY_CHUNK = 64 * 1024
+
+def default_activated_services():
+    """Return specs for Open WebUI and the FaceRunner UI; "{port}" is replaced by the backend port."""
+    main_py = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+    return [
+        {"name": "open-webui", "port": WEBUI_PORT,
+         "argv": ["open-webui", "serve", "--host", "127.0.0.1", "--port", "{port}"]},
+        {"name": "facerunner-webui", "port": STREAMLIT_PORT,
+         "argv": [sys.executable, "-m", "streamlit", "run", main_py, "--server.address", "127.0.0.1",
+                  "--server.port", "{port}", "--server.headless", "true"]},
+    ]
+
+class ActivatedService:
+    """A service launched on demand behind a relaying listener."""
+
+    def __init__(self, spec, idle_timeout, startup_timeout, log=print):
+        self.name = spec["name"]
+        self.port = spec["port"]
+        self.backend_port = spec.get("backend_port", self.port + BACKEND_PORT_OFFSET)
+        self.argv = [arg.replace("{port}", str(self.backend_port)) for arg in spec["argv"]]
+        self.idle_timeout = idle_timeout
+        self.startup_timeout = startup_timeout
+        self.log = log
+        self.proc = None
+        self.ready = False
+        self.connections = 0
+        self.last_activity = time.monotonic()
+        self.start_lock = asyncio.Lock()
+
+    async def backend_ready(self):
+        """Return True once the backend port accepts connections."""
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", self.backend_port)
+            writer.close()
+            return True
+        except OSError:
+            return False
+
+    async def ensure_started(self):
+        """Start the backend if needed and wait until it accepts connections."""
+        async with self.start_lock:
+            if self.proc is not None and self.proc.poll() is None and self.ready:
+                return True
+            if self.proc is None or self.proc.poll() is not None:
+                os.makedirs(LOG_DIR, exist_ok=True)
+                with open(os.path.join(LOG_DIR, f"{self.name}.log"), "a") as log_file:
+                    self.proc = subprocess.Popen(self.argv, stdout=log_file, stderr=log_file, start_new_session=True)
+                self.ready = False
+                self.log(f"⚡ {self.name}: first connection, starting (pid {self.proc.pid})")
+            start = time.monotonic()
+            while time.monotonic() - start < self.startup_timeout:
+                if self.proc.poll() is not None:
+                    self.log(f"❌ {self.name}: exited with code {self.proc.returncode} during startup")
+                    self.proc = None
+                    return False
+                if await self.backend_ready():
+                    self.ready = True
+                    self.log(f"✅ {self.name}: ready after {time.monotonic() - start:.1f}s")
+                    return True
+                await asyncio.sleep(0.25)
+            self.log(f"❌ {self.name}: not ready after {self.startup_timeout:.0f}s")
+            return False
+
+    async def relay(self, reader, writer):
+        """Copy bytes from reader to writer until EOF, recording activity."""
+        try:
+            while True:
+                data = await reader.read(RELAY_CHUNK)
+                if not data:
+                    break
+                self.last_activity = time.monotonic()
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def handle(self, client_reader, client_writer):
+        """Serve one client connection: activate the backend, then relay both directions."""
+        self.connections += 1
+        self.last_activity = time.monotonic()
+        try:
+            if not await self.ensure_started():
+                client_writer.close()
+                return
+            backend_reader, backend_writer = await asyncio.open_connection("127.0.0.1", self.backend_port)
+            await asyncio.gather(self.relay(client_reader, backend_writer),
+                                 self.relay(backend_reader, client_writer))
+        except (OSError, asyncio.CancelledError):
+            # Backend refused the connection, or the listener is shutting down
+            client_writer.close()
+        finally:
+            self.connections -= 1
+            self.last_activity = time.monotonic()
+
+    def stop(self, reason):
+        """Stop the backend process group (blocks for up to 15 s; use stop_async from the event loop)."""
+        if self.proc is None:
+            return
+        self.log(f"💤 {self.name}: {reason}, stopping (pid {self.proc.pid})")
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+            self.proc.wait()
+        except OSError:
+            pass
+        self.proc = None
+        self.ready = False
+
+    async def stop_async(self, reason):
+        """Stop the backend in a worker thread so the relays on every port keep running meanwhile."""
+        await asyncio.get_event_loop().run_in_executor(None, self.stop, reason)
+
+    async def reap_idle(self):
+        """Stop the backend once it has had no open connection for idle_timeout seconds."""
+        while True:
+            await asyncio.sleep(min(30, max(self.idle_timeout / 4, 1)))
+            if self.proc is None or self.connections:
+                continue
+            if self.start_lock.locked():
+                continue
+            idle = time.monotonic() - self.last_activity
+            if idle >= self.idle_timeout:
+                # Holding start_lock makes a connection that arrives meanwhile wait and start a fresh backend
+                async with self.start_lock:
+                    if self.proc is not None and not self.connections:
+                        await self.stop_async(f"idle for {idle:.0f}s")
+
+async def serve_activated(specs, idle_timeout, startup_timeout, host="0.0.0.0", log=print):
+    """Listen on every service's public port until cancelled."""
+    services = [ActivatedService(spec, idle_timeout, startup_timeout, log) for spec in specs]
+    servers, tasks = [], []
+    try:
+        for service in services:
+            servers.append(await asyncio.start_server(service.handle, host, service.port))
+            tasks.append(asyncio.ensure_future(service.reap_idle()))
+            log(f"🔌 {service.name}: listening on {host}:{service.port} (backend 127.0.0.1:{service.backend_port})")
+        stop = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        await stop.wait()
+    finally:
+        for server in servers:
+            server.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*(service.stop_async("shutting down") for service in services))
+
+def run_activation(specs=None, idle_timeout=1800, startup_timeout=180, log=print):
+    """Run socket activation for the given services (default: Open WebUI and the FaceRunner UI)."""
+    asyncio.run(serve_activated(specs or default_activated_services(), idle_timeout, startup_timeout, log=log))
@@ -0,0 +1,57 @@
+"""
+FaceRunner API Utilities - Thin client for the local Ollama HTTP API.
+"""
+
+import threading
+
+OLLAMA_PORT = 11434
+OLLAMA_URL = f"http://localhost:{OLLAMA_PORT}"
+
+_session = None
+_session_lock = threading.Lock()
+
+def make_session(pool_maxsize=32):
+    """Create a requests session whose connection pool holds up to pool_maxsize keep-alive connections."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session():
+    """Return a process-wide requests session with a pooled connection adapter."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+def list_running_models(base_url=OLLAMA_URL, timeout=5):
+    """Return the models currently loaded by Ollama (from /api/ps)."""
+    try:
+        response = get_session().get(f"{base_url}/api/ps", timeout=timeout)
+        if response.status_code == 200:
+            return response.json().get("models", []) or []
+    except Exception:
+        pass
+    return []
+
+def load_model(model, keep_alive=None, base_url=OLLAMA_URL, timeout=600):
+    """Load a model into memory without generating anything."""
+    payload = {"model": model}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    response = get_session().post(f"{base_url}/api/generate", json=payload, timeout=timeout)
+    return response.status_code == 200
+
+def unload_model(model, base_url=OLLAMA_URL, timeout=30):
+    """Ask Ollama to unload a model immediately (keep_alive: 0)."""
+    try:
+        response = get_session().post(f"{base_url}/api/generate",
+                                      json={"model": model, "keep_alive": 0}, timeout=timeout)
+        return response.status_code == 200
+    except Exception:
+        return False
@@ -0,0 +1,262 @@
+"""
+FaceRunner Batch Utilities - Streamed, concurrent JSONL inference with resumable checkpoints.
+"""
+
+import os
+import json
+import time
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from facerunner.api_utils import OLLAMA_URL, make_session
+
+CHECKPOINT_SUFFIX = ".ckpt"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers (nearest-rank)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+class BatchStats:
+    """Running throughput and latency figures for a batch job."""
+
+    def __init__(self, window=10000):
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.tokens = 0
+        self.latencies = collections.deque(maxlen=window)
+
+    def record(self, result):
+        self.completed += 1
+        if result.get("error"):
+            self.failed += 1
+        self.tokens += result.get("eval_count", 0) or 0
+        self.latencies.append(result.get("latency_ms", 0))
+
+    def snapshot(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "prompts_per_sec": self.completed / elapsed,
+            "tokens_per_sec": self.tokens / elapsed,
+            "p95_ms": percentile(list(self.latencies), 95),
+        }
+
+def iter_jsonl(path, start_offset=0, start_index=0):
+    """
+    Stream records from a JSONL file without loading it into memory.
+    Blank lines are skipped and do not consume an index.
+    Yields:
+        (index, line_end_offset, record): record is the parsed object, or an
+        ``{"error": ...}`` dict when the line is not valid JSON.
+    """
+    index = start_index
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for raw in f:
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if isinstance(record, str):
+                    record = {"prompt": record}
+            except ValueError as e:
+                record = {"error": f"Invalid JSON on input line: {e}"}
+            yield index, offset, record
+            index += 1
+
+def new_checkpoint(input_path, output_offset=0):
+    """Return the progress state of a batch that has not started yet (its results start at output_offset)."""
+    return {"input": os.path.abspath(input_path), "input_offset": 0, "watermark": 0,
+            "output_offset": output_offset, "done": []}
+
+def load_checkpoint(output_path, input_path):
+    """Return the saved progress for an output file, or None if no checkpoint matches the input."""
+    try:
+        with open(output_path + CHECKPOINT_SUFFIX, "r") as f:
+            state = json.load(f)
+        if state.get("input") == os.path.abspath(input_path):
+            return state
+    except (OSError, ValueError):
+        pass
+    return None
+
+def save_checkpoint(output_path, state):
+    """Atomically write batch progress next to the output file."""
+    tmp_path = output_path + CHECKPOINT_SUFFIX + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, output_path + CHECKPOINT_SUFFIX)
+
+def run_prompt(session, record, index, model=None, base_url=OLLAMA_URL, retries=2, timeout=600):
+    """Send one batch record to Ollama (/api/chat for messages, /api/generate otherwise)."""
+    result = {"index": index, "id": record.get("id", index), "model": record.get("model") or model}
+    if record.get("error"):
+        result.update({"error": record["error"], "latency_ms": 0})
+        return result
+    if not result["model"]:
+        result.update({"error": "No model given (set --model or a 'model' field)", "latency_ms": 0})
+        return result
+
+    payload = {"model": result["model"], "stream": False}
+    for key in ("options", "system", "format", "keep_alive", "template"):
+        if key in record:
+            payload[key] = record[key]
+    if "messages" in record:
+        endpoint = "/api/chat"
+        payload["messages"] = record["messages"]
+    else:
+        endpoint = "/api/generate"
+        payload["prompt"] = record.get("prompt", "")
+
+    start = time.time()
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(f"{base_url}{endpoint}", json=payload, timeout=timeout)
+            if response.status_code in RETRY_STATUS and attempt < retries:
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            if response.status_code != 200:
+                result["error"] = f"HTTP {response.status_code}: {response.text[:200]}"
+                break
+            data = response.json()
+            if "messages" in record:
+                result["response"] = data.get("message", {}).get("content", "")
+            else:
+                result["response"] = data.get("response", "")
+            result["eval_count"] = data.get("eval_count", 0)
+            result["prompt_eval_count"] = data.get("prompt_eval_count", 0)
+            break
+        except Exception as e:
+            if attempt < retries:
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            result["error"] = str(e)
+    result["latency_ms"] = round((time.time() - start) * 1000, 1)
+    return result
+
+def run_batch(input_path, output_path, model=None, concurrency=4, ordered=True, base_url=OLLAMA_URL,
+              resume=True, checkpoint_interval=2.0, progress=None, progress_interval=1.0):
+    """
+    Run every prompt in a JSONL file through Ollama and write the results to a JSONL file.
+    Args:
+        input_path (str): JSONL of records with ``prompt`` or ``messages`` (plus optional id, model, options...).
+        output_path (str): JSONL file results are appended to.
+        model (str, optional): Default model for records without a ``model`` field.
+        concurrency (int): Maximum number of requests in flight.
+        ordered (bool): Write results in input order instead of as they complete.
+        resume (bool): Continue from the checkpoint next to output_path if it matches input_path.
+        checkpoint_interval (float): Seconds between checkpoint writes.
+        progress (callable, optional): Called with a stats snapshot at most every progress_interval seconds.
+    Returns:
+        dict: Final stats snapshot.
+    """
+    state = load_checkpoint(output_path, input_path) if resume else None
+    exists = os.path.exists(output_path)
+    out = open(output_path, "r+b" if exists else "wb")
+    if state is None:
+        # A fresh run appends after whatever the output already holds
+        state = new_checkpoint(input_path, output_offset=os.path.getsize(output_path) if exists else 0)
+    else:
+        # Anything written after the last checkpoint is redone, so drop it to avoid duplicates
+        out.truncate(state["output_offset"])
+    out.seek(state["output_offset"])
+    watermark = state["watermark"]
+    done = set(state["done"])
+
+    session = make_session(pool_maxsize=concurrency)
+    stats = BatchStats()
+    if model:
+        from facerunner.usage_utils import record_use
+        record_use(model)
+    # Input offset each unfinished record starts at, so the checkpoint can point at the watermark line
+    line_starts = {}
+    buffered = {}
+    pending = {}
+    last_checkpoint = last_progress = time.time()
+    read_offset = state["input_offset"]
+    window = concurrency * 4 if ordered else concurrency
+
+    def write(result):
+        out.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+        stats.record(result)
+
+    def advance():
+        # Indices in done were written out of order (an --unordered run, or one resumed from it),
+        # so an ordered run steps over them the same way an unordered one does
+        nonlocal watermark
+        while True:
+            if ordered and watermark in buffered:
+                write(buffered.pop(watermark))
+            elif watermark in done:
+                done.discard(watermark)
+            else:
+                break
+            line_starts.pop(watermark, None)
+            watermark += 1
+
+    def checkpoint(force=False):
+        nonlocal last_checkpoint
+        if not force and time.time() - last_checkpoint < checkpoint_interval:
+            return
+        out.flush()
+        state.update({
+            "input_offset": line_starts.get(watermark, read_offset),
+            "watermark": watermark,
+            "output_offset": out.tell(),
+            "done": sorted(done),
+        })
+        save_checkpoint(output_path, state)
+        last_checkpoint = time.time()
+
+    def collect(futures):
+        nonlocal last_progress
+        for future in futures:
+            index = pending.pop(future)
+            result = future.result()
+            if ordered:
+                buffered[index] = result
+            else:
+                write(result)
+                done.add(index)
+        advance()
+        checkpoint()
+        if progress and time.time() - last_progress >= progress_interval:
+            progress(stats.snapshot())
+            last_progress = time.time()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, line_end, record in iter_jsonl(input_path, state["input_offset"], watermark):
+                line_start, read_offset = read_offset, line_end
+                if index in done:
+                    continue
+                while pending and (len(pending) >= concurrency or len(pending) + len(buffered) >= window):
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                line_starts[index] = line_start
+                pending[pool.submit(run_prompt, session, record, index, model, base_url)] = index
+            # Nothing left to read: a finished watermark must point past the last line
+            read_offset = os.path.getsize(input_path)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+    finally:
+        checkpoint(force=True)
+        out.close()
+        session.close()
+
+    final = stats.snapshot()
+    if progress:
+        progress(final)
+    return final
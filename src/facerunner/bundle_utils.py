@@ -0,0 +1,321 @@
+"""
+FaceRunner Bundle Utilities - Export and import model bundles for offline provisioning.
+
+A bundle mirrors the Ollama store layout (``manifests/...`` and ``blobs/sha256-...``)
+plus a ``facerunner-bundle.json`` index, either as an uncompressed tar or as a directory.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import errno
+import tarfile
+import hashlib
+
+from facerunner.store_utils import (
+    get_models_dir, manifest_path, manifest_layers, normalize_model_name, blob_path
+)
+
+INDEX_NAME = "facerunner-bundle.json"
+BLOB_NAME = re.compile(r"sha256-[0-9a-f]{64}")
+COPY_CHUNK = 8 * 1024 * 1024
+# ioctl that makes dst share src's extents on btrfs/XFS (cp --reflink)
+FICLONE = 0x40049409
+
+def copy_range(src_fd, dst_fd, count, src_offset=0):
+    """Copy count bytes between descriptors in the kernel (copy_file_range/sendfile), else by reads."""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, dst_fd, count - copied, src_offset + copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == count:
+                return copied
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, src_offset + copied, count - copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == count:
+                return copied
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise
+    while copied < count:
+        chunk = os.pread(src_fd, min(COPY_CHUNK, count - copied), src_offset + copied)
+        if not chunk:
+            break
+        view = memoryview(chunk)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        copied += len(chunk)
+    return copied
+
+def collect_bundle(models):
+    """
+    Resolve models to their manifests and the de-duplicated set of blobs they need.
+    Returns:
+        (manifests, blobs): manifests is {model: (relative path, raw bytes)}, blobs is {digest: size}.
+    """
+    store = get_models_dir()
+    manifests, blobs = {}, {}
+    for model in models:
+        name = normalize_model_name(model)
+        path = manifest_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{model} is not installed")
+        with open(path, "rb") as f:
+            raw = f.read()
+        manifests[name] = (os.path.relpath(path, store), raw)
+        for layer in manifest_layers(json.loads(raw)):
+            blobs[layer["digest"]] = layer.get("size", 0)
+    return manifests, blobs
+
+def bundle_index(manifests, blobs):
+    """Return the JSON index stored at the start of a bundle."""
+    return json.dumps({"version": 1, "created": time.time(), "models": sorted(manifests),
+                       "manifests": {m: p for m, (p, _) in manifests.items()}, "blobs": blobs},
+                      indent=2).encode("utf-8")
+
+def write_tar_member(out_fd, name, size, src_fd=None, data=None):
+    """Write one ustar member: header, body (kernel copy from src_fd, or data) and padding."""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    os.write(out_fd, info.tobuf(format=tarfile.PAX_FORMAT))
+    if data is not None:
+        os.write(out_fd, data)
+    else:
+        copy_range(src_fd, out_fd, size)
+    padding = (tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE) % tarfile.BLOCKSIZE
+    if padding:
+        os.write(out_fd, b"\0" * padding)
+
+def export_tar(models, output, progress=None):
+    """
+    Stream models into an uncompressed tar without staging copies.
+    Blob bodies go straight from the store to the output with copy_file_range/sendfile.
+    Args:
+        models (list): Installed model references.
+        output (str): Tar path, or "-" for stdout.
+        progress (callable, optional): Called with (bytes_done, bytes_total) after each blob.
+    Returns:
+        dict: models, blobs and bytes written.
+    """
+    manifests, blobs = collect_bundle(models)
+    index = bundle_index(manifests, blobs)
+    out_fd = sys.stdout.fileno() if output == "-" else os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    total, done = sum(blobs.values()), 0
+    try:
+        write_tar_member(out_fd, INDEX_NAME, len(index), data=index)
+        for digest, size in sorted(blobs.items()):
+            src_fd = os.open(blob_path(digest), os.O_RDONLY)
+            try:
+                write_tar_member(out_fd, f"blobs/{digest.replace(':', '-')}", os.fstat(src_fd).st_size, src_fd=src_fd)
+            finally:
+                os.close(src_fd)
+            done += size
+            if progress:
+                progress(done, total)
+        # Manifests last, so a truncated bundle never references blobs it does not contain
+        for rel, raw in manifests.values():
+            write_tar_member(out_fd, rel, len(raw), data=raw)
+        os.write(out_fd, b"\0" * tarfile.BLOCKSIZE * 2)
+    finally:
+        if output != "-":
+            os.close(out_fd)
+    return {"models": sorted(manifests), "blobs": len(blobs), "bytes": total}
+
+def link_or_copy(src, dst):
+    """Place src at dst by hard link, then reflink, then in-kernel copy. Returns the method used."""
+    tmp = dst + ".facerunner-tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+        return "link"
+    except OSError:
+        pass
+    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+        method = "copy"
+        try:
+            import fcntl
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            method = "reflink"
+        except (ImportError, OSError):
+            copy_range(fin.fileno(), fout.fileno(), os.fstat(fin.fileno()).st_size)
+        fout.flush()
+        os.fsync(fout.fileno())
+    os.replace(tmp, dst)
+    return method
+
+def export_dir(models, output, progress=None):
+    """Write models into a directory bundle, hard-linking or reflinking blobs where possible."""
+    manifests, blobs = collect_bundle(models)
+    os.makedirs(os.path.join(output, "blobs"), exist_ok=True)
+    total, done = sum(blobs.values()), 0
+    methods = {}
+    for digest, size in sorted(blobs.items()):
+        dst = os.path.join(output, "blobs", digest.replace(":", "-"))
+        if not (os.path.exists(dst) and os.path.getsize(dst) == size):
+            method = link_or_copy(os.path.realpath(blob_path(digest)), dst)
+            methods[method] = methods.get(method, 0) + 1
+        done += size
+        if progress:
+            progress(done, total)
+    for rel, raw in manifests.values():
+        path = os.path.join(output, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(raw)
+    with open(os.path.join(output, INDEX_NAME), "wb") as f:
+        f.write(bundle_index(manifests, blobs))
+    return {"models": sorted(manifests), "blobs": len(blobs), "bytes": total, "methods": methods}
+
+def blob_present(digest, size):
+    """Return True if the store already holds a blob of the expected size."""
+    path = blob_path(digest)
+    return os.path.exists(path) and (size is None or os.path.getsize(path) == size)
+
+def check_digest(digest):
+    """Return digest if it is a well-formed sha256 digest; raise ValueError otherwise."""
+    if not BLOB_NAME.fullmatch(str(digest).replace(":", "-", 1)):
+        raise ValueError(f"Bundle names an invalid blob digest: {digest!r}")
+    return digest
+
+def manifest_target(rel, root):
+    """Resolve a bundle's manifest path under root, raising ValueError if it would leave root/manifests."""
+    manifests = os.path.realpath(os.path.join(root, "manifests"))
+    path = os.path.realpath(os.path.join(root, os.path.normpath(str(rel))))
+    if os.path.isabs(rel) or not path.startswith(manifests + os.sep):
+        raise ValueError(f"Bundle manifest path escapes the manifests directory: {rel!r}")
+    return path
+
+def write_manifest(rel, raw, store):
+    """Atomically install a manifest into the store (rel must stay under <store>/manifests)."""
+    path = manifest_target(rel, store)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".facerunner-tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+
+def import_dir(bundle, verify=True, progress=None):
+    """
+    Import a directory bundle, hard-linking or reflinking blobs when on the same filesystem.
+    New blobs are hashed before they are linked in unless verify is False.
+    """
+    store = get_models_dir()
+    with open(os.path.join(bundle, INDEX_NAME), "rb") as f:
+        index = json.load(f)
+    os.makedirs(os.path.join(store, "blobs"), exist_ok=True)
+    report = {"models": index["models"], "imported": 0, "skipped": 0, "bytes": 0, "methods": {}}
+    total, done = sum(index["blobs"].values()), 0
+    for digest, size in sorted(index["blobs"].items()):
+        src = os.path.join(bundle, "blobs", check_digest(digest).replace(":", "-"))
+        if blob_present(digest, size):
+            report["skipped"] += 1
+        else:
+            if verify:
+                verify_file(src, digest)
+            method = link_or_copy(src, blob_path(digest))
+            report["methods"][method] = report["methods"].get(method, 0) + 1
+            report["imported"] += 1
+            report["bytes"] += size
+        done += size
+        if progress:
+            progress(done, total)
+    for model in index["models"]:
+        rel = index["manifests"][model]
+        with open(manifest_target(rel, bundle), "rb") as f:
+            write_manifest(rel, f.read(), store)
+    return report
+
+def verify_file(path, digest):
+    """Raise if a file's SHA-256 does not match its digest."""
+    from facerunner.fsck_utils import hash_file
+    algo, expected = digest.split(":", 1)
+    if hash_file(path, algo) != expected:
+        raise IOError(f"Bundle blob {digest} is corrupt")
+
+def import_tar(bundle, progress=None):
+    """
+    Import a tar bundle. Members are read once, in order; blobs already in the store are
+    skipped and new ones are hashed while they stream in, then renamed into place.
+    """
+    store = get_models_dir()
+    os.makedirs(os.path.join(store, "blobs"), exist_ok=True)
+    report = {"models": [], "imported": 0, "skipped": 0, "bytes": 0, "methods": {}}
+    manifests, index, done = {}, {}, 0
+    source = sys.stdin.buffer if bundle == "-" else open(bundle, "rb")
+    try:
+        with tarfile.open(fileobj=source, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if member.name == INDEX_NAME:
+                    index = json.loads(tar.extractfile(member).read())
+                    report["models"] = index.get("models", [])
+                elif member.name.startswith("blobs/"):
+                    name = member.name[len("blobs/"):]
+                    if not BLOB_NAME.fullmatch(name):
+                        raise ValueError(f"Bundle member is not a sha256 blob: {member.name!r}")
+                    digest = name.replace("-", ":", 1)
+                    if blob_present(digest, member.size):
+                        report["skipped"] += 1
+                    else:
+                        stream_blob(tar.extractfile(member), digest)
+                        report["imported"] += 1
+                        report["bytes"] += member.size
+                        report["methods"]["stream"] = report["methods"].get("stream", 0) + 1
+                    done += member.size
+                    if progress:
+                        progress(done, sum(index.get("blobs", {}).values()) or done)
+                elif member.name.startswith("manifests/"):
+                    manifest_target(member.name, store)
+                    manifests[member.name] = tar.extractfile(member).read()
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    for rel, raw in manifests.items():
+        write_manifest(rel, raw, store)
+    return report
+
+def stream_blob(fileobj, digest):
+    """Write a blob from a stream into the store, verifying its digest before the final rename."""
+    algo, expected = digest.split(":", 1)
+    hasher = hashlib.new(algo)
+    dst = blob_path(digest)
+    tmp = dst + ".facerunner-tmp"
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = fileobj.read(COPY_CHUNK)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            out.write(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    if hasher.hexdigest() != expected:
+        os.remove(tmp)
+        raise IOError(f"Bundle blob {digest} is corrupt")
+    os.replace(tmp, dst)
+
+def import_bundle(bundle, verify=True, progress=None):
+    """Import a directory or tar bundle into the local store."""
+    if bundle != "-" and os.path.isdir(bundle):
+        return import_dir(bundle, verify=verify, progress=progress)
+    return import_tar(bundle, progress=progress)
@@ -0,0 +1,73 @@
+"""
+FaceRunner Config Utilities - Settings loaded from ~/.facerunner/config.yaml.
+"""
+
+import os
+import copy
+
+FACERUNNER_HOME = os.path.expanduser("~/.facerunner")
+CONFIG_PATH = os.path.join(FACERUNNER_HOME, "config.yaml")
+
+DEFAULT_CONFIG = {
+    # Model admission: "warn" prints a warning, "refuse" blocks the pull/load, "off" skips the check
+    "admission": "warn",
+    # Unload least-recently-used models (keep_alive: 0) to make room for a new one
+    "evict_lru": False,
+    # Upper bound (GB) for the memory all loaded models may use together; None means free RAM + VRAM
+    "memory_budget_gb": None,
+    # Multiplier on weight size to account for KV cache and compute buffers
+    "memory_overhead": 1.2,
+    # Free disk space (GB) to keep in reserve after a pull
+    "disk_reserve_gb": 2,
+    # Models whose blobs `facerunner start` prefetches into the page cache
+    "hot_models": [],
+    # Start the Prometheus /metrics exporter with `facerunner start`
+    "metrics_exporter": False,
+    "metrics_port": 9464,
+    # Seconds between exporter samples; scrapes are served from the latest sample
+    "metrics_interval": 5,
+    # Start Open WebUI and the FaceRunner UI on their first connection instead of at `facerunner start`
+    "on_demand": False,
+    # Minutes without an open connection before an on-demand service is stopped again
+    "idle_timeout_minutes": 30,
+    # Have `facerunner start` run Ollama and Open WebUI under the restarting watchdog
+    "watchdog": False,
+    # Overrides for the watchdog's probe, backoff and crash-loop settings (see watchdog_utils)
+    "watchdog_policy": {},
+    # Background workers the web UI runs for queued pulls and removals
+    "job_workers": 2,
+    # Global cap on model downloads, e.g. "20M" (bytes/s) or "100mbit"; None means unlimited
+    "pull_bandwidth_limit": None,
+    # Only download during these local-time windows, e.g. "22:00-06:00"; None means any time
+    "pull_windows": None,
+    # Pause downloads while load average per core, Ollama API latency (ms) or GPU utilisation (%) is above these
+    "pull_pause_load": None,
+    "pull_pause_latency_ms": None,
+    "pull_pause_gpu_util": None,
+    # Record host and service samples to ~/.facerunner/telemetry.db (web UI and `facerunner start`)
+    "telemetry": True,
+    "telemetry_interval": 1,
+    # Where `facerunner setup` caches open-webui wheels and the Ollama installer; None means ~/.facerunner/cache
+    "setup_cache_dir": None,
+    # Overrides for the Ollama simulator's models, speeds, limits and error rate (see simulator_utils)
+    "simulator": {},
+}
+
+def load_config():
+    """Load FaceRunner settings, falling back to defaults for missing keys."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if os.path.exists(CONFIG_PATH):
+        try:
+            import yaml
+            with open(CONFIG_PATH, 'r') as f:
+                data = yaml.safe_load(f) or {}
+            if isinstance(data, dict):
+                config.update(data)
+        except Exception:
+            pass
+    return config
+
+def get_setting(key, default=None):
+    """Return a single setting from the FaceRunner config."""
+    value = load_config().get(key)
+    return default if value is None else value
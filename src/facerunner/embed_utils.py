@@ -0,0 +1,233 @@
+"""
+FaceRunner Embed Utilities - Bulk embedding into a memory-mapped float32 .npy file.
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from facerunner.api_utils import OLLAMA_URL, make_session
+from facerunner.batch_utils import save_checkpoint
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+TEXT_FIELDS = ("text", "input", "content", "prompt")
+
+def expand_inputs(paths):
+    """Expand files and directories into a sorted, de-duplicated list of input files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.join(dirpath, name) for name in filenames)
+        else:
+            files.append(path)
+    return sorted(set(os.path.abspath(f) for f in files))
+
+def iter_texts(files):
+    """
+    Stream (id, text) pairs from text and JSONL files.
+    JSONL lines use the first of text/input/content/prompt and an optional ``id``;
+    every non-empty line of any other file is one input, identified as ``path:line``.
+    """
+    for path in files:
+        is_jsonl = path.endswith(JSONL_SUFFIXES)
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.rstrip("\n")
+                if not line.strip():
+                    continue
+                if is_jsonl:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, str):
+                        yield f"{path}:{lineno}", record
+                        continue
+                    text = next((record[k] for k in TEXT_FIELDS if isinstance(record.get(k), str)), None)
+                    if text is not None:
+                        yield record.get("id", f"{path}:{lineno}"), text
+                else:
+                    yield f"{path}:{lineno}", line
+
+def sidecar_paths(output_path):
+    """Return the (ids, checkpoint) paths that accompany an output .npy file."""
+    stem = output_path[:-4] if output_path.endswith(".npy") else output_path
+    return stem + ".ids.jsonl", output_path + ".ckpt"
+
+def embed_texts(session, model, texts, base_url=OLLAMA_URL, timeout=300):
+    """Embed a list of texts with one /api/embed call and return the list of vectors."""
+    response = session.post(f"{base_url}/api/embed", json={"model": model, "input": texts}, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    embeddings = response.json().get("embeddings", [])
+    if len(embeddings) != len(texts):
+        raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+    return embeddings
+
+class AdaptiveBatchSize:
+    """Grow the batch size while batches finish under the target latency, halve it on slow or failed batches."""
+
+    def __init__(self, initial=32, minimum=1, maximum=1024, target_seconds=2.0):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target_seconds
+
+    def update(self, seconds, ok=True):
+        if not ok or seconds > self.target:
+            self.size = max(self.minimum, self.size // 2)
+        elif seconds < self.target / 2:
+            self.size = min(self.maximum, self.size * 2)
+
+def load_embed_checkpoint(checkpoint_path, files, model):
+    """Return saved embedding progress if it matches these inputs and model, else None."""
+    try:
+        with open(checkpoint_path, "r") as f:
+            state = json.load(f)
+        if state.get("inputs") == files and state.get("model") == model:
+            return state
+    except (OSError, ValueError):
+        pass
+    return None
+
+def run_embed(paths, output_path, model, concurrency=4, batch_size=32, max_batch_size=1024,
+              target_seconds=2.0, base_url=OLLAMA_URL, resume=True, checkpoint_interval=2.0,
+              progress=None, progress_interval=1.0):
+    """
+    Embed every input text and write the vectors into a preallocated memory-mapped .npy file.
+    The first pass streams the inputs once to count them and write the id sidecar; the
+    second pass embeds contiguous row ranges concurrently and writes each batch straight
+    into its rows of the memmap, so vectors are never all held in RAM.
+    Args:
+        paths (list): Text/JSONL files or directories.
+        output_path (str): Destination .npy file (float32, shape rows x dim).
+        model (str): Ollama embedding model.
+        concurrency (int): Maximum batches in flight.
+        batch_size (int): Initial batch size; adapted towards target_seconds per batch.
+        resume (bool): Continue from the checkpoint if inputs and model match.
+        progress (callable, optional): Called with a stats dict at most every progress_interval seconds.
+    Returns:
+        dict: rows, dim, embedded (this run), elapsed and vectors_per_sec.
+    """
+    import numpy as np
+    from numpy.lib.format import open_memmap
+
+    files = expand_inputs(paths)
+    ids_path, checkpoint_path = sidecar_paths(output_path)
+    session = make_session(pool_maxsize=concurrency)
+    state = load_embed_checkpoint(checkpoint_path, files, model) if resume else None
+
+    if state is None or not os.path.exists(output_path):
+        rows = 0
+        with open(ids_path, "w", encoding="utf-8") as ids_file:
+            for item_id, _ in iter_texts(files):
+                ids_file.write(json.dumps(item_id, ensure_ascii=False) + "\n")
+                rows += 1
+        if rows == 0:
+            raise ValueError("No input texts found.")
+        first_text = next(iter_texts(files))[1]
+        dim = len(embed_texts(session, model, [first_text], base_url)[0])
+        vectors = open_memmap(output_path, mode="w+", dtype=np.float32, shape=(rows, dim))
+        state = {"inputs": files, "model": model, "rows": rows, "dim": dim, "watermark": 0, "done": []}
+        save_checkpoint(output_path, state)
+    else:
+        vectors = open_memmap(output_path, mode="r+")
+
+    rows = state["rows"]
+    watermark = state["watermark"]
+    done = {tuple(r) for r in state["done"]}
+    done_starts = {start: end for start, end in done}
+    sizer = AdaptiveBatchSize(batch_size, maximum=max_batch_size, target_seconds=target_seconds)
+    started = last_checkpoint = last_progress = time.time()
+    embedded = 0
+    pending = {}
+
+    def embed_range(start, texts):
+        """Embed rows [start, start + len(texts)), splitting the batch if Ollama rejects it."""
+        t0 = time.time()
+        try:
+            result = embed_texts(session, model, texts, base_url)
+        except Exception:
+            sizer.update(time.time() - t0, ok=False)
+            if len(texts) == 1:
+                raise
+            half = len(texts) // 2
+            embed_range(start, texts[:half])
+            embed_range(start + half, texts[half:])
+            return
+        sizer.update(time.time() - t0)
+        vectors[start:start + len(texts)] = np.asarray(result, dtype=np.float32)
+
+    def stats():
+        elapsed = max(time.time() - started, 1e-9)
+        return {"rows": rows, "dim": state["dim"], "completed": watermark + sum(e - s for s, e in done),
+                "embedded": embedded, "batch_size": sizer.size, "elapsed": elapsed,
+                "vectors_per_sec": embedded / elapsed}
+
+    def checkpoint(force=False):
+        nonlocal last_checkpoint
+        if not force and time.time() - last_checkpoint < checkpoint_interval:
+            return
+        vectors.flush()
+        state.update({"watermark": watermark, "done": sorted(done)})
+        save_checkpoint(output_path, state)
+        last_checkpoint = time.time()
+
+    def collect(futures):
+        nonlocal watermark, embedded, last_progress
+        for future in futures:
+            start, end = pending.pop(future)
+            future.result()
+            embedded += end - start
+            done.add((start, end))
+            done_starts[start] = end
+        while watermark in done_starts:
+            end = done_starts.pop(watermark)
+            done.discard((watermark, end))
+            watermark = end
+        checkpoint()
+        if progress and time.time() - last_progress >= progress_interval:
+            progress(stats())
+            last_progress = time.time()
+
+    def submit(pool, start, texts):
+        while len(pending) >= concurrency:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+        pending[pool.submit(embed_range, start, texts)] = (start, start + len(texts))
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            batch_start, batch = 0, []
+            skip_until = watermark
+            for row, (_, text) in enumerate(iter_texts(files)):
+                if row >= rows:
+                    break
+                if row in done_starts:
+                    skip_until = done_starts[row]
+                if row < skip_until:
+                    if batch:
+                        submit(pool, batch_start, batch)
+                        batch = []
+                    continue
+                if not batch:
+                    batch_start = row
+                batch.append(text)
+                if len(batch) >= sizer.size:
+                    submit(pool, batch_start, batch)
+                    batch = []
+            if batch:
+                submit(pool, batch_start, batch)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+    finally:
+        checkpoint(force=True)
+        session.close()
+
+    final = stats()
+    if progress:
+        progress(final)
+    return final
@@ -0,0 +1,162 @@
+"""
+FaceRunner Fleet Utilities - Probe and manage many Ollama hosts concurrently from one machine.
+"""
+
+import os
+import json
+import asyncio
+from collections import Counter
+from urllib.parse import urlsplit
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+OLLAMA_PORT = 11434
+HOSTS_PATH = os.path.join(FACERUNNER_HOME, "hosts.yaml")
+
+def parse_host(entry):
+    """Turn an inventory entry ("gpu01", "gpu01:11434", a URL or {name, url, memory_gb}) into a host dict."""
+    if isinstance(entry, dict):
+        url = entry.get("url") or entry.get("host") or entry.get("name")
+        host = parse_host(url)
+        host["name"] = entry.get("name") or host["name"]
+        host["memory_gb"] = entry.get("memory_gb")
+        return host
+    url = str(entry).strip()
+    if "://" not in url:
+        url = f"http://{url}"
+    parts = urlsplit(url)
+    port = parts.port or OLLAMA_PORT
+    return {"name": parts.hostname if parts.port in (None, OLLAMA_PORT) else f"{parts.hostname}:{port}",
+            "host": parts.hostname, "port": port, "memory_gb": None}
+
+def load_hosts(path=None):
+    """
+    Read the hosts inventory (default ~/.facerunner/hosts.yaml).
+    The file is a YAML list, or a mapping with a "hosts" list, of host names, host:port,
+    URLs or {name, url, memory_gb} entries.
+    """
+    import yaml
+    path = path or HOSTS_PATH
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or []
+    if isinstance(data, dict):
+        data = data.get("hosts", [])
+    return [parse_host(entry) for entry in data]
+
+async def http_json(host, method, path, payload=None):
+    """Make one HTTP/1.1 request to a host and return (status, decoded JSON or None)."""
+    reader, writer = await asyncio.open_connection(host["host"], host["port"])
+    try:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        request = (f"{method} {path} HTTP/1.1\r\nHost: {host['host']}:{host['port']}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                   f"Connection: close\r\n\r\n").encode("ascii") + body
+        writer.write(request)
+        await writer.drain()
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise ValueError("HTTP response headers too large") from None
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            status = int(lines[0].split()[1])
+        except (IndexError, ValueError):
+            raise ValueError(f"malformed HTTP status line {lines[0][:60]!r}") from None
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    break
+                data += await reader.readexactly(size)
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+    finally:
+        writer.close()
+    try:
+        return status, json.loads(data) if data else None
+    except ValueError:
+        return status, None
+
+async def probe_host(host):
+    """Collect version, loaded models and installed models from one host."""
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    _, version = await http_json(host, "GET", "/api/version")
+    latency = loop.time() - start
+    _, ps = await http_json(host, "GET", "/api/ps")
+    _, tags = await http_json(host, "GET", "/api/tags")
+    loaded = (ps or {}).get("models") or []
+    loaded_bytes = sum(m.get("size", 0) for m in loaded)
+    free = None
+    if host.get("memory_gb"):
+        free = host["memory_gb"] * 1024 ** 3 - loaded_bytes
+    return {"version": (version or {}).get("version", "?"), "latency": latency,
+            "loaded": [m.get("name") for m in loaded], "loaded_bytes": loaded_bytes, "free_bytes": free,
+            "models": sorted(m.get("name") for m in (tags or {}).get("models") or [])}
+
+async def pull_on_host(host, model):
+    """Pull a model on one host (blocks until the pull completes)."""
+    status, data = await http_json(host, "POST", "/api/pull", {"model": model, "stream": False})
+    if status != 200 or (data or {}).get("status") != "success":
+        raise RuntimeError((data or {}).get("error") or f"HTTP {status}")
+    return {"model": model}
+
+async def warm_on_host(host, model, keep_alive=None):
+    """Load a model into memory on one host."""
+    payload = {"model": model}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    status, data = await http_json(host, "POST", "/api/generate", payload)
+    if status != 200:
+        raise RuntimeError((data or {}).get("error") or f"HTTP {status}")
+    return {"model": model}
+
+async def fan_out(hosts, action, timeout, concurrency):
+    """Run action(host) on every host, at most `concurrency` at once, each bounded by `timeout` seconds."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(host):
+        async with semaphore:
+            loop = asyncio.get_event_loop()
+            start = loop.time()
+            try:
+                data = await asyncio.wait_for(action(host), timeout)
+                return {"host": host["name"], "ok": True, "error": None, "elapsed": loop.time() - start, **data}
+            except asyncio.TimeoutError:
+                error = f"timed out after {timeout:g}s"
+            except (OSError, ValueError, RuntimeError, asyncio.IncompleteReadError) as e:
+                error = str(e) or e.__class__.__name__
+            except Exception as e:
+                # Any other misbehaviour (e.g. unexpected JSON) fails this host, not the whole fan-out
+                error = f"{e.__class__.__name__}: {e}"
+            return {"host": host["name"], "ok": False, "error": error, "elapsed": loop.time() - start}
+
+    return await asyncio.gather(*(run(host) for host in hosts))
+
+def run_fleet(hosts, action, timeout=5, concurrency=16):
+    """Synchronous entry point for fan_out; results keep the inventory order."""
+    return asyncio.run(fan_out(hosts, action, timeout, concurrency))
+
+def fleet_status(hosts, timeout=5, concurrency=16):
+    """Probe every host and flag version drift against the most common version."""
+    results = run_fleet(hosts, probe_host, timeout, concurrency)
+    versions = Counter(r["version"] for r in results if r["ok"])
+    baseline = versions.most_common(1)[0][0] if versions else None
+    for r in results:
+        r["drift"] = r["ok"] and r["version"] != baseline
+    return results, baseline
+
+def model_matrix(results):
+    """Return (models, {host: set(models)}) for the hosts that answered."""
+    installed = {r["host"]: set(r["models"]) for r in results if r["ok"]}
+    models = sorted(set().union(*installed.values())) if installed else []
+    return models, installed
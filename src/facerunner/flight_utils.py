@@ -0,0 +1,122 @@
+"""
+FaceRunner Flight Utilities - Single-flight coalescing of identical backend calls.
+
+Every Streamlit session runs in its own thread of one server process. When several
+sessions ask for the same thing at once (`ollama list`, a service probe, the model
+catalog), the first caller runs it and the others wait for and share its result.
+With a ttl, a finished result is also shared with callers that arrive shortly after.
+Errors are shared with the callers that were waiting but never cached.
+"""
+
+import time
+import functools
+import threading
+
+# Completed entries are pruned once the table grows past this many keys
+MAX_ENTRIES = 256
+
+_flights = None
+_flights_lock = threading.Lock()
+
+class Flight:
+    """One execution and the callers waiting on it."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.done_at = None
+
+    def fresh(self, now, ttl):
+        """Return True if callers may share this flight: still running, or finished within ttl."""
+        if not self.event.is_set():
+            return True
+        return self.error is None and ttl > 0 and now - self.done_at < ttl
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.stats = {"calls": 0, "executions": 0, "shared": 0}
+
+    def do(self, key, fn, ttl=0.0):
+        """
+        Run fn() once per key at a time and return its result to every caller.
+        Args:
+            key: Hashable identity of the operation.
+            fn (callable): The operation (no arguments).
+            ttl (float): Seconds a finished result keeps being shared (0 = only while in flight).
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.stats["calls"] += 1
+            flight = self.flights.get(key)
+            leader = flight is None or not flight.fresh(now, ttl)
+            if leader:
+                flight = Flight(ttl)
+                self.flights[key] = flight
+                self.stats["executions"] += 1
+                if len(self.flights) > MAX_ENTRIES:
+                    self.prune(now)
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            flight.done_at = time.monotonic()
+            flight.event.set()
+            if flight.error is not None or ttl <= 0:
+                with self.lock:
+                    if self.flights.get(key) is flight:
+                        del self.flights[key]
+
+    def prune(self, now):
+        """Drop finished entries whose ttl has passed (caller holds the lock)."""
+        for key in [k for k, f in self.flights.items() if f.event.is_set() and now - f.done_at >= f.ttl]:
+            del self.flights[key]
+
+    def forget(self, key):
+        """Drop a cached result so the next call runs again (e.g. after a pull changes `ollama list`)."""
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None and flight.event.is_set():
+                del self.flights[key]
+
+def get_flights():
+    """Return the process-wide coalescing table shared by every UI session."""
+    global _flights
+    if _flights is None:
+        with _flights_lock:
+            if _flights is None:
+                _flights = SingleFlight()
+    return _flights
+
+def flight_key(fn, args, kwargs):
+    """Return the coalescing key for a call to fn."""
+    return (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+
+def coalesced(ttl=0.0):
+    """
+    Decorator: identical concurrent calls (same function and arguments) share one execution.
+    Args:
+        ttl (float): Seconds a finished result is shared with later callers (0 = in-flight only).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return get_flights().do(flight_key(fn, args, kwargs), lambda: fn(*args, **kwargs), ttl)
+        wrapper.forget = lambda *args, **kwargs: get_flights().forget(flight_key(fn, args, kwargs))
+        return wrapper
+    return decorate
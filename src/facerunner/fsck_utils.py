@@ -0,0 +1,162 @@
+"""
+FaceRunner Fsck Utilities - Verify model blobs against their content-addressed digests.
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from facerunner.config_utils import FACERUNNER_HOME
+from facerunner.store_utils import get_models_dir, list_local_models, manifest_layers
+
+FSCK_CACHE_PATH = os.path.join(FACERUNNER_HOME, "fsck_cache.json")
+HASH_CHUNK = 8 * 1024 * 1024
+
+def hash_file(path, algo="sha256"):
+    """Hash a file with large buffered reads into a reusable buffer."""
+    hasher = hashlib.new(algo)
+    buf = bytearray(HASH_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            got = f.readinto(buf)
+            if not got:
+                break
+            hasher.update(view[:got])
+    return hasher.hexdigest()
+
+def verify_blob(path, digest):
+    """Return (digest, ok, error) for one blob; runs in a worker process."""
+    try:
+        algo, expected = digest.split(":", 1)
+        return digest, hash_file(path, algo) == expected, None
+    except (OSError, ValueError) as e:
+        return digest, False, str(e)
+
+def load_fsck_cache():
+    """Return {digest: [inode, size, mtime_ns]} of blobs that verified clean on an earlier run."""
+    try:
+        with open(FSCK_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_fsck_cache(cache):
+    """Atomically write the fsck cache."""
+    os.makedirs(FACERUNNER_HOME, exist_ok=True)
+    tmp_path = FSCK_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, FSCK_CACHE_PATH)
+
+def stat_key(path):
+    """Return the (inode, size, mtime_ns) identity of the file behind path."""
+    st = os.stat(path)
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+def scan_store(models_dir=None):
+    """
+    Collect blobs on disk and the blobs each installed model references.
+    Returns:
+        (blobs, references, sizes): blobs is {digest: path} for files in blobs/,
+        references is {digest: [model, ...]}, sizes is {digest: size from the manifest}.
+    """
+    models_dir = models_dir or get_models_dir()
+    blob_dir = os.path.join(models_dir, "blobs")
+    blobs = {}
+    if os.path.isdir(blob_dir):
+        for name in os.listdir(blob_dir):
+            # Skip in-progress downloads and FaceRunner's own temporary files
+            if name.startswith("sha256-") and "-partial" not in name and "." not in name:
+                blobs[name.replace("-", ":", 1)] = os.path.join(blob_dir, name)
+    references, sizes = {}, {}
+    for name, path in list_local_models(models_dir):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            references.setdefault(f"manifest:{path}", []).append(name)
+            continue
+        for layer in manifest_layers(manifest):
+            references.setdefault(layer["digest"], []).append(name)
+            sizes[layer["digest"]] = layer.get("size")
+    return blobs, references, sizes
+
+def run_fsck(workers=None, use_cache=True, models_dir=None, progress=None):
+    """
+    Verify every blob's SHA-256 against its filename and check manifest references.
+    Blobs whose (inode, size, mtime) match a previous clean run are skipped.
+    Args:
+        workers (int, optional): Hashing processes (default: CPU count).
+        use_cache (bool): Skip blobs that verified clean before and have not changed.
+        progress (callable, optional): Called with (checked, to_check) after each blob.
+    Returns:
+        dict: corrupt, missing, orphaned (digest lists), bad_manifests, affected_models,
+        checked and skipped counts.
+    """
+    blobs, references, sizes = scan_store(models_dir)
+    cache = load_fsck_cache() if use_cache else {}
+    report = {"corrupt": [], "missing": [], "orphaned": [], "bad_manifests": [], "affected_models": [],
+              "checked": 0, "skipped": 0}
+
+    for digest, models in references.items():
+        if digest.startswith("manifest:"):
+            report["bad_manifests"].append(digest.split(":", 1)[1])
+            report["affected_models"].extend(models)
+        elif digest not in blobs:
+            report["missing"].append(digest)
+            report["affected_models"].extend(models)
+    report["orphaned"] = sorted(d for d in blobs if d not in references)
+
+    to_check, keys = [], {}
+    for digest, path in blobs.items():
+        try:
+            keys[digest] = stat_key(path)
+        except OSError:
+            report["missing"].append(digest)
+            report["affected_models"].extend(references.get(digest, []))
+            continue
+        expected_size = sizes.get(digest)
+        if expected_size is not None and keys[digest][1] != expected_size:
+            report["corrupt"].append(digest)
+            report["affected_models"].extend(references.get(digest, []))
+            continue
+        if cache.get(digest) == keys[digest]:
+            report["skipped"] += 1
+            continue
+        to_check.append((path, digest))
+
+    clean = {d: k for d, k in cache.items() if d in blobs and keys.get(d) == k}
+    if to_check:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = [pool.submit(verify_blob, path, digest) for path, digest in to_check]
+            for future in as_completed(futures):
+                digest, ok, error = future.result()
+                report["checked"] += 1
+                if ok:
+                    clean[digest] = keys[digest]
+                else:
+                    report["corrupt"].append(digest)
+                    report["affected_models"].extend(references.get(digest, []))
+                if progress:
+                    progress(report["checked"], len(to_check))
+    save_fsck_cache(clean)
+
+    report["corrupt"].sort()
+    report["missing"].sort()
+    report["affected_models"] = sorted(set(report["affected_models"]))
+    return report
+
+def remove_corrupt_blobs(report, models_dir=None):
+    """Delete corrupt blob files so a re-pull downloads them again instead of trusting them."""
+    blob_dir = os.path.join(models_dir or get_models_dir(), "blobs")
+    removed = []
+    for digest in report["corrupt"]:
+        path = os.path.join(blob_dir, digest.replace(":", "-"))
+        real = os.path.realpath(path)
+        for target in {path, real}:
+            if os.path.lexists(target):
+                os.remove(target)
+        removed.append(digest)
+    return removed
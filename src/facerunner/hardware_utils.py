@@ -0,0 +1,263 @@
+"""
+FaceRunner Hardware Utilities - A persisted inventory of this host's hardware.
+
+The inventory (GPUs, CPU model and flags, cores, NUMA nodes, RAM, disk types, primary
+IP) is collected once - at `facerunner setup` / `start` or when it goes stale - and
+saved to ~/.facerunner/hardware.json. Readers revalidate it with a cheap fingerprint
+(boot time, hostname, CPU count, NVIDIA device nodes, interface addresses) instead of
+forking nvidia-smi or opening sockets on every call.
+"""
+
+import os
+import glob
+import json
+import time
+import shutil
+import socket
+import platform
+import threading
+import subprocess
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+HARDWARE_PATH = os.path.join(FACERUNNER_HOME, "hardware.json")
+INVENTORY_VERSION = 1
+# Re-collect even if the fingerprint is unchanged after this long
+MAX_AGE_SECONDS = 7 * 24 * 3600
+# How often a long-running process (the web UI) re-checks the fingerprint
+REVALIDATE_SECONDS = 60
+# CPU flags that matter for llama.cpp / Ollama kernels
+CPU_FLAGS = ("avx", "avx2", "fma", "f16c", "avx512f", "avx512bw", "avx512_vnni", "avx512_bf16",
+             "avx_vnni", "amx_tile", "amx_bf16", "amx_int8", "neon", "asimd", "sve")
+
+_inventory = None
+_checked_at = 0.0
+_inventory_lock = threading.Lock()
+
+def detect_gpus():
+    """Return NVIDIA GPUs as [{name, memory_total, uuid, driver}]; skips the exec when nvidia-smi is absent."""
+    if not shutil.which("nvidia-smi"):
+        return []
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total,uuid,driver_version", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, timeout=15
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    if result.returncode != 0:
+        return []
+    gpus = []
+    for line in result.stdout.strip().split('\n'):
+        parts = [p.strip() for p in line.split(',')]
+        if len(parts) == 4:
+            try:
+                memory_total = int(float(parts[1])) * 1024 * 1024
+            except ValueError:
+                memory_total = 0
+            gpus.append({"name": parts[0], "memory_total": memory_total, "uuid": parts[2], "driver": parts[3]})
+    return gpus
+
+def detect_cpu():
+    """Return {model, flags, logical_cores, physical_cores, arch} for the host CPU."""
+    model, flags = "", set()
+    system = platform.system()
+    if system == "Linux":
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    key = key.strip().lower()
+                    if key == "model name" and not model:
+                        model = value.strip()
+                    elif key in ("flags", "features") and not flags:
+                        flags = set(value.split())
+        except OSError:
+            pass
+    elif system == "Darwin":
+        try:
+            result = subprocess.run(["sysctl", "-n", "machdep.cpu.brand_string"], capture_output=True, text=True)
+            if result.returncode == 0 and result.stdout.strip():
+                model = result.stdout.strip()
+            result = subprocess.run(["sysctl", "-n", "machdep.cpu.features", "machdep.cpu.leaf7_features"],
+                                    capture_output=True, text=True)
+            flags = set(result.stdout.lower().replace(".", "_").split())
+        except OSError:
+            pass
+        if platform.machine() == "arm64":
+            flags.add("neon")
+    model = model or platform.processor() or platform.machine()
+    physical = None
+    try:
+        import psutil
+        physical = psutil.cpu_count(logical=False)
+    except ImportError:
+        pass
+    return {"model": model, "arch": platform.machine(), "flags": sorted(f for f in CPU_FLAGS if f in flags),
+            "logical_cores": os.cpu_count() or 1, "physical_cores": physical}
+
+def detect_numa_nodes():
+    """Return the number of NUMA nodes (1 where the OS does not expose them)."""
+    return len(glob.glob("/sys/devices/system/node/node[0-9]*")) or 1
+
+def detect_ram():
+    """Return total RAM in bytes (0 if unknown)."""
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+def block_device_type(device):
+    """Return "nvme", "ssd", "hdd" or "unknown" for a device path like /dev/sda1 (Linux only)."""
+    name = os.path.basename(device)
+    sys_path = os.path.join("/sys/class/block", name)
+    if not os.path.exists(sys_path):
+        return "unknown"
+    # Partitions report the rotational flag on their parent disk
+    if os.path.exists(os.path.join(sys_path, "partition")):
+        sys_path = os.path.dirname(os.path.realpath(sys_path))
+        name = os.path.basename(sys_path)
+    if name.startswith("nvme"):
+        return "nvme"
+    try:
+        with open(os.path.join(sys_path, "queue", "rotational"), "r") as f:
+            return "hdd" if f.read().strip() == "1" else "ssd"
+    except OSError:
+        return "unknown"
+
+def detect_disks():
+    """Return mounted disks as [{mountpoint, device, fstype, type, total}]."""
+    try:
+        import psutil
+    except ImportError:
+        return []
+    disks = []
+    for part in psutil.disk_partitions(all=False):
+        if part.device.startswith("/dev/loop") or part.fstype in ("squashfs", "overlay", "tmpfs"):
+            continue
+        try:
+            total = psutil.disk_usage(part.mountpoint).total
+        except OSError:
+            continue
+        disks.append({"mountpoint": part.mountpoint, "device": part.device, "fstype": part.fstype,
+                      "type": block_device_type(part.device), "total": total})
+    return disks
+
+def detect_primary_ip():
+    """Return the address of the interface that routes to the internet (no packet is sent)."""
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return "127.0.0.1"
+
+def boot_time():
+    """Return the host boot time in whole seconds (0 if unknown)."""
+    # /proc/stat is exact; psutil derives boot time from uptime elsewhere, so round it coarsely
+    try:
+        with open("/proc/stat", "r") as f:
+            for line in f:
+                if line.startswith("btime"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return int(round(psutil.boot_time() / 10.0)) * 10
+    except Exception:
+        return 0
+
+def fingerprint():
+    """Return cheap facts that change whenever the inventory might (no subprocesses, no sockets)."""
+    addresses = []
+    try:
+        import psutil
+        addresses = sorted(a.address for addrs in psutil.net_if_addrs().values()
+                           for a in addrs if a.family == socket.AF_INET)
+    except Exception:
+        pass
+    return {"boot_time": boot_time(), "hostname": platform.node(), "cpu_count": os.cpu_count(),
+            "gpu_devices": sorted(glob.glob("/dev/nvidia[0-9]*")), "ipv4": addresses}
+
+def collect_inventory():
+    """Probe the hardware (this is the expensive part: nvidia-smi, /proc, disk scan)."""
+    return {
+        "version": INVENTORY_VERSION,
+        "collected_at": time.time(),
+        "fingerprint": fingerprint(),
+        "os": platform.system().lower(),
+        "hostname": platform.node(),
+        "gpus": detect_gpus(),
+        "cpu": detect_cpu(),
+        "numa_nodes": detect_numa_nodes(),
+        "ram_total": detect_ram(),
+        "disks": detect_disks(),
+        "primary_ip": detect_primary_ip(),
+    }
+
+def load_inventory():
+    """Return the saved inventory, or None."""
+    try:
+        with open(HARDWARE_PATH, "r") as f:
+            inventory = json.load(f)
+        return inventory if inventory.get("version") == INVENTORY_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+def save_inventory(inventory):
+    """Atomically write the inventory."""
+    os.makedirs(FACERUNNER_HOME, exist_ok=True)
+    tmp_path = HARDWARE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(inventory, f, indent=2)
+    os.replace(tmp_path, HARDWARE_PATH)
+
+def is_current(inventory, now=None):
+    """Return True if a saved inventory still matches this host."""
+    now = now or time.time()
+    return (inventory is not None and now - inventory.get("collected_at", 0) < MAX_AGE_SECONDS
+            and inventory.get("fingerprint") == fingerprint())
+
+def refresh_inventory():
+    """Collect and save the inventory now (used by setup/start and `facerunner hardware --refresh`)."""
+    global _inventory, _checked_at
+    inventory = collect_inventory()
+    try:
+        save_inventory(inventory)
+    except OSError:
+        pass
+    with _inventory_lock:
+        _inventory, _checked_at = inventory, time.time()
+    return inventory
+
+def get_inventory():
+    """
+    Return the hardware inventory, collecting it only if the saved one is missing or stale.
+    Within one process the fingerprint is re-checked at most every REVALIDATE_SECONDS.
+    """
+    global _inventory, _checked_at
+    now = time.time()
+    with _inventory_lock:
+        if _inventory is not None and now - _checked_at < REVALIDATE_SECONDS:
+            return _inventory
+        inventory = _inventory if _inventory is not None else load_inventory()
+        if is_current(inventory, now):
+            _inventory, _checked_at = inventory, now
+            return inventory
+    return refresh_inventory()
+
+def has_nvidia_gpu():
+    """Return True if the inventory lists an NVIDIA GPU (callers skip nvidia-smi otherwise)."""
+    return bool(get_inventory()["gpus"])
+
+def get_primary_ip():
+    """Return the host's primary IP from the inventory."""
+    return get_inventory()["primary_ip"]
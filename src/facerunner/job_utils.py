@@ -0,0 +1,411 @@
+"""
+FaceRunner Job Utilities - A persistent queue of model pulls and removals.
+
+Jobs live in SQLite (~/.facerunner/jobs.db) so any UI session, the CLI, or a
+restarted UI sees the same queue. Worker threads claim the highest-priority queued
+job atomically, stream its progress into the database, and honour cancel requests.
+A job whose worker died (UI restarted, process killed) is re-queued; Ollama keeps
+partially downloaded blobs, so a re-queued pull resumes where it stopped. A pull
+outside its download window goes back to the queue until the window opens rather
+than holding a worker, so removals and other jobs keep running meanwhile.
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import threading
+
+from facerunner.api_utils import OLLAMA_URL, get_session
+from facerunner.config_utils import FACERUNNER_HOME
+
+JOBS_DB_PATH = os.path.join(FACERUNNER_HOME, "jobs.db")
+JOB_KINDS = ("pull", "remove")
+# A running job whose worker has not written a heartbeat for this long is re-queued
+STALE_SECONDS = 60
+HEARTBEAT_SECONDS = 10
+# Minimum seconds between progress writes for one job
+PROGRESS_INTERVAL = 0.5
+POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    status TEXT NOT NULL DEFAULT '',
+    error TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, priority, id);
+"""
+# Columns added after the first release, created on databases that predate them
+MIGRATIONS = {
+    "rate_limit": "REAL",
+    "ignore_window": "INTEGER NOT NULL DEFAULT 0",
+    "paused_seconds": "REAL NOT NULL DEFAULT 0",
+    "rate": "REAL NOT NULL DEFAULT 0",
+    "not_before": "REAL",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+class JobCancelled(Exception):
+    """Raised inside a job when a cancel was requested."""
+
+class JobDeferred(Exception):
+    """Raised inside a job that cannot run yet; the worker re-queues it for `seconds` from now."""
+
+    def __init__(self, seconds, status):
+        super().__init__(status)
+        self.seconds = seconds
+        self.status = status
+
+def connect(path=None):
+    """Open the jobs database (WAL, so readers never block the workers)."""
+    path = path or JOBS_DB_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, decl in MIGRATIONS.items():
+        if column not in columns:
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+    return conn
+
+def enqueue(kind, model, priority=0, rate_limit=None, ignore_window=False, path=None):
+    """
+    Queue a job and return its id.
+    An identical job that is already queued or running is reused rather than duplicated.
+    Args:
+        rate_limit (float, optional): Per-pull cap in bytes per second.
+        ignore_window (bool): Run the pull now even outside the configured download windows.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT id FROM jobs WHERE kind = ? AND model = ? AND state IN ('queued', 'running')",
+                           (kind, model)).fetchone()
+        if row:
+            conn.execute("COMMIT")
+            return row["id"]
+        job_id = conn.execute("INSERT INTO jobs (kind, model, priority, rate_limit, ignore_window, created) "
+                              "VALUES (?, ?, ?, ?, ?, ?)",
+                              (kind, model, priority, rate_limit, int(bool(ignore_window)), time.time())).lastrowid
+        conn.execute("COMMIT")
+        return job_id
+    finally:
+        conn.close()
+
+def list_jobs(active_only=False, limit=50, path=None):
+    """Return running and queued jobs (in the order they will run), then the most recently finished ones."""
+    conn = connect(path)
+    try:
+        rows = conn.execute("SELECT * FROM jobs WHERE state IN ('queued', 'running') "
+                            "ORDER BY state = 'running' DESC, priority DESC, id").fetchall()
+        if not active_only:
+            rows += conn.execute("SELECT * FROM jobs WHERE state NOT IN ('queued', 'running') "
+                                 "ORDER BY finished DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def get_job(job_id, path=None):
+    """Return one job as a dict, or None."""
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+def cancel_job(job_id, path=None):
+    """Cancel a queued job now, or ask the worker running it to stop. Returns False if it already finished."""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute("UPDATE jobs SET state = 'cancelled', finished = ?, status = 'Cancelled' "
+                           "WHERE id = ? AND state = 'queued'", (time.time(), job_id))
+        if not cur.rowcount:
+            cur = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND state = 'running'", (job_id,))
+        conn.execute("COMMIT")
+        return cur.rowcount > 0
+    finally:
+        conn.close()
+
+def set_priority(job_id, priority, path=None):
+    """Change a queued job's priority (higher runs first)."""
+    conn = connect(path)
+    try:
+        return conn.execute("UPDATE jobs SET priority = ? WHERE id = ? AND state = 'queued'",
+                            (priority, job_id)).rowcount > 0
+    finally:
+        conn.close()
+
+def clear_finished(path=None):
+    """Delete finished, failed and cancelled jobs."""
+    conn = connect(path)
+    try:
+        return conn.execute("DELETE FROM jobs WHERE state NOT IN ('queued', 'running')").rowcount
+    finally:
+        conn.close()
+
+def pid_alive(pid):
+    """Return True if a local process id exists."""
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+
+def recover_stale(path=None, now=None):
+    """
+    Re-queue running jobs whose worker is gone: its process on this host has exited, or
+    it stopped writing heartbeats. Returns the number of jobs re-queued.
+    """
+    now = now or time.time()
+    host = socket.gethostname()
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        stale = []
+        for row in conn.execute("SELECT id, worker, heartbeat FROM jobs WHERE state = 'running'").fetchall():
+            worker_host, _, rest = (row["worker"] or "").partition(":")
+            pid = rest.split(":")[0]
+            dead = worker_host == host and pid.isdigit() and not pid_alive(int(pid))
+            if dead or now - (row["heartbeat"] or 0) > STALE_SECONDS:
+                stale.append(row["id"])
+        for job_id in stale:
+            conn.execute("UPDATE jobs SET worker = NULL, "
+                         "state = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+                         "status = CASE WHEN cancel_requested THEN 'Cancelled' ELSE 'Resuming after interruption' END, "
+                         "finished = CASE WHEN cancel_requested THEN ? ELSE finished END WHERE id = ?", (now, job_id))
+        conn.execute("COMMIT")
+        return len(stale)
+    finally:
+        conn.close()
+
+def claim_next(worker, path=None):
+    """Atomically move the highest-priority queued job that is due to running and return it (or None)."""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        row = conn.execute("SELECT * FROM jobs WHERE state = 'queued' AND COALESCE(not_before, 0) <= ? "
+                           "ORDER BY priority DESC, id LIMIT 1", (now,)).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute("UPDATE jobs SET state = 'running', worker = ?, heartbeat = ?, started = COALESCE(started, ?), "
+                     "attempts = attempts + 1, error = NULL, not_before = NULL WHERE id = ?",
+                     (worker, now, now, row["id"]))
+        conn.execute("COMMIT")
+        job = dict(row)
+        job.update({"state": "running", "worker": worker})
+        return job
+    finally:
+        conn.close()
+
+class JobContext:
+    """Progress reporting and cancellation for the job a worker is running."""
+
+    def __init__(self, job_id, path=None):
+        self.job_id = job_id
+        self.path = path
+        self.last_write = 0.0
+
+    def update(self, status=None, completed=None, total=None, paused_seconds=None, rate=None, force=False):
+        """Record progress (throttled) and raise JobCancelled if a cancel was requested."""
+        now = time.time()
+        if not force and now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        conn = connect(self.path)
+        try:
+            conn.execute("UPDATE jobs SET status = COALESCE(?, status), completed = COALESCE(?, completed), "
+                         "total = COALESCE(?, total), paused_seconds = COALESCE(?, paused_seconds), "
+                         "rate = COALESCE(?, rate), heartbeat = ? WHERE id = ?",
+                         (status, completed, total, paused_seconds, rate, now, self.job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row and row["cancel_requested"]:
+            raise JobCancelled()
+
+    def defer(self, seconds, status):
+        """Put the job back in the queue, not to be claimed for `seconds` (unless it was cancelled meanwhile)."""
+        now = time.time()
+        conn = connect(self.path)
+        try:
+            conn.execute("UPDATE jobs SET worker = NULL, not_before = ?, heartbeat = ?, "
+                         "state = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+                         "status = CASE WHEN cancel_requested THEN 'Cancelled' ELSE ? END, "
+                         "finished = CASE WHEN cancel_requested THEN ? ELSE finished END WHERE id = ?",
+                         (now + seconds, now, status, now, self.job_id))
+        finally:
+            conn.close()
+
+    def finish(self, state, status, error=None):
+        """Mark the job done, failed or cancelled."""
+        conn = connect(self.path)
+        try:
+            conn.execute("UPDATE jobs SET state = ?, status = ?, error = ?, finished = ?, heartbeat = ? "
+                         "WHERE id = ?", (state, status, error, time.time(), time.time(), self.job_id))
+        finally:
+            conn.close()
+
+def run_pull(job, ctx, base_url=OLLAMA_URL):
+    """
+    Pull a model within the bandwidth cap, download windows and load thresholds (see shaping_utils).
+    Outside the download windows it raises JobDeferred, so the pull waits in the queue, not in a worker.
+    """
+    from facerunner.config_utils import load_config
+    from facerunner.memory_utils import check_admission, admission_allows
+    from facerunner.shaping_utils import shaped_pull, window_reason, PullDeferred
+    model = job["model"]
+    config = load_config()
+    ignore_window = bool(job.get("ignore_window"))
+    reason, wait = window_reason(config, ignore_window)
+    if reason:
+        raise JobDeferred(wait, f"Waiting: {reason}")
+    ctx.update(status="Checking memory and disk", force=True)
+    report = check_admission(model, for_pull=True)
+    if not admission_allows(report):
+        raise RuntimeError("; ".join(report["messages"]) or "does not fit on this host")
+    # Paused time from earlier attempts (before a UI restart) still counts
+    paused_before = job.get("paused_seconds") or 0
+
+    def progress(stats, force=False):
+        ctx.update(status=stats.status, completed=stats.completed or None, total=stats.total or None,
+                   paused_seconds=paused_before + stats.paused, rate=stats.rate(), force=force)
+
+    try:
+        stats = shaped_pull(model, base_url=base_url, limit=job.get("rate_limit"), ignore_window=ignore_window,
+                            progress=progress, config=config, defer_window=True)
+    except PullDeferred as e:
+        # The window closed mid-download; the partial blobs are kept for the next attempt
+        progress(e.stats, force=True)
+        raise JobDeferred(e.seconds, f"Waiting: {e.reason}")
+    ctx.update(paused_seconds=paused_before + stats.paused, rate=stats.rate(), force=True)
+    return "Pulled" + "".join(f" (⚠️ {msg})" for msg in report["messages"])
+
+def run_remove(job, ctx, base_url=OLLAMA_URL):
+    """Remove a model through Ollama's /api/delete."""
+    ctx.update(status="Removing", force=True)
+    response = get_session().delete(f"{base_url}/api/delete", json={"model": job["model"]}, timeout=60)
+    if response.status_code == 404:
+        raise RuntimeError("model not found")
+    if response.status_code != 200:
+        raise RuntimeError(response.text.strip() or f"HTTP {response.status_code}")
+    return "Removed"
+
+RUNNERS = {"pull": run_pull, "remove": run_remove}
+
+class WorkerPool:
+    """Worker threads that run queued jobs, plus a heartbeat thread for the jobs they hold."""
+
+    def __init__(self, workers=2, path=None, base_url=OLLAMA_URL):
+        self.workers = max(1, workers)
+        self.path = path
+        self.base_url = base_url
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        """Re-queue interrupted jobs and start the worker and heartbeat threads."""
+        recover_stale(self.path)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f"facerunner-job-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        thread = threading.Thread(target=self.beat, name="facerunner-job-heartbeat", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop claiming new jobs (running ones finish or are resumed by the next worker)."""
+        self.stopping.set()
+
+    def beat(self):
+        """Keep heartbeats fresh while a job is quiet (e.g. Ollama verifying a large blob)."""
+        while not self.stopping.wait(HEARTBEAT_SECONDS):
+            with self.lock:
+                job_ids = sorted(self.running)
+            if job_ids:
+                conn = connect(self.path)
+                try:
+                    conn.executemany("UPDATE jobs SET heartbeat = ? WHERE id = ? AND state = 'running'",
+                                     [(time.time(), job_id) for job_id in job_ids])
+                finally:
+                    conn.close()
+            try:
+                recover_stale(self.path)
+            except sqlite3.Error:
+                pass
+
+    def work(self):
+        """Claim and run jobs until stopped."""
+        while not self.stopping.is_set():
+            try:
+                job = claim_next(self.worker_id, self.path)
+            except sqlite3.Error:
+                job = None
+            if job is None:
+                self.stopping.wait(POLL_SECONDS)
+                continue
+            self.run(job)
+
+    def run(self, job):
+        """Run one claimed job to completion, failure or cancellation."""
+        ctx = JobContext(job["id"], self.path)
+        with self.lock:
+            self.running.add(job["id"])
+        try:
+            status = RUNNERS[job["kind"]](job, ctx, base_url=self.base_url)
+            ctx.finish("done", status)
+        except JobDeferred as e:
+            ctx.defer(e.seconds, e.status)
+        except JobCancelled:
+            ctx.finish("cancelled", "Cancelled")
+        except Exception as e:
+            ctx.finish("failed", "Failed", str(e))
+        finally:
+            with self.lock:
+                self.running.discard(job["id"])
+
+def ensure_workers(workers=None):
+    """Start this process's worker pool once (the web UI calls this on every rerun)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if workers is None:
+                    from facerunner.config_utils import get_setting
+                    workers = get_setting("job_workers", 2)
+                _pool = WorkerPool(workers=workers).start()
+    return _pool
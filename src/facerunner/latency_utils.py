@@ -0,0 +1,219 @@
+"""
+FaceRunner Latency Utilities - Measure model speed and pick models for editor roles.
+"""
+
+import os
+import json
+import time
+
+from facerunner.api_utils import OLLAMA_URL, get_session, list_running_models
+from facerunner.config_utils import FACERUNNER_HOME
+
+LATENCY_PATH = os.path.join(FACERUNNER_HOME, "latency.json")
+# Re-probe a model after this long even if its digest is unchanged
+MAX_AGE_SECONDS = 7 * 24 * 3600
+PROBE_PROMPT = "Write a Python function that returns the sum of a list of numbers."
+PROBE_TOKENS = 48
+# Autocomplete must answer fast; chat/edit should still stream faster than people read
+AUTOCOMPLETE_MAX_PARAMS_B = 8
+AUTOCOMPLETE_MAX_TTFT = 0.5
+CHAT_MIN_TPS = 8.0
+EMBED_FAMILIES = ("bert", "nomic-bert")
+ROLE_OPTIONS = {
+    # Short context keeps completion prompts small; stay loaded so the first keystroke is fast
+    "autocomplete": {"num_ctx": 4096, "keep_alive": -1},
+    "chat": {"num_ctx": 16384, "keep_alive": "30m"},
+    "embed": {"num_ctx": 2048, "keep_alive": "30m"},
+}
+
+def list_installed(base_url=OLLAMA_URL, timeout=10):
+    """Return Ollama's installed models from /api/tags (name, size, digest, details)."""
+    response = get_session().get(f"{base_url}/api/tags", timeout=timeout)
+    response.raise_for_status()
+    return response.json().get("models") or []
+
+def parameter_billions(model):
+    """Return a model's parameter count in billions from /api/tags details, or None."""
+    text = str((model.get("details") or {}).get("parameter_size", "")).strip().upper()
+    try:
+        if text.endswith("B"):
+            return float(text[:-1])
+        if text.endswith("M"):
+            return float(text[:-1]) / 1000
+    except ValueError:
+        pass
+    return None
+
+def is_embedding_model(model):
+    """Return True for embedding-only models, which cannot chat or complete."""
+    details = model.get("details") or {}
+    families = [details.get("family", "")] + list(details.get("families") or [])
+    return "embed" in model.get("name", "") or any(f in EMBED_FAMILIES for f in families)
+
+def load_latency_cache():
+    """Return cached probe results keyed by model name."""
+    try:
+        with open(LATENCY_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_latency_cache(cache):
+    """Atomically write the probe cache."""
+    os.makedirs(FACERUNNER_HOME, exist_ok=True)
+    tmp_path = LATENCY_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, LATENCY_PATH)
+
+def probe_model(name, base_url=OLLAMA_URL, keep_loaded=False, timeout=300):
+    """
+    Stream a short generation and measure its speed.
+    Returns:
+        dict: ttft (seconds to the first token once loaded), tps (generated tokens per second),
+        load (seconds spent loading the model for this probe).
+    """
+    payload = {"model": name, "prompt": PROBE_PROMPT, "stream": True,
+               "options": {"num_predict": PROBE_TOKENS, "temperature": 0}}
+    if not keep_loaded:
+        payload["keep_alive"] = 0
+    start = time.perf_counter()
+    first_token = None
+    final = {}
+    with get_session().post(f"{base_url}/api/generate", json=payload, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if first_token is None and chunk.get("response"):
+                first_token = time.perf_counter() - start
+            if chunk.get("done"):
+                final = chunk
+                break
+    load = final.get("load_duration", 0) / 1e9
+    eval_seconds = final.get("eval_duration", 0) / 1e9
+    tps = final.get("eval_count", 0) / eval_seconds if eval_seconds else 0.0
+    wall = time.perf_counter() - start
+    ttft = max((first_token if first_token is not None else wall) - load, 0.0)
+    return {"ttft": round(ttft, 4), "tps": round(tps, 2), "load": round(load, 3)}
+
+def measure_models(models, base_url=OLLAMA_URL, refresh=False, progress=None):
+    """
+    Return probe results for installed models, probing only those not cached (or changed).
+    Args:
+        models (list): /api/tags entries.
+        refresh (bool): Probe every model again.
+        progress (callable, optional): Called with (name, result or None, cached) per model.
+    Returns:
+        dict: {name: {ttft, tps, load, digest, measured_at}} (failed probes are omitted).
+    """
+    cache = load_latency_cache()
+    loaded = {m.get("name") for m in list_running_models(base_url)}
+    results, now = {}, time.time()
+    for model in models:
+        name = model.get("name")
+        if is_embedding_model(model):
+            continue
+        cached = cache.get(name)
+        if (not refresh and cached and cached.get("digest") == model.get("digest")
+                and now - cached.get("measured_at", 0) < MAX_AGE_SECONDS):
+            results[name] = cached
+            if progress:
+                progress(name, cached, True)
+            continue
+        try:
+            result = probe_model(name, base_url=base_url, keep_loaded=name in loaded)
+            result.update({"digest": model.get("digest"), "measured_at": now})
+            cache[name] = results[name] = result
+        except Exception:
+            result = None
+        if progress:
+            progress(name, result, False)
+    save_latency_cache(cache)
+    return results
+
+def assign_roles(models, measurements):
+    """
+    Pick models for each editor role.
+    Autocomplete gets the lowest-latency model of at most AUTOCOMPLETE_MAX_PARAMS_B
+    (preferring code models), chat/edit the largest model that still streams at
+    CHAT_MIN_TPS, and embed the first embedding model.
+    Returns:
+        dict: {role: model name or None}.
+    """
+    by_name = {m.get("name"): m for m in models}
+    measured = [name for name in measurements if name in by_name]
+    roles = {"autocomplete": None, "chat": None, "embed": None}
+
+    def size(name):
+        return parameter_billions(by_name[name]) or by_name[name].get("size", 0) / 1024 ** 3
+
+    small = [n for n in measured if (parameter_billions(by_name[n]) or 0) <= AUTOCOMPLETE_MAX_PARAMS_B]
+    candidates = small or measured
+    if candidates:
+        roles["autocomplete"] = min(candidates, key=lambda n: (
+            measurements[n]["ttft"] > AUTOCOMPLETE_MAX_TTFT, "code" not in n, measurements[n]["ttft"]))
+
+    fluent = [n for n in measured if measurements[n]["tps"] >= CHAT_MIN_TPS]
+    if fluent:
+        roles["chat"] = max(fluent, key=size)
+    elif measured:
+        roles["chat"] = max(measured, key=lambda n: measurements[n]["tps"])
+
+    embedders = sorted(n for n, m in by_name.items() if is_embedding_model(m))
+    roles["embed"] = embedders[0] if embedders else None
+    return roles
+
+def continue_model_entry(name, api_base, roles, options):
+    """Return one Continue config.yaml model entry."""
+    entry = {"name": name, "provider": "ollama", "model": name, "apiBase": api_base, "roles": roles}
+    if options:
+        # Continue sends contextLength to Ollama as num_ctx; keep_alive goes in the request body
+        entry["defaultCompletionOptions"] = {"contextLength": options["num_ctx"]}
+        entry["requestOptions"] = {"extraBodyProperties": {"keep_alive": options["keep_alive"]}}
+    return entry
+
+def build_continue_config(api_base, base_url=OLLAMA_URL, refresh=False, progress=None):
+    """
+    Build a Continue config with roles assigned by measured latency.
+    Returns:
+        (config, roles, measurements)
+    """
+    models = list_installed(base_url)
+    measurements = measure_models(models, base_url=base_url, refresh=refresh, progress=progress)
+    roles = assign_roles(models, measurements)
+    entries = []
+    for model in models:
+        name = model.get("name")
+        model_roles, options = [], None
+        if name == roles["chat"]:
+            model_roles += ["chat", "edit", "apply"]
+            options = ROLE_OPTIONS["chat"]
+        if name == roles["autocomplete"]:
+            model_roles.append("autocomplete")
+            options = options or ROLE_OPTIONS["autocomplete"]
+        if name == roles["embed"]:
+            model_roles.append("embed")
+            options = options or ROLE_OPTIONS["embed"]
+        if not model_roles:
+            # Keep every chat-capable model selectable in Continue without making it a default
+            if is_embedding_model(model):
+                continue
+            model_roles = ["chat"]
+        entries.append(continue_model_entry(name, api_base, model_roles, options))
+    # Models with assigned roles first, so Continue picks them as defaults
+    entries.sort(key=lambda e: (e["roles"] == ["chat"], e["name"]))
+    config = {"name": "Local Agent", "version": "1.0.0", "schema": "v1", "models": entries}
+    return config, roles, measurements
+
+def write_continue_config(config, path=None):
+    """Write a Continue config.yaml and return its YAML text."""
+    import yaml
+    from pathlib import Path
+    config_yaml = yaml.dump(config, sort_keys=False)
+    config_file = Path(path) if path else Path.home() / ".continue" / "config.yaml"
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_file, 'w') as f:
+        f.write(config_yaml)
+    return config_yaml
@@ -0,0 +1,178 @@
+"""
+FaceRunner Memory Utilities - Memory-aware model admission and LRU eviction.
+"""
+
+import os
+import shutil
+import subprocess
+
+from facerunner.api_utils import list_running_models, unload_model
+from facerunner.config_utils import load_config
+from facerunner.store_utils import (
+    get_models_dir, normalize_model_name, read_manifest, fetch_registry_manifest, manifest_layers, manifest_size, blob_path
+)
+
+GB = 1024 ** 3
+
+# Rough download sizes (GB) used when neither a local nor a registry manifest is available
+ESTIMATED_SIZE_GB = {
+    "llama3.1:8b": 4.5,
+    "llama3.1:70b": 40,
+    "llama3.1:405b": 220,
+    "llama3:8b": 4.5,
+    "llama3:70b": 40,
+    "codellama:7b": 4.5,
+    "codellama:13b": 8,
+    "codellama:34b": 22,
+    "mistral:7b": 4.5,
+    "mixtral:8x7b": 32.0,
+    "phi3:3.8b": 2.2,
+    "phi3:14b": 8.5,
+    "gemma:2b": 1.2,
+    "gemma:7b": 4.5,
+    "gemma2:2b": 1.2,
+    "gemma2:9b": 5.5,
+    "gemma2:27b": 16.0,
+    "wizardlm2:8x22b": 48.0,
+}
+
+def format_gb(num_bytes):
+    """Format a byte count as gigabytes."""
+    return f"{num_bytes / GB:.1f} GB"
+
+def get_free_vram():
+    """Return free GPU memory in bytes summed over all NVIDIA GPUs (0 if none)."""
+    from facerunner.hardware_utils import has_nvidia_gpu
+    try:
+        if not has_nvidia_gpu():
+            return 0
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=memory.free", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            return sum(int(float(line)) for line in result.stdout.split() if line.strip()) * 1024 * 1024
+    except Exception:
+        pass
+    return 0
+
+def get_free_memory():
+    """Return (free_ram, free_vram) in bytes."""
+    try:
+        import psutil
+        free_ram = psutil.virtual_memory().available
+    except ImportError:
+        free_ram = 0
+    return free_ram, get_free_vram()
+
+def get_model_manifest(model):
+    """Return (manifest, installed) for a model, preferring the local copy over the registry."""
+    manifest = read_manifest(model)
+    if manifest:
+        return manifest, True
+    return fetch_registry_manifest(model), False
+
+def estimate_model_bytes(model, manifest=None):
+    """Return the weight size of a model in bytes, or None if it cannot be determined."""
+    if manifest:
+        return manifest_size(manifest)
+    est = ESTIMATED_SIZE_GB.get(model)
+    return int(est * GB) if est else None
+
+def missing_blob_bytes(manifest):
+    """Return how many bytes of a manifest's blobs are not yet present on disk."""
+    return sum(layer.get("size", 0) for layer in manifest_layers(manifest)
+               if not os.path.exists(blob_path(layer["digest"])))
+
+def lru_order(running):
+    """Order loaded models least-recently-used first.
+
+    Ollama resets ``expires_at`` to now + keep_alive on every request, so the
+    earliest expiry belongs to the model that was used longest ago.
+    """
+    return sorted(running, key=lambda m: m.get("expires_at", ""))
+
+def check_admission(model, for_pull=False, evict=None, config=None):
+    """
+    Check whether a model fits in memory (and on disk, for pulls) before it is pulled or loaded.
+    Args:
+        model (str): Ollama model reference.
+        for_pull (bool): Check free disk space for the blobs still to download. A pull only writes
+            to disk, so the memory check is then a warning only and nothing is evicted.
+        evict (bool, optional): Unload LRU models to make room before a load; defaults to the
+            ``evict_lru`` setting. Ignored for pulls.
+        config (dict, optional): Settings to use instead of ~/.facerunner/config.yaml.
+    Returns:
+        dict: ``ok`` (bool), ``policy``, ``messages`` (list of str), ``evicted`` (list of model names).
+    """
+    config = config or load_config()
+    policy = config.get("admission", "warn")
+    evict = config.get("evict_lru", False) if evict is None else evict
+    if for_pull:
+        evict = False
+    report = {"ok": True, "policy": policy, "messages": [], "evicted": []}
+    if policy == "off":
+        return report
+
+    manifest, installed = get_model_manifest(model)
+    weights = estimate_model_bytes(model, manifest)
+
+    if for_pull and manifest:
+        needed = missing_blob_bytes(manifest) if installed else manifest_size(manifest)
+        reserve = int(float(config.get("disk_reserve_gb", 2)) * GB)
+        try:
+            free_disk = shutil.disk_usage(get_models_dir()).free
+        except OSError:
+            free_disk = shutil.disk_usage(os.path.expanduser("~")).free
+        if needed + reserve > free_disk:
+            report["ok"] = False
+            report["messages"].append(
+                f"Not enough disk space for {model}: needs {format_gb(needed)} "
+                f"(+{format_gb(reserve)} reserve), {format_gb(free_disk)} free."
+            )
+
+    if weights is None:
+        report["messages"].append(f"Could not determine the size of {model}; skipping memory check.")
+        return report
+
+    required = int(weights * float(config.get("memory_overhead", 1.2)))
+    running = list_running_models()
+    wanted = normalize_model_name(model)
+    if any(normalize_model_name(m.get("name") or m.get("model", "")) == wanted for m in running):
+        return report
+
+    free_ram, free_vram = get_free_memory()
+    available = free_ram + free_vram
+    budget_gb = config.get("memory_budget_gb")
+    headroom = None
+    if budget_gb:
+        headroom = int(float(budget_gb) * GB) - sum(m.get("size", 0) for m in running)
+
+    def fits():
+        return required <= available and (headroom is None or required <= headroom)
+
+    if not fits() and evict:
+        for victim in lru_order(running):
+            name = victim.get("name") or victim.get("model")
+            if unload_model(name):
+                report["evicted"].append(name)
+                available += victim.get("size", 0)
+                if headroom is not None:
+                    headroom += victim.get("size", 0)
+                if fits():
+                    break
+
+    if not fits():
+        limit = available if headroom is None else min(available, headroom)
+        message = (f"{model} needs about {format_gb(required)} of memory but only {format_gb(max(limit, 0))} "
+                   f"is available{' within the memory budget' if headroom is not None else ''}.")
+        if for_pull:
+            message += " It can be pulled, but will not load until memory is freed."
+        else:
+            report["ok"] = False
+        report["messages"].append(message)
+    return report
+
+def admission_allows(report):
+    """Return True unless the admission policy is 'refuse' and the check failed."""
+    return report["ok"] or report["policy"] != "refuse"
@@ -0,0 +1,247 @@
+"""
+FaceRunner Metrics Utilities - Prometheus exporter for the services FaceRunner manages.
+
+A background sampler refreshes every metric on an interval and renders the exposition
+text once; scrapes are answered from that cached payload.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import threading
+import traceback
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from facerunner.service_utils import SERVICES, ServiceTracker
+from facerunner.store_utils import get_models_dir
+
+OLLAMA_PORT = 11434
+METRICS_PORT = 9464
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def escape_label(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_metrics(families):
+    """
+    Render metric families as Prometheus text exposition.
+    Args:
+        families (list): (name, type, help, [(labels dict, value), ...]) tuples.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def pull_progress(models_dir=None):
+    """
+    Return [(digest, completed, total)] for blobs Ollama is downloading right now.
+    Ollama keeps a ``sha256-<hex>-partial`` data file plus ``-partial-N`` JSON part
+    records ({"Offset", "Size", "Completed"}) until a blob finishes.
+    """
+    blob_dir = os.path.join(models_dir or get_models_dir(), "blobs")
+    progress = []
+    for data_path in glob.glob(os.path.join(blob_dir, "sha256-*-partial")):
+        digest = os.path.basename(data_path)[:-len("-partial")].replace("-", ":", 1)
+        completed = total = 0
+        for part_path in glob.glob(data_path + "-*"):
+            try:
+                with open(part_path) as f:
+                    part = json.load(f)
+                completed += part.get("Completed", 0)
+                total += part.get("Size", 0)
+            except (OSError, ValueError):
+                continue
+        if not total:
+            try:
+                completed = total = os.path.getsize(data_path)
+            except OSError:
+                continue
+        progress.append((digest, completed, total))
+    return progress
+
+class MetricsSampler:
+    """Collects service, Ollama and pull metrics on an interval and caches the rendered payload."""
+
+    def __init__(self, interval=5.0, probe_timeout=2.0, base_url=None):
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.base_url = base_url or f"http://localhost:{OLLAMA_PORT}"
+        self.families = []
+        self.sample_errors = 0
+        self.last_sample = 0.0
+        self.payload = self.render()
+        self.tracker = ServiceTracker()
+        self.pull_history = {}
+        self.stop_event = threading.Event()
+
+    def process_families(self):
+        """Metric families for each service's whole process tree: CPU, RSS, threads, I/O, restarts."""
+        samples = self.tracker.sample()
+        families = {
+            "running": ("facerunner_service_running", "gauge", "1 if a process of the service is running."),
+            "procs": ("facerunner_service_processes", "gauge", "Processes in the service's process tree."),
+            "cpu": ("facerunner_service_cpu_percent", "gauge", "CPU use of the service process tree (100 = one core)."),
+            "rss": ("facerunner_service_rss_bytes", "gauge", "Resident memory of the service process tree."),
+            "threads": ("facerunner_service_threads", "gauge", "Threads in the service process tree."),
+            "fds": ("facerunner_service_open_fds", "gauge", "Open file descriptors of the service process tree."),
+            "uptime": ("facerunner_service_uptime_seconds", "gauge", "Seconds since the service's oldest root process started."),
+            "read_bps": ("facerunner_service_read_bytes_per_second", "gauge", "Disk read rate of the service process tree."),
+            "write_bps": ("facerunner_service_write_bytes_per_second", "gauge", "Disk write rate of the service process tree."),
+            "restarts": ("facerunner_service_restarts_total", "counter", "Times the service was seen restarting since the exporter started."),
+            "leak": ("facerunner_service_memory_leak_suspected", "gauge", "1 if RSS has grown monotonically over recent samples."),
+        }
+        result = []
+        for key, (name, kind, help_text) in families.items():
+            rows = []
+            for service, sample in samples.items():
+                value = sample[key]
+                value = int(value) if isinstance(value, bool) else round(value, 2)
+                rows.append(({"service": service}, value))
+            result.append((name, kind, help_text, rows))
+        return result
+
+    def probe_families(self):
+        """Probe each service's HTTP endpoint and Ollama's /api/ps."""
+        from facerunner.api_utils import get_session
+        session = get_session()
+        latency, reachable = [], []
+        for service, (_, url) in SERVICES.items():
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=self.probe_timeout).status_code < 500
+            except Exception:
+                ok = False
+            labels = {"service": service}
+            reachable.append((labels, 1 if ok else 0))
+            if ok:
+                latency.append((labels, round(time.perf_counter() - start, 6)))
+
+        loaded, size, vram = [], [], []
+        try:
+            response = session.get(f"{self.base_url}/api/ps", timeout=self.probe_timeout)
+            models = (response.json().get("models") or []) if response.status_code == 200 else []
+        except Exception:
+            models = []
+        for model in models:
+            labels = {"model": model.get("name", "")}
+            loaded.append((labels, 1))
+            size.append((labels, model.get("size", 0)))
+            vram.append((labels, model.get("size_vram", 0)))
+        return [
+            ("facerunner_probe_up", "gauge", "1 if the service answered its HTTP probe.", reachable),
+            ("facerunner_probe_latency_seconds", "gauge", "Latency of the last successful HTTP probe.", latency),
+            ("facerunner_ollama_models_loaded", "gauge", "Number of models Ollama has loaded.", [({}, len(models))]),
+            ("facerunner_ollama_model_loaded", "gauge", "1 for each model Ollama has loaded.", loaded),
+            ("facerunner_ollama_model_size_bytes", "gauge", "Memory used by a loaded model.", size),
+            ("facerunner_ollama_model_vram_bytes", "gauge", "VRAM used by a loaded model.", vram),
+        ]
+
+    def pull_families(self):
+        """Progress and throughput of blobs Ollama is downloading."""
+        now = time.time()
+        completed_s, total_s, rate_s = [], [], []
+        history = {}
+        for digest, completed, total in pull_progress():
+            labels = {"blob": digest[:19]}
+            previous = self.pull_history.get(digest)
+            rate = 0.0
+            if previous and now > previous[0]:
+                rate = max(completed - previous[1], 0) / (now - previous[0])
+            history[digest] = (now, completed)
+            completed_s.append((labels, completed))
+            total_s.append((labels, total))
+            rate_s.append((labels, round(rate, 1)))
+        self.pull_history = history
+        return [
+            ("facerunner_pulls_active", "gauge", "Blobs Ollama is downloading.", [({}, len(history))]),
+            ("facerunner_pull_completed_bytes", "gauge", "Bytes downloaded so far per blob.", completed_s),
+            ("facerunner_pull_total_bytes", "gauge", "Size of each blob being downloaded.", total_s),
+            ("facerunner_pull_throughput_bytes_per_second", "gauge", "Download rate per blob over the last interval.", rate_s),
+        ]
+
+    def sample(self):
+        """Collect every metric family once and swap in the rendered payload."""
+        start = time.perf_counter()
+        families = []
+        try:
+            families += self.process_families()
+        except ImportError:
+            pass
+        families += self.probe_families()
+        families += self.pull_families()
+        families.append(("facerunner_exporter_sample_seconds", "gauge", "Time the last sample took.",
+                         [({}, round(time.perf_counter() - start, 6))]))
+        self.families = families
+        self.last_sample = time.time()
+        self.payload = self.render()
+
+    def render(self):
+        """Render the last successful sample plus the exporter's own health series."""
+        return render_metrics(self.families + [
+            ("facerunner_exporter_last_sample_timestamp_seconds", "gauge",
+             "Unix time of the last successful sample (0 if none has succeeded).", [({}, round(self.last_sample, 3))]),
+            ("facerunner_exporter_sample_errors_total", "counter",
+             "Samples that failed; the other series keep their last successful values.", [({}, self.sample_errors)]),
+        ])
+
+    def sample_once(self):
+        """Sample, or log the failure and count it in the served payload. Returns True on success."""
+        try:
+            self.sample()
+            return True
+        except Exception:
+            self.sample_errors += 1
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} metrics sample failed:", file=sys.stderr)
+            traceback.print_exc()
+            sys.stderr.flush()
+            self.payload = self.render()
+            return False
+
+    def run(self):
+        """Sample until stop() is called."""
+        while not self.stop_event.is_set():
+            self.sample_once()
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        """Stop the sampling loop."""
+        self.stop_event.set()
+
+def make_handler(sampler):
+    """Build a request handler that serves the sampler's cached payload."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            payload = sampler.payload
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+def serve_metrics(port=METRICS_PORT, host="0.0.0.0", interval=5.0):
+    """Start the sampler thread and serve /metrics until interrupted."""
+    sampler = MetricsSampler(interval=interval)
+    threading.Thread(target=sampler.run, daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_handler(sampler))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        sampler.stop()
+        server.server_close()
@@ -0,0 +1,231 @@
+"""
+FaceRunner Planner Utilities - Estimate memory and speed of model size/quantisation variants.
+"""
+
+import os
+import subprocess
+
+from facerunner.config_utils import load_config
+
+GB = 1024 ** 3
+
+# Bits per weight (including scales) of the GGUF quantisations Ollama publishes
+QUANT_BITS = {
+    "q2_K": 2.6,
+    "q3_K_M": 3.9,
+    "q4_0": 4.5,
+    "q4_K_M": 4.85,
+    "q5_K_M": 5.7,
+    "q6_K": 6.6,
+    "q8_0": 8.5,
+    "fp16": 16.0,
+}
+QUANT_ORDER = list(QUANT_BITS)
+
+# Architecture facts needed for the estimates: total/active parameters (billions),
+# transformer layers, KV heads and head dimension, plus the Ollama tag layout.
+MODEL_SPECS = {
+    "llama3.1": {
+        "8b": {"params": 8.0, "layers": 32, "kv_heads": 8, "head_dim": 128},
+        "70b": {"params": 70.6, "layers": 80, "kv_heads": 8, "head_dim": 128},
+        "405b": {"params": 405.0, "layers": 126, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "llama3": {
+        "8b": {"params": 8.0, "layers": 32, "kv_heads": 8, "head_dim": 128},
+        "70b": {"params": 70.6, "layers": 80, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "codellama": {
+        "7b": {"params": 6.7, "layers": 32, "kv_heads": 32, "head_dim": 128},
+        "13b": {"params": 13.0, "layers": 40, "kv_heads": 40, "head_dim": 128},
+        "34b": {"params": 33.7, "layers": 48, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "mistral": {
+        "7b": {"params": 7.2, "layers": 32, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "mixtral": {
+        "8x7b": {"params": 46.7, "active": 12.9, "layers": 32, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-instruct-v0.1-{quant}",
+    },
+    "phi3": {
+        "3.8b": {"params": 3.8, "layers": 32, "kv_heads": 32, "head_dim": 96, "variant": "mini-4k-"},
+        "14b": {"params": 14.0, "layers": 40, "kv_heads": 10, "head_dim": 128, "variant": "medium-4k-"},
+        "tag": "{size}-{variant}instruct-{quant}",
+    },
+    "gemma": {
+        "2b": {"params": 2.5, "layers": 18, "kv_heads": 1, "head_dim": 256},
+        "7b": {"params": 8.5, "layers": 28, "kv_heads": 16, "head_dim": 256},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "gemma2": {
+        "2b": {"params": 2.6, "layers": 26, "kv_heads": 4, "head_dim": 256},
+        "9b": {"params": 9.2, "layers": 42, "kv_heads": 8, "head_dim": 256},
+        "27b": {"params": 27.2, "layers": 46, "kv_heads": 16, "head_dim": 128},
+        "tag": "{size}-instruct-{quant}",
+    },
+    "wizardlm2": {
+        "8x22b": {"params": 141.0, "active": 39.0, "layers": 56, "kv_heads": 8, "head_dim": 128},
+        "tag": "{size}-{quant}",
+    },
+}
+
+# Peak memory bandwidth (GB/s) of common NVIDIA GPUs, matched by substring of the nvidia-smi name
+GPU_BANDWIDTH_GBPS = {
+    "H100": 3350,
+    "A100": 1555,
+    "4090": 1008,
+    "3090": 936,
+    "4080": 717,
+    "3080": 760,
+    "A10": 600,
+    "4070": 504,
+    "3060": 360,
+    "T4": 320,
+    "L4": 300,
+}
+DEFAULT_GPU_BANDWIDTH_GBPS = 400
+# Fraction of peak bandwidth llama.cpp typically achieves while decoding
+BANDWIDTH_EFFICIENCY = 0.6
+# Compute buffers and runtime overhead on top of weights and KV cache
+RUNTIME_OVERHEAD_BYTES = int(0.5 * GB)
+
+def get_param_sizes(base_name):
+    """Return the parameter sizes the planner knows for a model family."""
+    return [size for size in MODEL_SPECS.get(base_name, {}) if size != "tag"]
+
+def get_gpus():
+    """Return a list of (name, total_bytes, free_bytes) for each NVIDIA GPU."""
+    from facerunner.hardware_utils import has_nvidia_gpu
+    try:
+        if not has_nvidia_gpu():
+            return []
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total,memory.free", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            gpus = []
+            for line in result.stdout.strip().split('\n'):
+                parts = [p.strip() for p in line.split(',')]
+                if len(parts) == 3:
+                    gpus.append((parts[0], int(float(parts[1])) * 1024 * 1024, int(float(parts[2])) * 1024 * 1024))
+            return gpus
+    except Exception:
+        pass
+    return []
+
+def get_host_resources(config=None):
+    """Collect the memory, GPU and core facts the planner needs."""
+    config = config or load_config()
+    try:
+        import psutil
+        vm = psutil.virtual_memory()
+        ram_total, ram_free = vm.total, vm.available
+    except ImportError:
+        ram_total = ram_free = 0
+    cores = os.cpu_count() or 1
+    gpus = get_gpus()
+    gpu_bw = 0
+    for name, _, _ in gpus:
+        bw = next((v for k, v in GPU_BANDWIDTH_GBPS.items() if k in name), DEFAULT_GPU_BANDWIDTH_GBPS)
+        gpu_bw = max(gpu_bw, bw)
+    # Rough rule of thumb: ~5 GB/s of achievable DRAM bandwidth per core, 20-200 GB/s overall
+    cpu_bw = config.get("cpu_bandwidth_gbps") or min(max(cores * 5, 20), 200)
+    return {
+        "ram_total": ram_total,
+        "ram_free": ram_free,
+        "vram_total": sum(g[1] for g in gpus),
+        "vram_free": sum(g[2] for g in gpus),
+        "gpus": [g[0] for g in gpus],
+        "cores": cores,
+        "cpu_bandwidth_gbps": cpu_bw,
+        "gpu_bandwidth_gbps": config.get("gpu_bandwidth_gbps") or gpu_bw,
+    }
+
+def model_tag(base_name, size, quant):
+    """Return the Ollama tag for a size/quantisation variant (e.g. llama3.1:8b-instruct-q4_K_M)."""
+    spec = MODEL_SPECS[base_name]
+    tag = spec["tag"].format(size=size, quant=quant, variant=spec[size].get("variant", ""))
+    return f"{base_name}:{tag}"
+
+def kv_cache_bytes(spec, num_ctx):
+    """Return the f16 KV cache size for a model at the given context length."""
+    return 2 * spec["layers"] * spec["kv_heads"] * spec["head_dim"] * num_ctx * 2
+
+def estimate_variant(spec, quant, num_ctx, host):
+    """
+    Estimate memory use and decode speed of one model variant.
+    Args:
+        spec (dict): Entry from MODEL_SPECS for a single parameter size.
+        quant (str): Quantisation key from QUANT_BITS.
+        num_ctx (int): Context length in tokens.
+        host (dict): Result of get_host_resources().
+    Returns:
+        dict: weights, kv_cache and total bytes, placement ("GPU", "GPU+CPU", "CPU" or None) and tokens/sec.
+    """
+    bits = QUANT_BITS[quant]
+    weights = int(spec["params"] * 1e9 * bits / 8)
+    kv = kv_cache_bytes(spec, num_ctx)
+    total = weights + kv + RUNTIME_OVERHEAD_BYTES
+    # Each decoded token streams the active weights once; MoE models only touch their active experts
+    active = spec.get("active", spec["params"]) * 1e9 * bits / 8 + kv / 2
+
+    vram, ram = host["vram_free"], host["ram_free"]
+    gpu_bw = host["gpu_bandwidth_gbps"] * 1e9 * BANDWIDTH_EFFICIENCY
+    cpu_bw = host["cpu_bandwidth_gbps"] * 1e9 * BANDWIDTH_EFFICIENCY
+    if vram and total <= vram:
+        placement, seconds = "GPU", active / gpu_bw
+    elif total <= vram + ram:
+        gpu_share = vram / total if vram else 0
+        placement = "GPU+CPU" if vram else "CPU"
+        seconds = active * gpu_share / gpu_bw if vram else 0
+        seconds += active * (1 - gpu_share) / cpu_bw
+    else:
+        placement, seconds = None, None
+    return {
+        "weights": weights,
+        "kv_cache": kv,
+        "total": total,
+        "placement": placement,
+        "tokens_per_sec": 1 / seconds if seconds else 0.0,
+    }
+
+def plan_model(base_name, num_ctx=8192, host=None, min_quant=None, config=None):
+    """
+    Estimate every size and quantisation variant of a model family and pick the best fit.
+    Args:
+        base_name (str): Model family, e.g. "llama3.1".
+        num_ctx (int): Context length in tokens.
+        host (dict, optional): Result of get_host_resources(); collected if omitted.
+        min_quant (str, optional): Lowest quantisation worth recommending (default ``planner_min_quant`` or q4_K_M).
+        config (dict, optional): Settings to use instead of ~/.facerunner/config.yaml.
+    Returns:
+        List[dict]: One row per variant with tag, size, quant, estimates and ``recommended`` flag.
+    """
+    if base_name not in MODEL_SPECS:
+        return []
+    config = config or load_config()
+    host = host or get_host_resources(config)
+    min_quant = min_quant or config.get("planner_min_quant") or "q4_K_M"
+    floor = QUANT_ORDER.index(min_quant) if min_quant in QUANT_ORDER else 0
+
+    rows = []
+    for size in get_param_sizes(base_name):
+        for quant in QUANT_ORDER:
+            row = estimate_variant(MODEL_SPECS[base_name][size], quant, num_ctx, host)
+            row.update({"tag": model_tag(base_name, size, quant), "size": size, "quant": quant, "recommended": False})
+            rows.append(row)
+
+    for size in get_param_sizes(base_name):
+        candidates = [r for r in rows if r["size"] == size and r["placement"]
+                      and QUANT_ORDER.index(r["quant"]) >= floor]
+        if candidates:
+            max(candidates, key=lambda r: r["tokens_per_sec"])["recommended"] = True
+    return rows
+
+def recommended_variant(rows, size):
+    """Return the recommended row for a parameter size, or None if no variant fits."""
+    return next((r for r in rows if r["size"] == size and r["recommended"]), None)
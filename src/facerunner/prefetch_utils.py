@@ -0,0 +1,147 @@
+"""
+FaceRunner Prefetch Utilities - Pull model blobs into the OS page cache before Ollama loads them.
+"""
+
+import os
+import mmap
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+
+from facerunner.store_utils import read_manifest, manifest_layers, blob_path
+
+MB = 1024 ** 2
+READ_CHUNK = 16 * MB
+# Files are split into segments so several workers can stream one large blob in parallel
+SEGMENT_SIZE = 512 * MB
+# mincore() is checked one window at a time to bound the residency vector
+MINCORE_WINDOW = 1024 * MB
+
+def model_blob_files(model):
+    """Return [(digest, real_path, size)] for every blob of an installed model."""
+    manifest = read_manifest(model)
+    if not manifest:
+        raise FileNotFoundError(f"{model} is not installed")
+    files = []
+    for layer in manifest_layers(manifest):
+        path = os.path.realpath(blob_path(layer["digest"]))
+        if os.path.exists(path):
+            files.append((layer["digest"], path, os.path.getsize(path)))
+    return files
+
+def advise_willneed(path):
+    """Ask the kernel to start asynchronous readahead of a whole file (no-op where unsupported)."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        return True
+    finally:
+        os.close(fd)
+
+def read_segment(path, offset, length):
+    """Sequentially read one byte range of a file with large reads so it lands in the page cache."""
+    buf = bytearray(READ_CHUNK)
+    view = memoryview(buf)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+        end = offset + length
+        while offset < end:
+            want = min(READ_CHUNK, end - offset)
+            if hasattr(os, "preadv"):
+                got = os.preadv(fd, [view[:want]], offset)
+            else:
+                got = len(os.pread(fd, want, offset))
+            if got <= 0:
+                break
+            offset += got
+    finally:
+        os.close(fd)
+    return length
+
+def load_libc():
+    """Load libc for mmap/mincore, or None if it is not available."""
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    libc = ctypes.CDLL(name, use_errno=True)
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+    libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+    return libc
+
+def resident_bytes(path):
+    """Return how many bytes of a file are in the page cache (mincore), or None if unsupported."""
+    if not hasattr(mmap, "PROT_READ"):
+        return None
+    libc = load_libc()
+    if libc is None or not hasattr(libc, "mincore"):
+        return None
+    size = os.path.getsize(path)
+    page = mmap.PAGESIZE
+    resident = 0
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        for offset in range(0, size, MINCORE_WINDOW):
+            length = min(MINCORE_WINDOW, size - offset)
+            addr = libc.mmap(None, length, mmap.PROT_READ, mmap.MAP_SHARED, fd, offset)
+            if addr in (None, ctypes.c_void_p(-1).value):
+                return None
+            try:
+                pages = (length + page - 1) // page
+                vec = (ctypes.c_ubyte * pages)()
+                if libc.mincore(addr, length, vec) != 0:
+                    return None
+                resident += sum(1 for v in vec if v & 1) * page
+            finally:
+                libc.munmap(addr, length)
+    finally:
+        os.close(fd)
+    return min(resident, size)
+
+def resident_fraction(model):
+    """Return the fraction (0-1) of a model's blobs already in the page cache, or None if unknown."""
+    files = model_blob_files(model)
+    total = sum(size for _, _, size in files)
+    if not total:
+        return None
+    resident = 0
+    for _, path, _ in files:
+        count = resident_bytes(path)
+        if count is None:
+            return None
+        resident += count
+    return resident / total
+
+def prefetch_model(model, workers=4, method="read", progress=None):
+    """
+    Warm the page cache with every blob of a model.
+    Args:
+        model (str): Installed model reference.
+        workers (int): Parallel readers; large blobs are split into SEGMENT_SIZE ranges.
+        method (str): "read" streams the bytes (synchronous, guaranteed), "fadvise" only
+            issues POSIX_FADV_WILLNEED and lets the kernel read ahead in the background.
+        progress (callable, optional): Called with (bytes_done, bytes_total) after each segment.
+    Returns:
+        int: Bytes prefetched (or advised).
+    """
+    files = model_blob_files(model)
+    total = sum(size for _, _, size in files)
+    if method == "fadvise":
+        for _, path, _ in files:
+            advise_willneed(path)
+        return total
+
+    segments = [(path, offset, min(SEGMENT_SIZE, size - offset))
+                for _, path, size in files for offset in range(0, size, SEGMENT_SIZE)]
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for length in pool.map(lambda seg: read_segment(*seg), segments):
+            done += length
+            if progress:
+                progress(done, total)
+    return done
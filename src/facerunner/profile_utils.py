@@ -0,0 +1,126 @@
+"""
+FaceRunner Profile Utilities - Per-phase spans for CLI commands, written as Chrome traces.
+
+Spans are free when profiling is off: `span()` checks the module profiler and yields.
+With `facerunner --profile <command>` (or FACERUNNER_PROFILE=1) each span records wall
+and CPU time, and the trace is written to ~/.facerunner/traces/ in Chrome trace-event
+format (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+TRACE_DIR = os.path.join(FACERUNNER_HOME, "traces")
+# Phases the summary groups spans by, in display order
+PHASES = ("detection", "install", "launch", "readiness", "probe", "other")
+
+_profiler = None
+
+def cpu_seconds():
+    """Return CPU seconds used by this process and its waited-for children (pip, installers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class Profiler:
+    """Collects spans for one command run."""
+
+    def __init__(self, command, with_cprofile=False, trace_dir=TRACE_DIR):
+        self.command = command
+        self.trace_dir = trace_dir
+        self.events = []
+        self.lock = threading.Lock()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = cpu_seconds()
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        self.cprofile = None
+        if with_cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    @contextmanager
+    def span(self, name, phase, args=None):
+        """Record one span; nested spans show up nested in the trace viewer."""
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield
+        finally:
+            end_wall, end_cpu = time.perf_counter(), cpu_seconds()
+            event = {"name": name, "cat": phase, "ph": "X",
+                     "ts": round((wall - self.start_wall) * 1e6), "dur": round((end_wall - wall) * 1e6),
+                     "pid": os.getpid(), "tid": threading.get_ident(),
+                     "args": {"cpu_ms": round((end_cpu - cpu) * 1000, 2), **(args or {})}}
+            with self.lock:
+                self.events.append(event)
+
+    def finish(self):
+        """
+        Stop profiling and write the trace (and the cProfile dump, if enabled).
+        Returns:
+            (trace_path, prof_path or None, total wall seconds, total CPU seconds)
+        """
+        wall = time.perf_counter() - self.start_wall
+        cpu = cpu_seconds() - self.start_cpu
+        prof_path = None
+        os.makedirs(self.trace_dir, exist_ok=True)
+        base = os.path.join(self.trace_dir, f"{self.command}-{self.started_at}-{os.getpid()}")
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            prof_path = base + ".prof"
+            self.cprofile.dump_stats(prof_path)
+        root = {"name": self.command, "cat": "command", "ph": "X", "ts": 0, "dur": round(wall * 1e6),
+                "pid": os.getpid(), "tid": threading.get_ident(), "args": {"cpu_ms": round(cpu * 1000, 2)}}
+        meta = {"name": "process_name", "ph": "M", "pid": os.getpid(),
+                "args": {"name": f"facerunner {self.command}"}}
+        trace_path = base + ".json"
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": [meta, root] + self.events, "displayTimeUnit": "ms"}, f)
+        return trace_path, prof_path, wall, cpu
+
+    def summary(self):
+        """
+        Summarise spans for the end-of-command table.
+        Returns:
+            (spans, phases): spans are (name, phase, wall_s, cpu_s) in start order; phases are
+            (phase, count, wall_s, cpu_s) totals over outermost spans only, so nesting is not double-counted.
+        """
+        events = sorted(self.events, key=lambda e: (e["ts"], -e["dur"]))
+        spans = [(e["name"], e["cat"], e["dur"] / 1e6, e["args"]["cpu_ms"] / 1000) for e in events]
+        totals, covered_until = {}, {}
+        for e in events:
+            tid = e["tid"]
+            if e["ts"] < covered_until.get(tid, -1):
+                continue
+            covered_until[tid] = e["ts"] + e["dur"]
+            count, wall, cpu = totals.get(e["cat"], (0, 0.0, 0.0))
+            totals[e["cat"]] = (count + 1, wall + e["dur"] / 1e6, cpu + e["args"]["cpu_ms"] / 1000)
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        phases = [(phase, *totals[phase]) for phase in sorted(totals, key=lambda p: order.get(p, len(PHASES)))]
+        return spans, phases
+
+def start_profiling(command, with_cprofile=False):
+    """Turn on span recording for this process and return the profiler."""
+    global _profiler
+    _profiler = Profiler(command, with_cprofile=with_cprofile)
+    return _profiler
+
+def stop_profiling():
+    """Turn off span recording and return the profiler that was active (or None)."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+@contextmanager
+def span(name, phase="other", **args):
+    """Record a span named `name` in `phase` if profiling is on; otherwise do nothing."""
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name, phase, args):
+        yield
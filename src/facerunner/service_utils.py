@@ -0,0 +1,188 @@
+"""
+FaceRunner Service Utilities - Attribute CPU, memory, I/O and threads to each managed service.
+
+Each service is its root process(es) plus every descendant (Ollama's model runners,
+Open WebUI's workers). psutil handles are kept between samples so CPU and I/O rates
+are measured since the previous sample without re-enumerating the process table.
+"""
+
+import time
+import threading
+from collections import deque
+
+OLLAMA_PORT = 11434
+WEBUI_PORT = 8080
+STREAMLIT_PORT = 8501
+
+# Service name -> (substrings that must all appear in the command line, probe URL)
+SERVICES = {
+    "ollama": (["ollama", "serve"], f"http://localhost:{OLLAMA_PORT}/api/version"),
+    "open-webui": (["open-webui", "serve"], f"http://localhost:{WEBUI_PORT}/"),
+    "facerunner-webui": (["streamlit", "main.py"], f"http://localhost:{STREAMLIT_PORT}/"),
+}
+# Full process-table scan to discover services that (re)started; known trees are walked in between
+RESCAN_SECONDS = 30
+HISTORY_SIZE = 120
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def match_service(cmdline):
+    """Return the service a process command line belongs to, or None."""
+    text = " ".join(cmdline or [])
+    for service, (needles, _) in SERVICES.items():
+        if all(needle in text for needle in needles):
+            return service
+    return None
+
+def detect_leak(samples, window=10, min_growth=100 * 1024 ** 2, tolerance=4 * 1024 ** 2):
+    """
+    Return True if RSS grew monotonically over the last `window` samples.
+    Dips smaller than `tolerance` are ignored, and the total growth must exceed both
+    `min_growth` bytes and 10% of the starting RSS.
+    """
+    rss = [sample["rss"] for sample in list(samples)[-window:]]
+    if len(rss) < window or not rss[0]:
+        return False
+    if any(later < earlier - tolerance for earlier, later in zip(rss, rss[1:])):
+        return False
+    growth = rss[-1] - rss[0]
+    return growth >= min_growth and growth >= 0.1 * rss[0]
+
+class ServiceTracker:
+    """Samples each service's whole process tree, reusing psutil handles between samples."""
+
+    def __init__(self, with_pss=False, history_size=HISTORY_SIZE):
+        self.with_pss = with_pss
+        self.roots = {service: {} for service in SERVICES}
+        self.handles = {}
+        self.io_last = {}
+        self.history = {service: deque(maxlen=history_size) for service in SERVICES}
+        self.restarts = {service: 0 for service in SERVICES}
+        self.last_pids = {}
+        self.last_scan = 0.0
+        self.lock = threading.Lock()
+
+    def handle(self, proc):
+        """Return the cached handle for a process, caching this one if it is new or its PID was reused."""
+        cached = self.handles.get(proc.pid)
+        if cached is None or not cached.is_running():
+            cached = proc
+            try:
+                cached.cpu_percent(None)
+            except Exception:
+                pass
+            self.handles[proc.pid] = cached
+        return cached
+
+    def scan(self):
+        """Find each service's root processes (matching processes whose parent is not the same service)."""
+        import psutil
+        matched = {}
+        for proc in psutil.process_iter(["pid", "ppid", "cmdline"]):
+            service = match_service(proc.info.get("cmdline"))
+            if service:
+                matched[proc.info["pid"]] = (service, proc.info.get("ppid"), proc)
+        roots = {service: {} for service in SERVICES}
+        for pid, (service, ppid, proc) in matched.items():
+            if matched.get(ppid, (None,))[0] != service:
+                roots[service][pid] = self.handle(proc)
+        for service, pids in roots.items():
+            previous = self.last_pids.get(service)
+            if previous and pids and not (previous & set(pids)):
+                self.restarts[service] += 1
+            if pids:
+                self.last_pids[service] = set(pids)
+        self.roots = roots
+        self.last_scan = time.time()
+
+    def tree(self, service):
+        """Return cached handles for a service's roots and all their descendants."""
+        import psutil
+        procs = []
+        for root in list(self.roots[service].values()):
+            try:
+                procs.append(root)
+                procs.extend(self.handle(child) for child in root.children(recursive=True))
+            except psutil.NoSuchProcess:
+                continue
+        return procs
+
+    def sample(self):
+        """
+        Sample every service once.
+        Returns:
+            dict: {service: {running, procs, cpu, rss, pss, threads, fds, read_bps, write_bps,
+            uptime, restarts, leak}}.
+        """
+        import psutil
+        with self.lock:
+            now = time.time()
+            dead = any(not p.is_running() for roots in self.roots.values() for p in roots.values())
+            if dead or now - self.last_scan > RESCAN_SECONDS:
+                self.scan()
+            result, alive = {}, set()
+            for service in SERVICES:
+                totals = {"procs": 0, "cpu": 0.0, "rss": 0, "pss": None, "threads": 0, "fds": 0, "read": 0, "write": 0}
+                for proc in self.tree(service):
+                    try:
+                        with proc.oneshot():
+                            totals["cpu"] += proc.cpu_percent(None)
+                            if self.with_pss:
+                                try:
+                                    mem = proc.memory_full_info()
+                                    totals["pss"] = (totals["pss"] or 0) + getattr(mem, "pss", mem.rss)
+                                except (psutil.AccessDenied, AttributeError):
+                                    mem = proc.memory_info()
+                            else:
+                                mem = proc.memory_info()
+                            totals["rss"] += mem.rss
+                            totals["threads"] += proc.num_threads()
+                            if hasattr(proc, "num_fds"):
+                                totals["fds"] += proc.num_fds()
+                            if hasattr(proc, "io_counters"):
+                                try:
+                                    io = proc.io_counters()
+                                    totals["read"] += io.read_bytes
+                                    totals["write"] += io.write_bytes
+                                except psutil.AccessDenied:
+                                    pass
+                        totals["procs"] += 1
+                        alive.add(proc.pid)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+                read_bps = write_bps = 0.0
+                last = self.io_last.get(service)
+                if last and now > last[0]:
+                    read_bps = max(totals["read"] - last[1], 0) / (now - last[0])
+                    write_bps = max(totals["write"] - last[2], 0) / (now - last[0])
+                self.io_last[service] = (now, totals["read"], totals["write"])
+                started = []
+                for root in self.roots[service].values():
+                    try:
+                        started.append(root.create_time())
+                    except psutil.Error:
+                        continue
+                sample = {"time": now, "running": totals["procs"] > 0, "procs": totals["procs"],
+                          "cpu": totals["cpu"], "rss": totals["rss"], "pss": totals["pss"],
+                          "threads": totals["threads"], "fds": totals["fds"], "read_bps": read_bps,
+                          "write_bps": write_bps, "uptime": now - min(started) if started else 0.0,
+                          "restarts": self.restarts[service]}
+                if sample["running"]:
+                    self.history[service].append(sample)
+                else:
+                    self.history[service].clear()
+                sample["leak"] = detect_leak(self.history[service])
+                result[service] = sample
+            for pid in [pid for pid in self.handles if pid not in alive]:
+                del self.handles[pid]
+            return result
+
+def get_tracker():
+    """Return a process-wide tracker so history and handles survive between UI reruns."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = ServiceTracker(with_pss=True)
+    return _tracker
@@ -0,0 +1,203 @@
+"""
+FaceRunner Setup Utilities - In-process detection, cached installers and concurrent setup steps.
+
+`facerunner setup` used to fork `which`, reinstall open-webui in the foreground whenever
+its script was missing from PATH, and run every step one after another. Detection now
+happens in-process (PATH scan, importlib.metadata, Ollama's /api/version). Independent
+installs run at the same time, and downloads go through a local cache:
+    <cache>/wheels       wheels for open-webui and its dependencies (pip --find-links)
+    <cache>/installers   the Ollama release archive (or install.sh on other architectures)
+A cache copied to another host lets `facerunner setup --offline` run without network.
+"""
+
+import os
+import sys
+import time
+import shutil
+import platform
+import sysconfig
+import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from facerunner.api_utils import OLLAMA_URL, get_session
+from facerunner.config_utils import FACERUNNER_HOME, load_config
+
+SETUP_CACHE_DIR = os.path.join(FACERUNNER_HOME, "cache")
+OLLAMA_DOWNLOAD_URL = "https://ollama.com/download"
+OLLAMA_INSTALL_SCRIPT_URL = "https://ollama.com/install.sh"
+OPENWEBUI_PACKAGE = "open-webui"
+# Release archive names by platform.machine(); other architectures fall back to install.sh
+OLLAMA_ARCHES = {"x86_64": "amd64", "amd64": "amd64", "aarch64": "arm64", "arm64": "arm64"}
+
+def get_cache_dir(cache_dir=None):
+    """Return the setup cache directory (--cache-dir, then the setup_cache_dir setting, then the default)."""
+    path = cache_dir or load_config().get("setup_cache_dir") or SETUP_CACHE_DIR
+    return os.path.abspath(os.path.expanduser(path))
+
+def find_executable(name):
+    """Find an executable on PATH or in this interpreter's scripts directory (where pip puts it), without forking."""
+    found = shutil.which(name)
+    if found:
+        return found
+    candidate = os.path.join(sysconfig.get_path("scripts"), name)
+    return candidate if os.access(candidate, os.X_OK) else None
+
+def ollama_server_version(base_url=OLLAMA_URL, timeout=1.0):
+    """Return the running Ollama's version, or None if nothing answers."""
+    try:
+        response = get_session().get(f"{base_url}/api/version", timeout=timeout)
+        if response.status_code == 200:
+            return response.json().get("version")
+    except Exception:
+        pass
+    return None
+
+def package_version(name):
+    """Return an installed distribution's version via importlib.metadata, or None."""
+    from importlib import metadata
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+def detect_installed(base_url=OLLAMA_URL):
+    """
+    Detect Ollama and Open WebUI without spawning processes.
+    Returns:
+        dict: {"ollama": {path, version, running}, "open-webui": {path, version}}
+    """
+    server_version = ollama_server_version(base_url)
+    return {
+        "ollama": {"path": find_executable("ollama"), "version": server_version, "running": server_version is not None},
+        "open-webui": {"path": find_executable("open-webui"), "version": package_version(OPENWEBUI_PACKAGE)},
+    }
+
+def url_ready(url, timeout=30.0, interval=0.25):
+    """Poll url until it answers (any HTTP status); return True, or False after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            get_session().get(url, timeout=min(interval * 4, 2))
+            return True
+        except Exception:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+def download(url, dest, timeout=60):
+    """Download url to dest atomically (a partial download never looks cached)."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = dest + ".part"
+    with get_session().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+    os.replace(tmp_path, dest)
+    return dest
+
+def cached_ollama_archive(installers_dir, arch):
+    """Return a cached Ollama release archive for arch, whatever its compression, or None."""
+    for name in (f"ollama-linux-{arch}.tgz", f"ollama-linux-{arch}.tar.zst"):
+        path = os.path.join(installers_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def install_ollama(cache_dir, offline=False):
+    """
+    Install Ollama on Linux from the cached release archive (downloaded into the cache first if needed).
+    Returns:
+        str: What was done. Raises RuntimeError if Ollama could not be installed.
+    """
+    os_type = platform.system().lower()
+    if os_type != "linux":
+        raise RuntimeError(f"Ollama installation not automated for {os_type}. "
+                           "Please install manually from https://ollama.com/download.")
+    installers_dir = os.path.join(cache_dir, "installers")
+    arch = OLLAMA_ARCHES.get(platform.machine().lower())
+    sudo = [] if os.geteuid() == 0 else ["sudo"]
+    if arch is None:
+        script = os.path.join(installers_dir, "ollama-install.sh")
+        if not os.path.exists(script):
+            if offline:
+                raise RuntimeError(f"No cached Ollama installer in {installers_dir} (needed with --offline).")
+            download(OLLAMA_INSTALL_SCRIPT_URL, script)
+        result = subprocess.run(["sh", script], capture_output=True, text=True)
+        source = script
+    else:
+        archive = cached_ollama_archive(installers_dir, arch)
+        if archive is None:
+            if offline:
+                raise RuntimeError(f"No cached ollama-linux-{arch}.tgz in {installers_dir} (needed with --offline).")
+            archive = download(f"{OLLAMA_DOWNLOAD_URL}/ollama-linux-{arch}.tgz",
+                               os.path.join(installers_dir, f"ollama-linux-{arch}.tgz"), timeout=300)
+        # The manual install from Ollama's docs; tar detects the compression itself
+        result = subprocess.run(sudo + ["tar", "-C", "/usr", "-xf", archive], capture_output=True, text=True)
+        source = archive
+    if result.returncode != 0:
+        raise RuntimeError(f"Installing Ollama from {source} failed: {result.stderr.strip()[-500:]}")
+    return f"Ollama installed from {source}"
+
+def install_openwebui(cache_dir, offline=False):
+    """
+    Install open-webui with pip from the wheel cache, refreshing the cache first unless offline.
+    Returns:
+        str: What was done. Raises RuntimeError if pip failed.
+    """
+    wheels_dir = os.path.join(cache_dir, "wheels")
+    os.makedirs(wheels_dir, exist_ok=True)
+    pip = [sys.executable, "-m", "pip"]
+    if not offline:
+        # Wheels already in the cache are reused; only missing or newer ones are fetched
+        result = subprocess.run(pip + ["download", "--quiet", "--dest", wheels_dir, OPENWEBUI_PACKAGE],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            # Fall back to an ordinary install that may still use whatever is cached
+            result = subprocess.run(pip + ["install", "--quiet", "--find-links", wheels_dir, OPENWEBUI_PACKAGE],
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"pip install {OPENWEBUI_PACKAGE} failed: {result.stderr.strip()[-500:]}")
+            return f"{OPENWEBUI_PACKAGE} installed from the index (the wheel cache could not be refreshed)"
+    result = subprocess.run(pip + ["install", "--quiet", "--no-index", "--find-links", wheels_dir, OPENWEBUI_PACKAGE],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"pip install {OPENWEBUI_PACKAGE} from {wheels_dir} failed: {result.stderr.strip()[-500:]}")
+    version = package_version(OPENWEBUI_PACKAGE)
+    return f"{OPENWEBUI_PACKAGE} {version or ''}".strip() + f" installed from {wheels_dir}"
+
+@contextmanager
+def timed_step(name, phase, timings):
+    """Time a setup step into timings as (name, seconds, ok); also records a profile span."""
+    from facerunner.profile_utils import span
+    start = time.perf_counter()
+    ok = False
+    try:
+        with span(name, phase):
+            yield
+        ok = True
+    finally:
+        timings.append((name, time.perf_counter() - start, ok))
+
+def run_concurrently(steps, timings):
+    """
+    Run independent setup steps at the same time.
+    Args:
+        steps (list): (name, phase, callable) tuples.
+        timings (list): Receives (name, seconds, ok) per step.
+    Returns:
+        list: (name, result or None, error or None) in the order given.
+    """
+    def run(step):
+        name, phase, fn = step
+        try:
+            with timed_step(name, phase, timings):
+                return name, fn(), None
+        except Exception as e:
+            return name, None, e
+
+    if not steps:
+        return []
+    with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+        return list(pool.map(run, steps))
@@ -0,0 +1,305 @@
+"""
+FaceRunner Shaping Utilities - Bandwidth caps, download windows and load-based pausing for pulls.
+
+Ollama downloads on its own, so FaceRunner shapes a pull by controlling when it runs.
+Closing the /api/pull stream stops the download, and the partial blobs are kept.
+Pulling again resumes from them. Bytes reported by the stream are charged to token
+buckets: a global one shared by every pull in this process, and an optional per-pull
+one. A pull that runs past its budget is disconnected until the budget refills. The
+average rate then matches the cap at the granularity of a few seconds of traffic.
+Outside the configured windows, or while the host is busy, the pull is paused and
+resumed automatically afterwards.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+
+from facerunner.api_utils import OLLAMA_URL, get_session
+from facerunner.config_utils import load_config
+
+# Seconds of traffic a bucket may run ahead before the pull is disconnected
+BURST_SECONDS = 15
+MIN_BURST_BYTES = 16 * 1024 ** 2
+# Seconds between checks of the window and load while a pull runs or is paused
+CHECK_SECONDS = 15
+
+_global_bucket = None
+_global_bucket_lock = threading.Lock()
+
+class PullPaused(Exception):
+    """Internal: the running pull must be disconnected for a while."""
+
+class PullDeferred(Exception):
+    """Raised by shaped_pull(defer_window=True) outside the download windows instead of waiting."""
+
+    def __init__(self, reason, seconds, stats):
+        super().__init__(reason)
+        self.reason = reason
+        self.seconds = seconds
+        self.stats = stats
+
+def parse_rate(text):
+    """
+    Parse a rate such as "20M", "500K", "2.5MB/s" or "100mbit" into bytes per second.
+    Returns None for empty/None/0 (no limit).
+    """
+    if text in (None, "", 0):
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) or None
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kmg]?)(i?b|bit|bps)?(/s)?\s*", str(text).lower())
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r} (use e.g. 20M, 500K or 100mbit)")
+    value, prefix, unit = float(match.group(1)), match.group(2), match.group(3) or ""
+    value *= {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}[prefix]
+    if unit in ("bit", "bps"):
+        value /= 8
+    return value or None
+
+def format_rate(bytes_per_sec):
+    """Format a rate in MB/s."""
+    return f"{bytes_per_sec / 1024 ** 2:.1f} MB/s"
+
+def parse_windows(text):
+    """
+    Parse download windows such as "22:00-06:00" or "12:00-13:00, 22:00-06:00".
+    Returns:
+        list: (start_minute, end_minute) pairs; a window may wrap past midnight.
+    """
+    if not text:
+        return []
+    windows = []
+    for part in str(text).split(","):
+        match = re.fullmatch(r"\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*", part)
+        if not match:
+            raise ValueError(f"Invalid window: {part.strip()!r} (use HH:MM-HH:MM)")
+        h1, m1, h2, m2 = (int(g) for g in match.groups())
+        windows.append(((h1 % 24) * 60 + m1, (h2 % 24) * 60 + m2))
+    return windows
+
+def in_window(windows, now=None):
+    """Return True if local time is inside any window (always True with no windows)."""
+    if not windows:
+        return True
+    t = time.localtime(now)
+    minute = t.tm_hour * 60 + t.tm_min
+    for start, end in windows:
+        if start == end or (start < end and start <= minute < end) or (start > end and (minute >= start or minute < end)):
+            return True
+    return False
+
+def seconds_until_window(windows, now=None):
+    """Return seconds until the next window opens (0 if inside one)."""
+    if in_window(windows, now):
+        return 0
+    t = time.localtime(now)
+    minute = t.tm_hour * 60 + t.tm_min
+    waits = [((start - minute) % (24 * 60)) * 60 - t.tm_sec for start, _ in windows]
+    return max(min(waits), 1)
+
+class TokenBucket:
+    """A byte budget refilled at `rate` per second, allowed to run up to `burst` into debt."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate * BURST_SECONDS, MIN_BURST_BYTES)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def charge(self, nbytes):
+        """Spend bytes already transferred; return True if the bucket is now too far in debt to continue."""
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens -= nbytes
+            return self.tokens < -self.burst
+
+    def wait_seconds(self):
+        """Return how long until the bucket is back to a full burst of credit."""
+        with self.lock:
+            self.refill(time.monotonic())
+            return max(0.0, (self.burst - self.tokens) / self.rate) if self.tokens < 0 else 0.0
+
+def get_global_bucket(config=None):
+    """Return the bucket for the global pull cap (None when uncapped); rebuilt if the cap changes."""
+    global _global_bucket
+    rate = parse_rate((config or load_config()).get("pull_bandwidth_limit"))
+    with _global_bucket_lock:
+        if rate is None:
+            _global_bucket = None
+        elif _global_bucket is None or _global_bucket.rate != rate:
+            _global_bucket = TokenBucket(rate)
+        return _global_bucket
+
+def host_busy(config, base_url=OLLAMA_URL):
+    """Return a reason string if the host is too busy to download, else None."""
+    max_load = config.get("pull_pause_load")
+    if max_load and hasattr(os, "getloadavg"):
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        if load > float(max_load):
+            return f"host load {load:.2f} per core > {float(max_load):.2f}"
+    max_latency = config.get("pull_pause_latency_ms")
+    if max_latency:
+        start = time.perf_counter()
+        try:
+            get_session().get(f"{base_url}/api/version", timeout=max(float(max_latency) / 1000 * 4, 2))
+            latency = (time.perf_counter() - start) * 1000
+        except Exception:
+            latency = float("inf")
+        if latency > float(max_latency):
+            return f"Ollama latency {latency:.0f} ms > {float(max_latency):.0f} ms"
+    max_gpu = config.get("pull_pause_gpu_util")
+    if max_gpu:
+        from facerunner.hardware_utils import has_nvidia_gpu
+        if has_nvidia_gpu():
+            import subprocess
+            try:
+                result = subprocess.run(["nvidia-smi", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"],
+                                        capture_output=True, text=True, timeout=10)
+                util = max(float(v) for v in result.stdout.split()) if result.returncode == 0 else 0
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                util = 0
+            if util > float(max_gpu):
+                return f"GPU utilisation {util:.0f}% > {float(max_gpu):.0f}%"
+    return None
+
+def window_reason(config, ignore_window=False):
+    """Return (reason, seconds until a window opens) outside the download windows, else (None, 0)."""
+    windows = parse_windows(config.get("pull_windows"))
+    if not ignore_window and not in_window(windows):
+        wait = seconds_until_window(windows)
+        return f"outside download window {config.get('pull_windows')} (opens in {wait // 3600:.0f}h{wait % 3600 // 60:02.0f}m)", wait
+    return None, 0
+
+def pause_reason(config, ignore_window=False, base_url=OLLAMA_URL):
+    """Return (reason, seconds to wait) if pulls should pause now, else (None, 0)."""
+    reason, wait = window_reason(config, ignore_window)
+    if reason:
+        return reason, wait
+    busy = host_busy(config, base_url=base_url)
+    if busy:
+        return busy, CHECK_SECONDS
+    return None, 0
+
+class PullStats:
+    """Throughput and paused time for one shaped pull."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.downloaded = 0
+        self.paused = 0.0
+        self.completed = 0
+        self.total = 0
+        self.status = ""
+
+    def rate(self):
+        """Effective throughput: bytes downloaded over the whole elapsed time, pauses included."""
+        elapsed = time.monotonic() - self.started
+        return self.downloaded / elapsed if elapsed > 0 else 0.0
+
+def shaped_pull(model, base_url=OLLAMA_URL, limit=None, ignore_window=False, progress=None, config=None,
+                defer_window=False):
+    """
+    Pull a model through /api/pull within the configured cap, windows and load thresholds.
+    Args:
+        limit (float, optional): Per-pull cap in bytes per second (on top of the global cap).
+        ignore_window (bool): Start now even outside the download windows (caps and load still apply).
+        progress (callable, optional): Called with the PullStats at least once a second; may raise to abort.
+        defer_window (bool): Raise PullDeferred outside the windows rather than waiting for one to open
+            (the job queue re-queues the pull instead of holding a worker until then).
+    Returns:
+        PullStats
+    """
+    config = config or load_config()
+    buckets = [b for b in (get_global_bucket(config), TokenBucket(limit) if limit else None) if b]
+    stats = PullStats()
+    layers = {}
+    while True:
+        if defer_window:
+            reason, wait = window_reason(config, ignore_window)
+            if reason:
+                raise PullDeferred(reason, wait, stats)
+        reason, wait = pause_reason(config, ignore_window, base_url)
+        if reason is None:
+            wait = max((b.wait_seconds() for b in buckets), default=0)
+            reason = "bandwidth cap" if wait else None
+        if reason:
+            stats.status = f"Paused: {reason}"
+            pause_until = time.monotonic() + min(wait, CHECK_SECONDS)
+            while time.monotonic() < pause_until:
+                slept = time.monotonic()
+                time.sleep(max(min(1.0, pause_until - slept), 0.05))
+                stats.paused += time.monotonic() - slept
+                if progress:
+                    progress(stats)
+            continue
+        try:
+            if stream_pull(model, base_url, buckets, stats, layers, config, ignore_window, progress):
+                return stats
+        except PullPaused:
+            continue
+
+def stream_pull(model, base_url, buckets, stats, layers, config, ignore_window, progress):
+    """Run /api/pull until success (True), or raise PullPaused when a budget or pause condition trips."""
+    last_check = time.monotonic()
+    last_report = 0.0
+    with get_session().post(f"{base_url}/api/pull", json={"model": model, "stream": True},
+                            stream=True, timeout=(10, 600)) as response:
+        if response.status_code != 200:
+            raise RuntimeError(response.text.strip() or f"HTTP {response.status_code}")
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise RuntimeError(chunk["error"])
+            stats.status = chunk.get("status", "")
+            if stats.status == "success":
+                if progress:
+                    progress(stats)
+                return True
+            over_budget = False
+            digest = chunk.get("digest")
+            if digest and chunk.get("total"):
+                completed = chunk.get("completed", 0)
+                delta = max(completed - layers.get(digest, (0, 0))[0], 0)
+                layers[digest] = (completed, chunk["total"])
+                stats.downloaded += delta
+                over_budget = any([b.charge(delta) for b in buckets])
+                stats.completed = sum(c for c, _ in layers.values())
+                stats.total = sum(t for _, t in layers.values())
+            now = time.monotonic()
+            if progress and now - last_report >= 1:
+                last_report = now
+                progress(stats)
+            if over_budget:
+                raise PullPaused()
+            if now - last_check >= CHECK_SECONDS:
+                last_check = now
+                if pause_reason(config, ignore_window, base_url)[0]:
+                    raise PullPaused()
+    raise RuntimeError("Ollama closed the pull before it finished")
+
+def shaping_summary(config=None):
+    """Return a one-line description of the active pull shaping, or None if there is none."""
+    config = config or load_config()
+    parts = []
+    rate = parse_rate(config.get("pull_bandwidth_limit"))
+    if rate:
+        parts.append(f"cap {format_rate(rate)}")
+    if config.get("pull_windows"):
+        parts.append(f"window {config['pull_windows']}")
+    if config.get("pull_pause_load"):
+        parts.append(f"pause above load {config['pull_pause_load']}/core")
+    if config.get("pull_pause_latency_ms"):
+        parts.append(f"pause above {config['pull_pause_latency_ms']} ms Ollama latency")
+    if config.get("pull_pause_gpu_util"):
+        parts.append(f"pause above {config['pull_pause_gpu_util']}% GPU")
+    return ", ".join(parts) or None
@@ -0,0 +1,480 @@
+"""
+FaceRunner Simulator Utilities - A fake Ollama server for load tests, benchmarks and CI.
+
+Implements the endpoints FaceRunner talks to (/api/version, /api/tags, /api/ps,
+/api/pull, /api/generate, /api/chat, /api/embed, /api/delete) without models or a GPU.
+Loading takes time proportional to model size, tokens stream at a configured rate,
+each model serves a limited number of requests at once with a bounded wait queue,
+pulls report realistic progress and resume after a disconnect, and a fraction of
+requests can be made to fail. `facerunner simulate` or `facerunner start --simulate`
+runs it on Ollama's port.
+"""
+
+import json
+import time
+import zlib
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+OLLAMA_PORT = 11434
+SIMULATOR_VERSION = "0.0.0-facerunner-sim"
+
+DEFAULT_SIMULATION = {
+    # Models installed at startup: name -> size in GB
+    "models": {"llama3.1:8b": 4.9, "mistral:7b": 4.1, "qwen2.5-coder:1.5b": 1.0, "nomic-embed-text:latest": 0.27},
+    # Cold-load time per GB of model
+    "load_seconds_per_gb": 0.5,
+    # Seconds a model stays loaded after its last request (a request's keep_alive overrides it)
+    "keep_alive": 300,
+    # Loaded models beyond this are unloaded least-recently-used first
+    "max_loaded_models": 3,
+    # Generation speed and the prompt processing speed
+    "tokens_per_second": 40.0,
+    "prompt_tokens_per_second": 400.0,
+    # Tokens generated when a request does not set options.num_predict
+    "num_predict": 64,
+    # Requests each loaded model serves at once (OLLAMA_NUM_PARALLEL) and requests allowed to wait (OLLAMA_MAX_QUEUE)
+    "num_parallel": 4,
+    "max_queue": 64,
+    # Fraction of generate/chat/embed/pull requests that fail (HTTP 500, or an error line in a pull stream)
+    "error_rate": 0.0,
+    # Download size of pulled models not listed in `models`, and the simulated download speed
+    "pull_size_gb": 2.0,
+    "pull_bytes_per_second": 100 * 1024 ** 2,
+    "embedding_dim": 768,
+    # Seed for error injection (None = random)
+    "seed": None,
+    # Reported by /api/version (give stand-ins different versions to simulate drift across a fleet)
+    "version": SIMULATOR_VERSION,
+}
+
+WORDS = ("the model streams tokens at a steady rate while the simulator keeps count of every request "
+         "so benchmarks can compare latency throughput and queueing without a real GPU").split()
+
+class SimulatedError(Exception):
+    """A request the simulator answers with an HTTP error."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def normalize_name(name):
+    """Return a model name with its tag ("llama3.1" -> "llama3.1:latest")."""
+    name = (name or "").strip()
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+def parse_keep_alive(value, default):
+    """Return keep_alive in seconds (negative = forever) from a number or a duration like "5m"."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in ("ms", "s", "m", "h"):
+        if text.endswith(suffix):
+            try:
+                return float(text[:-len(suffix)]) * units[suffix]
+            except ValueError:
+                return default
+    try:
+        return float(text)
+    except ValueError:
+        return default
+
+def iso_time(ts):
+    """Format a timestamp the way Ollama does (RFC 3339, UTC)."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + f".{int(ts % 1 * 1e6):06d}Z"
+
+def model_details(name, size):
+    """Return /api/tags style details derived from the name and size."""
+    base, _, tag = name.partition(":")
+    family = base.split("/")[-1].rstrip("0123456789.-").split("-")[0] or "llama"
+    params = tag.split("-")[0].upper() if tag[:1].isdigit() and tag.split("-")[0][-1:] in ("b", "m") else None
+    if params is None:
+        params = f"{size / 1024 ** 3 * 1.8:.1f}B"
+    if "embed" in name:
+        family = "nomic-bert"
+    return {"parent_model": "", "format": "gguf", "family": family, "families": [family],
+            "parameter_size": params, "quantization_level": "Q4_K_M"}
+
+class SimulatedModel:
+    """An installed model and, while loaded, its request slots."""
+
+    def __init__(self, name, size, num_parallel):
+        self.name = name
+        self.size = int(size)
+        self.digest = hashlib.sha256(name.encode()).hexdigest()
+        self.modified = time.time()
+        self.details = model_details(name, self.size)
+        self.slots = threading.Semaphore(num_parallel)
+        self.load_lock = threading.Lock()
+        self.loaded = False
+        self.expires = 0.0
+        self.last_used = 0.0
+        self.active = 0
+
+class Simulator:
+    """The simulated server's state: installed and loaded models, partial pulls and counters."""
+
+    def __init__(self, settings=None):
+        self.settings = {**DEFAULT_SIMULATION, **(settings or {})}
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.settings["seed"])
+        self.models = {}
+        for name, size_gb in self.settings["models"].items():
+            self.add_model(normalize_name(name), float(size_gb) * 1024 ** 3)
+        self.partial_pulls = {}
+        self.waiting = 0
+        self.stats = {"requests": 0, "errors_injected": 0, "rejected_busy": 0, "loads": 0, "unloads": 0,
+                      "tokens_generated": 0, "bytes_pulled": 0}
+
+    def add_model(self, name, size):
+        with self.lock:
+            model = SimulatedModel(name, size, int(self.settings["num_parallel"]))
+            self.models[name] = model
+            return model
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def maybe_fail(self):
+        """Raise SimulatedError for the configured fraction of requests."""
+        with self.lock:
+            failed = self.rng.random() < float(self.settings["error_rate"])
+            if failed:
+                self.stats["errors_injected"] += 1
+        if failed:
+            raise SimulatedError(500, "simulated failure (error_rate)")
+
+    def get_model(self, name):
+        model = self.models.get(normalize_name(name))
+        if model is None:
+            raise SimulatedError(404, f'model "{name}" not found, try pulling it first')
+        return model
+
+    def expire(self, now=None):
+        """Unload models whose keep_alive has run out and that serve no request."""
+        now = now or time.time()
+        with self.lock:
+            for model in self.models.values():
+                if model.loaded and model.active == 0 and 0 <= model.expires <= now:
+                    model.loaded = False
+                    self.stats["unloads"] += 1
+
+    def ensure_loaded(self, model):
+        """Load a model if needed (sleeping for its load time); return the load time in seconds."""
+        with model.load_lock:
+            if model.loaded:
+                return 0.0
+            with self.lock:
+                loaded = sorted((m for m in self.models.values() if m.loaded and m.active == 0),
+                                key=lambda m: m.last_used)
+                excess = sum(1 for m in self.models.values() if m.loaded) + 1 - int(self.settings["max_loaded_models"])
+                for victim in loaded[:max(excess, 0)]:
+                    victim.loaded = False
+                    self.stats["unloads"] += 1
+            load_seconds = model.size / 1024 ** 3 * float(self.settings["load_seconds_per_gb"])
+            time.sleep(load_seconds)
+            with self.lock:
+                model.loaded = True
+                self.stats["loads"] += 1
+            return load_seconds
+
+    def acquire(self, model):
+        """Take one of the model's request slots, or raise a 503 when the wait queue is full."""
+        self.expire()
+        with self.lock:
+            if self.waiting >= int(self.settings["max_queue"]):
+                self.stats["rejected_busy"] += 1
+                raise SimulatedError(503, "server busy, please try again.  maximum pending requests exceeded")
+            self.waiting += 1
+        try:
+            model.slots.acquire()
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        with self.lock:
+            model.active += 1
+
+    def release(self, model, keep_alive):
+        with self.lock:
+            model.active -= 1
+            model.last_used = time.time()
+            if keep_alive == 0 and model.active == 0 and model.loaded:
+                model.loaded = False
+                self.stats["unloads"] += 1
+            else:
+                model.expires = -1 if keep_alive < 0 else model.last_used + keep_alive
+        model.slots.release()
+
+    def tags(self):
+        with self.lock:
+            return {"models": [{"name": m.name, "model": m.name, "modified_at": iso_time(m.modified), "size": m.size,
+                                "digest": m.digest, "details": m.details} for m in self.models.values()]}
+
+    def ps(self):
+        self.expire()
+        with self.lock:
+            loaded = [m for m in self.models.values() if m.loaded]
+            return {"models": [{"name": m.name, "model": m.name, "size": m.size, "digest": m.digest,
+                                "details": m.details, "size_vram": m.size,
+                                "expires_at": iso_time(m.expires if m.expires >= 0 else time.time() + 10 * 365 * 86400)}
+                               for m in loaded]}
+
+    def delete(self, name):
+        with self.lock:
+            if self.models.pop(normalize_name(name), None) is None:
+                raise SimulatedError(404, f"model '{name}' not found")
+
+    def pull_size(self, name):
+        configured = {normalize_name(n): s for n, s in self.settings["models"].items()}
+        return int(float(configured.get(name, self.settings["pull_size_gb"])) * 1024 ** 3)
+
+    def pull(self, name):
+        """Yield Ollama's /api/pull progress lines; progress survives a disconnect, like Ollama's partial blobs."""
+        name = normalize_name(name)
+        yield {"status": "pulling manifest"}
+        self.maybe_fail()
+        total = self.pull_size(name)
+        digest = "sha256:" + hashlib.sha256(name.encode()).hexdigest()
+        step_seconds = 0.1
+        step = max(int(float(self.settings["pull_bytes_per_second"]) * step_seconds), 1)
+        while True:
+            with self.lock:
+                done = self.partial_pulls.get(name, 0)
+                if name in self.models:
+                    done = total
+                advance = min(step, total - done)
+                self.partial_pulls[name] = done + advance
+                self.stats["bytes_pulled"] += advance
+            yield {"status": f"pulling {digest[7:19]}", "digest": digest, "total": total, "completed": done + advance}
+            if done + advance >= total:
+                break
+            time.sleep(step_seconds)
+        for status in ("verifying sha256 digest", "writing manifest"):
+            yield {"status": status}
+        with self.lock:
+            self.partial_pulls.pop(name, None)
+        if name not in self.models:
+            self.add_model(name, total)
+        yield {"status": "success"}
+
+    def generate(self, payload, chat=False):
+        """Yield response chunks for /api/generate or /api/chat; the last one carries Ollama's timings."""
+        started = time.time()
+        model = self.get_model(payload.get("model"))
+        keep_alive = parse_keep_alive(payload.get("keep_alive"), float(self.settings["keep_alive"]))
+        if chat:
+            prompt = " ".join(str(m.get("content", "")) for m in payload.get("messages") or [])
+        else:
+            prompt = payload.get("prompt") or ""
+        self.maybe_fail()
+        self.acquire(model)
+        try:
+            load_seconds = self.ensure_loaded(model)
+            base = {"model": model.name}
+            # An empty prompt only loads (or, with keep_alive 0, unloads) the model
+            if not prompt and not payload.get("messages"):
+                reason = "unload" if keep_alive == 0 else "load"
+                yield {**base, "created_at": iso_time(time.time()), "response": "", "done": True, "done_reason": reason}
+                return
+            prompt_tokens = max(len(prompt.split()), 1)
+            prompt_seconds = prompt_tokens / float(self.settings["prompt_tokens_per_second"])
+            time.sleep(prompt_seconds)
+            options = payload.get("options") or {}
+            num_predict = int(options.get("num_predict") or self.settings["num_predict"])
+            if num_predict < 0:
+                num_predict = int(self.settings["num_predict"])
+            token_seconds = 1.0 / float(self.settings["tokens_per_second"])
+            eval_start = time.time()
+            words = []
+            for i in range(num_predict):
+                time.sleep(token_seconds)
+                token = WORDS[(zlib.crc32(prompt.encode()) + i) % len(WORDS)] + " "
+                words.append(token)
+                self.count("tokens_generated")
+                piece = {"message": {"role": "assistant", "content": token}} if chat else {"response": token}
+                yield {**base, "created_at": iso_time(time.time()), **piece, "done": False}
+            eval_seconds = time.time() - eval_start
+            final = {**base, "created_at": iso_time(time.time()), "done": True, "done_reason": "length",
+                     "total_duration": int((time.time() - started) * 1e9), "load_duration": int(load_seconds * 1e9),
+                     "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_seconds * 1e9),
+                     "eval_count": num_predict, "eval_duration": int(eval_seconds * 1e9),
+                     "_text": "".join(words)}
+            if chat:
+                final["message"] = {"role": "assistant", "content": ""}
+            else:
+                final["response"] = ""
+            yield final
+        finally:
+            self.release(model, keep_alive)
+
+    def embed(self, payload):
+        """Return an /api/embed response with deterministic unit vectors."""
+        started = time.time()
+        model = self.get_model(payload.get("model"))
+        keep_alive = parse_keep_alive(payload.get("keep_alive"), float(self.settings["keep_alive"]))
+        texts = payload.get("input")
+        texts = [texts] if isinstance(texts, str) else list(texts or [])
+        self.maybe_fail()
+        self.acquire(model)
+        try:
+            load_seconds = self.ensure_loaded(model)
+            tokens = sum(max(len(str(t).split()), 1) for t in texts)
+            time.sleep(tokens / float(self.settings["prompt_tokens_per_second"]))
+            dim = int(self.settings["embedding_dim"])
+            embeddings = []
+            for text in texts:
+                rng = random.Random(zlib.crc32(str(text).encode()))
+                vector = [rng.gauss(0, 1) for _ in range(dim)]
+                norm = sum(v * v for v in vector) ** 0.5 or 1.0
+                embeddings.append([v / norm for v in vector])
+            return {"model": model.name, "embeddings": embeddings, "total_duration": int((time.time() - started) * 1e9),
+                    "load_duration": int(load_seconds * 1e9), "prompt_eval_count": tokens}
+        finally:
+            self.release(model, keep_alive)
+
+def make_handler(sim, log=None):
+    """Build a request handler serving the simulator's endpoints."""
+    class SimulatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b"{}") if length else {}
+            except ValueError:
+                raise SimulatedError(400, "invalid JSON body")
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_stream(self, chunks):
+            """Send chunks as NDJSON; an error before the first chunk becomes a plain HTTP error."""
+            chunks = iter(chunks)
+            first = next(chunks)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data):
+                line = (json.dumps(data) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+
+            try:
+                first.pop("_text", None)
+                write(first)
+                for chunk in chunks:
+                    chunk.pop("_text", None)
+                    write(chunk)
+            except SimulatedError as e:
+                write({"error": str(e)})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def collect(self, chunks, chat):
+            """Collapse a generation stream into the single response Ollama sends with stream: false."""
+            final = None
+            for chunk in chunks:
+                final = chunk
+            text = final.pop("_text", "")
+            if chat:
+                final["message"] = {"role": "assistant", "content": text}
+            else:
+                final["response"] = text
+            return final
+
+        def dispatch(self, method):
+            path = self.path.split("?")[0].rstrip("/")
+            sim.count("requests")
+            started = time.time()
+            status = 200
+            try:
+                if method == "GET" and path == "/api/version":
+                    self.send_json(200, {"version": sim.settings["version"]})
+                elif method == "GET" and path == "/api/tags":
+                    self.send_json(200, sim.tags())
+                elif method == "GET" and path == "/api/ps":
+                    self.send_json(200, sim.ps())
+                elif method == "GET" and path in ("", "/"):
+                    self.send_json(200, {"status": "Ollama is running (FaceRunner simulator)"})
+                elif method == "GET" and path == "/api/simulator":
+                    with sim.lock:
+                        self.send_json(200, {"settings": sim.settings, "stats": dict(sim.stats),
+                                             "waiting": sim.waiting})
+                elif method == "DELETE" and path == "/api/delete":
+                    payload = self.read_json()
+                    sim.delete(payload.get("model") or payload.get("name"))
+                    self.send_json(200, {})
+                elif method == "POST" and path == "/api/pull":
+                    payload = self.read_json()
+                    chunks = sim.pull(payload.get("model") or payload.get("name"))
+                    if payload.get("stream", True):
+                        self.send_stream(chunks)
+                    else:
+                        for chunk in chunks:
+                            pass
+                        self.send_json(200, chunk)
+                elif method == "POST" and path in ("/api/generate", "/api/chat"):
+                    payload = self.read_json()
+                    chat = path == "/api/chat"
+                    chunks = sim.generate(payload, chat=chat)
+                    if payload.get("stream", True):
+                        self.send_stream(chunks)
+                    else:
+                        self.send_json(200, self.collect(chunks, chat))
+                elif method == "POST" and path in ("/api/embed", "/api/embeddings"):
+                    self.send_json(200, sim.embed(self.read_json()))
+                else:
+                    status = 404
+                    self.send_json(404, {"error": "not found"})
+            except SimulatedError as e:
+                status = e.status
+                self.send_json(e.status, {"error": str(e)})
+            except (BrokenPipeError, ConnectionResetError):
+                status = 499
+            if log:
+                log(f"{method} {path} {status} {(time.time() - started) * 1000:.0f}ms")
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+        def do_DELETE(self):
+            self.dispatch("DELETE")
+
+        def log_message(self, format, *args):
+            pass
+
+    return SimulatorHandler
+
+def serve_simulator(port=OLLAMA_PORT, host="127.0.0.1", settings=None, log=None, ready=None):
+    """
+    Serve the simulated Ollama API until interrupted (or until server.shutdown()).
+    Args:
+        port (int): Port to listen on; 0 picks a free one.
+        ready (callable, optional): Called with the listening server (its .sim is the Simulator), e.g. to read
+            server.server_address when port is 0 or to stop it from another thread.
+    """
+    sim = Simulator(settings)
+    server = ThreadingHTTPServer((host, port), make_handler(sim, log=log))
+    server.daemon_threads = True
+    server.sim = sim
+    if ready:
+        ready(server)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,107 @@
+"""
+FaceRunner Store Utilities - Access to the Ollama model store (manifests and blobs).
+"""
+
+import os
+import json
+
+DEFAULT_REGISTRY = "registry.ollama.ai"
+DEFAULT_NAMESPACE = "library"
+DEFAULT_TAG = "latest"
+MANIFEST_ACCEPT = "application/vnd.docker.distribution.manifest.v2+json"
+
+def get_models_dir():
+    """Return the directory Ollama stores models in (honours OLLAMA_MODELS)."""
+    env_dir = os.environ.get("OLLAMA_MODELS")
+    if env_dir:
+        return os.path.expanduser(env_dir)
+    user_dir = os.path.expanduser("~/.ollama/models")
+    service_dir = "/usr/share/ollama/.ollama/models"
+    if not os.path.isdir(user_dir) and os.path.isdir(service_dir):
+        return service_dir
+    return user_dir
+
+def split_model_name(model):
+    """Split a model reference into (registry, namespace, repository, tag)."""
+    name, tag = model.strip(), DEFAULT_TAG
+    if ":" in name.rsplit("/", 1)[-1]:
+        name, tag = name.rsplit(":", 1)
+    parts = name.split("/")
+    if len(parts) >= 3:
+        return parts[0], "/".join(parts[1:-1]), parts[-1], tag
+    if len(parts) == 2:
+        return DEFAULT_REGISTRY, parts[0], parts[1], tag
+    return DEFAULT_REGISTRY, DEFAULT_NAMESPACE, parts[0], tag
+
+def normalize_model_name(model):
+    """Return a model reference with an explicit tag (``llama3.1`` -> ``llama3.1:latest``)."""
+    model = model.strip()
+    return model if ":" in model.rsplit("/", 1)[-1] else f"{model}:{DEFAULT_TAG}"
+
+def manifest_path(model, models_dir=None):
+    """Return the on-disk manifest path for a model reference."""
+    registry, namespace, repo, tag = split_model_name(model)
+    return os.path.join(models_dir or get_models_dir(), "manifests", registry, namespace, repo, tag)
+
+def read_manifest(model, models_dir=None):
+    """Read a locally installed model manifest, or None if it is not installed."""
+    path = manifest_path(model, models_dir)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def manifest_layers(manifest):
+    """Return every blob a manifest references, including its config blob."""
+    if not manifest:
+        return []
+    layers = list(manifest.get("layers", []))
+    if manifest.get("config"):
+        layers.append(manifest["config"])
+    return layers
+
+def manifest_size(manifest):
+    """Return the total size in bytes of the blobs a manifest references."""
+    return sum(layer.get("size", 0) for layer in manifest_layers(manifest))
+
+def blob_path(digest, models_dir=None):
+    """Return the on-disk path of a blob given its digest (sha256:...)."""
+    return os.path.join(models_dir or get_models_dir(), "blobs", digest.replace(":", "-"))
+
+def list_local_models(models_dir=None):
+    """List installed models as (name, manifest_path) tuples by walking the manifests directory."""
+    root = os.path.join(models_dir or get_models_dir(), "manifests")
+    models = []
+    for dirpath, _, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root).split(os.sep)
+        if len(rel) < 3:
+            continue
+        registry, namespace, repo = rel[0], "/".join(rel[1:-1]), rel[-1]
+        for tag in filenames:
+            if registry == DEFAULT_REGISTRY and namespace == DEFAULT_NAMESPACE:
+                name = f"{repo}:{tag}"
+            elif registry == DEFAULT_REGISTRY:
+                name = f"{namespace}/{repo}:{tag}"
+            else:
+                name = f"{registry}/{namespace}/{repo}:{tag}"
+            models.append((name, os.path.join(dirpath, tag)))
+    return sorted(models)
+
+def registry_manifest_url(model, registry_url=None):
+    """Return the registry URL of a model's manifest (registry_url overrides https://<registry>)."""
+    registry, namespace, repo, tag = split_model_name(model)
+    base = registry_url.rstrip("/") if registry_url else f"https://{registry}"
+    return f"{base}/v2/{namespace}/{repo}/manifests/{tag}"
+
+def fetch_registry_manifest(model, timeout=10):
+    """Fetch a model manifest from its registry, or None if unavailable."""
+    from facerunner.api_utils import get_session
+    try:
+        response = get_session().get(registry_manifest_url(model),
+                                     headers={"Accept": MANIFEST_ACCEPT}, timeout=timeout)
+        if response.status_code == 200:
+            return response.json()
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,403 @@
+"""
+FaceRunner Telemetry Utilities - A persistent, downsampled history of host and service samples.
+
+Samples live in SQLite (~/.facerunner/telemetry.db, WAL) at three resolutions:
+1-second points for an hour, 1-minute averages for a week, and 15-minute averages for a
+year. Each sample is folded into all three tiers as it is written (running mean, min and
+max per bucket), so no compaction pass is needed. Pruning per series keeps every tier
+bounded. A range query reads the finest tier that still covers the range, and merges
+buckets further when a chart needs fewer points. Only one recorder writes at a time: it
+holds a heartbeat row, and another process (the web UI or `facerunner metrics record`)
+takes over once that heartbeat goes stale.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+TELEMETRY_DB_PATH = os.path.join(FACERUNNER_HOME, "telemetry.db")
+# (resolution seconds, retention seconds) per tier, finest first
+TIERS = ((1, 3600), (60, 7 * 86400), (900, 365 * 86400))
+# A range this much older than a tier's retention still reads that tier, so "1h" measured a moment
+# before the query does not fall back to 1-minute points
+TIER_SLACK_SECONDS = 5
+PRUNE_SECONDS = 60
+# Slow probes (nvidia-smi, Ollama /api/ps) run every this many samples
+SLOW_EVERY = 5
+# A recorder whose heartbeat is older than this many intervals (at least 10 s) is replaced
+STALE_INTERVALS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    tier INTEGER NOT NULL,
+    series INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tier, series, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recorder (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO samples (tier, series, ts, value, min, max, count) VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (tier, series, ts) DO UPDATE SET
+    value = (value * count + excluded.value) / (count + 1),
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    count = count + 1
+"""
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def connect(path=None):
+    """Open the telemetry database (WAL, so the UI can read while a recorder writes)."""
+    path = path or TELEMETRY_DB_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def series_ids(conn, names):
+    """Return {name: id}, creating series that do not exist yet."""
+    conn.executemany("INSERT OR IGNORE INTO series (name) VALUES (?)", [(name,) for name in names])
+    marks = ",".join("?" * len(names))
+    return {name: sid for sid, name in conn.execute(f"SELECT id, name FROM series WHERE name IN ({marks})",
+                                                     tuple(names))}
+
+def write_samples(conn, values, ts):
+    """Fold one sample per series into every tier (caller holds a transaction)."""
+    ids = series_ids(conn, sorted(values))
+    ts = int(ts)
+    rows = []
+    for name, value in values.items():
+        value = float(value)
+        for tier, (resolution, _) in enumerate(TIERS):
+            rows.append((tier, ids[name], ts - ts % resolution, value, value, value))
+    conn.executemany(UPSERT, rows)
+
+def record(values, ts=None, path=None):
+    """Store {series name: value} samples taken at ts (default: now)."""
+    values = {name: value for name, value in values.items() if value is not None}
+    if not values:
+        return
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        write_samples(conn, values, ts or time.time())
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+def prune(now=None, path=None, conn=None):
+    """Delete points older than each tier's retention; returns the number of rows removed."""
+    now = now or time.time()
+    own = conn is None
+    conn = conn or connect(path)
+    try:
+        removed = 0
+        conn.execute("BEGIN IMMEDIATE")
+        sids = [row[0] for row in conn.execute("SELECT id FROM series")]
+        for tier, (_, retention) in enumerate(TIERS):
+            cutoff = int(now - retention)
+            for sid in sids:
+                # Per series, so each delete is a primary-key range rather than a scan
+                removed += conn.execute("DELETE FROM samples WHERE tier = ? AND series = ? AND ts < ?",
+                                        (tier, sid, cutoff)).rowcount
+        conn.execute("COMMIT")
+        return removed
+    finally:
+        if own:
+            conn.close()
+
+def list_series(path=None):
+    """Return the names of every recorded series."""
+    conn = connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM series ORDER BY name")]
+    finally:
+        conn.close()
+
+def choose_tier(since, until, max_points, now=None):
+    """
+    Pick the tier and bucket width for a range.
+    Args:
+        now (float, optional): The "now" `since` was computed from (e.g. by parse_since); default: the current time.
+    Returns:
+        (tier, step): the finest tier whose retention covers `since`, and a bucket width
+        (a multiple of its resolution) that yields at most max_points points.
+    """
+    age = (now or time.time()) - since
+    tier = next((i for i, (_, retention) in enumerate(TIERS) if age <= retention + TIER_SLACK_SECONDS),
+                len(TIERS) - 1)
+    resolution = TIERS[tier][0]
+    step = resolution
+    if max_points and (until - since) / resolution > max_points:
+        step = -(-(until - since) // (max_points * resolution)) * resolution
+    return tier, int(step)
+
+def query(names, since, until=None, max_points=600, path=None, now=None):
+    """
+    Return points for each series in [since, until].
+    Args:
+        names (list): Series names (unknown names are skipped).
+        since (float): Start timestamp.
+        until (float, optional): End timestamp (default: now).
+        max_points (int): Upper bound on points per series; buckets are merged to fit.
+        now (float, optional): The "now" since/until were computed from; picks the tier.
+    Returns:
+        dict: {name: [(ts, mean, min, max), ...]} in time order.
+    """
+    now = now or time.time()
+    until = until or now
+    tier, step = choose_tier(since, until, max_points, now)
+    conn = connect(path)
+    try:
+        marks = ",".join("?" * len(names))
+        ids = dict(conn.execute(f"SELECT id, name FROM series WHERE name IN ({marks})", tuple(names))) if names else {}
+        result = {ids[sid]: [] for sid in ids}
+        if not ids:
+            return result
+        rows = conn.execute(
+            f"SELECT series, (ts / ?) * ? AS bucket, SUM(value * count) / SUM(count), MIN(min), MAX(max) "
+            f"FROM samples WHERE tier = ? AND series IN ({','.join('?' * len(ids))}) AND ts >= ? AND ts <= ? "
+            f"GROUP BY series, bucket ORDER BY bucket",
+            (step, step, tier, *ids, int(since), int(until)))
+        for sid, bucket, mean, low, high in rows:
+            result[ids[sid]].append((bucket, mean, low, high))
+        return result
+    finally:
+        conn.close()
+
+def store_stats(path=None):
+    """Return {"rows": {tier resolution: rows}, "series": n, "bytes": database size on disk}."""
+    path = path or TELEMETRY_DB_PATH
+    conn = connect(path)
+    try:
+        rows = {TIERS[tier][0]: count for tier, count in
+                conn.execute("SELECT tier, COUNT(*) FROM samples GROUP BY tier")}
+        series = conn.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+    finally:
+        conn.close()
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return {"rows": rows, "series": series, "bytes": size}
+
+def parse_since(text, now=None):
+    """
+    Parse a start time: a duration ago ("90s", "30m", "6h", "7d", "1w", "1y") or a date ("2026-10-18 22:00").
+    Returns:
+        float: Timestamp.
+    """
+    now = now or time.time()
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdwy])\s*", str(text).lower())
+    if match:
+        units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+        return now - float(match.group(1)) * units[match.group(2)]
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d", "%H:%M"):
+        try:
+            parsed = time.strptime(str(text).strip(), fmt)
+        except ValueError:
+            continue
+        if fmt == "%H:%M":
+            # A bare time means its most recent occurrence
+            today = time.localtime(now)
+            ts = time.mktime((today.tm_year, today.tm_mon, today.tm_mday, parsed.tm_hour, parsed.tm_min, 0, 0, 0, -1))
+            return ts - 86400 if ts > now else ts
+        return time.mktime(parsed)
+    raise ValueError(f"Invalid time: {text!r} (use e.g. 30m, 6h, 7d or 2026-10-18 22:00)")
+
+def sparkline(values, width=40):
+    """Render values as a one-line bar chart."""
+    bars = "▁▂▃▄▅▆▇█"
+    values = [v for v in values if v is not None]
+    if not values:
+        return ""
+    if len(values) > width:
+        chunk = len(values) / width
+        values = [max(values[int(i * chunk):max(int((i + 1) * chunk), int(i * chunk) + 1)]) for i in range(width)]
+    low, high = min(values), max(values)
+    span = (high - low) or 1.0
+    return "".join(bars[min(int((v - low) / span * (len(bars) - 1) + 0.5), len(bars) - 1)] for v in values)
+
+class TelemetryRecorder:
+    """Samples the host and the managed services on an interval and stores them."""
+
+    def __init__(self, interval=1.0, path=None):
+        self.interval = interval
+        self.path = path
+        self.stop_event = threading.Event()
+        self.tracker = None
+        self.last_io = None
+        self.cycle = 0
+        self.last_prune = 0.0
+        self.recording = False
+
+    def host_values(self):
+        """Return host-wide samples: CPU, memory, swap, load, disk and network rates."""
+        import psutil
+        now = time.time()
+        memory = psutil.virtual_memory()
+        cpu = psutil.cpu_percent(None)
+        values = {
+            "host.memory_percent": memory.percent,
+            "host.memory_used_bytes": memory.total - memory.available,
+            "host.swap_used_bytes": psutil.swap_memory().used,
+        }
+        if hasattr(os, "getloadavg"):
+            values["host.load1"] = os.getloadavg()[0]
+        disk, net = psutil.disk_io_counters(), psutil.net_io_counters()
+        counters = (now, disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+                    net.bytes_recv if net else 0, net.bytes_sent if net else 0)
+        # CPU and rates are measured since the previous sample, so the first sample has none
+        if self.last_io and now > self.last_io[0]:
+            elapsed = now - self.last_io[0]
+            values["host.cpu_percent"] = cpu
+            for i, name in enumerate(("host.disk_read_bps", "host.disk_write_bps",
+                                      "host.net_recv_bps", "host.net_sent_bps"), start=1):
+                values[name] = max(counters[i] - self.last_io[i], 0) / elapsed
+        self.last_io = counters
+        return values
+
+    def service_values(self):
+        """Return per-service CPU, RSS, threads and running state (whole process trees)."""
+        from facerunner.service_utils import ServiceTracker
+        if self.tracker is None:
+            self.tracker = ServiceTracker()
+        values = {}
+        for service, sample in self.tracker.sample().items():
+            values[f"service.{service}.running"] = 1 if sample["running"] else 0
+            if sample["running"]:
+                values[f"service.{service}.cpu_percent"] = sample["cpu"]
+                values[f"service.{service}.rss_bytes"] = sample["rss"]
+                values[f"service.{service}.threads"] = sample["threads"]
+        return values
+
+    def slow_values(self):
+        """Return GPU and Ollama samples (these cost a fork or an HTTP call, so they run less often)."""
+        values = {}
+        from facerunner.hardware_utils import has_nvidia_gpu
+        if has_nvidia_gpu():
+            import subprocess
+            try:
+                result = subprocess.run(["nvidia-smi", "--query-gpu=utilization.gpu,memory.used",
+                                         "--format=csv,noheader,nounits"], capture_output=True, text=True, timeout=10)
+                rows = [[float(v) for v in line.split(",")] for line in result.stdout.strip().splitlines()]
+                if result.returncode == 0 and rows:
+                    values["host.gpu_util_percent"] = max(row[0] for row in rows)
+                    values["host.gpu_memory_used_bytes"] = sum(row[1] for row in rows) * 1024 ** 2
+            except (OSError, ValueError, IndexError, subprocess.TimeoutExpired):
+                pass
+        from facerunner.api_utils import list_running_models
+        models = list_running_models(timeout=2)
+        values["ollama.models_loaded"] = len(models)
+        values["ollama.loaded_bytes"] = sum(m.get("size", 0) for m in models)
+        return values
+
+    def claim(self, conn, now):
+        """Take or keep the single-recorder slot; return True if this process should record (caller holds a transaction)."""
+        from facerunner.job_utils import pid_alive
+        import socket
+        row = conn.execute("SELECT pid, host, heartbeat FROM recorder WHERE id = 1").fetchone()
+        stale = max(self.interval * STALE_INTERVALS, 10)
+        if row and row[0] != os.getpid() and now - row[2] < stale:
+            if row[1] != socket.gethostname() or pid_alive(row[0]):
+                return False
+        conn.execute("INSERT OR REPLACE INTO recorder (id, pid, host, heartbeat) VALUES (1, ?, ?, ?)",
+                     (os.getpid(), socket.gethostname(), now))
+        return True
+
+    def sample(self):
+        """Take one sample and store it if this process holds the recorder slot."""
+        conn = connect(self.path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self.recording = self.claim(conn, time.time())
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if not self.recording:
+            return
+        values = {}
+        try:
+            values.update(self.host_values())
+            values.update(self.service_values())
+        except ImportError:
+            pass
+        if self.cycle % SLOW_EVERY == 0:
+            try:
+                values.update(self.slow_values())
+            except Exception:
+                pass
+        self.cycle += 1
+        now = time.time()
+        conn = connect(self.path)
+        try:
+            if values:
+                conn.execute("BEGIN IMMEDIATE")
+                write_samples(conn, values, now)
+                conn.execute("COMMIT")
+            if now - self.last_prune >= PRUNE_SECONDS:
+                self.last_prune = now
+                prune(now, conn=conn)
+        finally:
+            conn.close()
+
+    def release(self):
+        """Give up the recorder slot so another process can take over at once."""
+        conn = connect(self.path)
+        try:
+            conn.execute("DELETE FROM recorder WHERE id = 1 AND pid = ?", (os.getpid(),))
+        finally:
+            conn.close()
+
+    def run(self):
+        """Sample until stop() is called."""
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception:
+                pass
+            self.stop_event.wait(self.interval)
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def start(self):
+        threading.Thread(target=self.run, name="facerunner-telemetry", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop the sampling loop."""
+        self.stop_event.set()
+
+def ensure_recorder(interval=None):
+    """Start this process's recorder once if telemetry is enabled (the web UI calls this on every rerun)."""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                from facerunner.config_utils import load_config
+                config = load_config()
+                if not config.get("telemetry", True):
+                    return None
+                _recorder = TelemetryRecorder(interval=interval or config.get("telemetry_interval", 1)).start()
+    return _recorder
@@ -0,0 +1,307 @@
+"""
+FaceRunner Tier Utilities - Hot/cold placement of Ollama model blobs across storage tiers.
+
+Every blob keeps its usual path under ``$OLLAMA_MODELS/blobs``. A blob placed on
+another tier lives in that tier's ``blobs`` directory and the store entry becomes a
+symlink to it, so Ollama keeps resolving blobs by digest without any configuration.
+A rebalance holds a lock file in the store, so only one moves blobs at a time.
+"""
+
+import os
+import json
+import hashlib
+from contextlib import contextmanager, nullcontext
+
+from facerunner.config_utils import load_config
+from facerunner.store_utils import get_models_dir, list_local_models, manifest_layers, normalize_model_name
+from facerunner.usage_utils import model_scores
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+COPY_CHUNK = 8 * MB
+# Lock file in the model store held while a rebalance moves blobs
+REBALANCE_LOCK_NAME = ".facerunner-rebalance.lock"
+# Suffixes of the partial copies and links a migration leaves if it is interrupted
+TMP_SUFFIXES = (".facerunner-tmp", ".facerunner-link")
+# Sequential read rates (MB/s) assumed when a tier does not set read_mbps
+DEFAULT_READ_MBPS = {"nvme": 2000, "ssd": 500, "hdd": 150}
+
+def detect_disk_kind(path):
+    """Guess whether a path lives on NVMe, SSD or HDD (Linux sysfs; 'ssd' if unknown)."""
+    try:
+        st_dev = os.stat(path).st_dev
+        sys_path = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+        if "nvme" in sys_path:
+            return "nvme"
+        # Partitions have no queue/ directory of their own; use the parent device's
+        for candidate in (sys_path, os.path.dirname(sys_path)):
+            rotational = os.path.join(candidate, "queue", "rotational")
+            if os.path.exists(rotational):
+                with open(rotational) as f:
+                    return "hdd" if f.read().strip() == "1" else "ssd"
+    except (OSError, ValueError):
+        pass
+    return "ssd"
+
+def get_tiers(config=None):
+    """
+    Return the configured storage tiers, fastest first.
+    Each tier is a dict with name, path, blobs (directory), capacity (bytes or None) and read_mbps.
+    The model store is appended as the last tier unless one of the configured tiers is the store.
+    """
+    config = config or load_config()
+    store = get_models_dir()
+    entries = list(config.get("storage_tiers") or [])
+    if not any(os.path.realpath(os.path.expanduser(e["path"])) == os.path.realpath(store) for e in entries):
+        entries.append({"name": "store", "path": store})
+    tiers = []
+    for entry in entries:
+        path = os.path.expanduser(entry["path"])
+        blobs = os.path.join(path, "blobs")
+        kind = entry.get("kind") or (detect_disk_kind(path) if os.path.exists(path) else "ssd")
+        tiers.append({
+            "name": entry.get("name", path),
+            "path": path,
+            "blobs": blobs,
+            "capacity": int(float(entry["capacity_gb"]) * GB) if entry.get("capacity_gb") else None,
+            "read_mbps": float(entry.get("read_mbps") or DEFAULT_READ_MBPS[kind]),
+            "kind": kind,
+        })
+    return tiers
+
+def store_blob_dir():
+    """Return the blobs directory of the Ollama model store."""
+    return os.path.join(get_models_dir(), "blobs")
+
+def tier_of(path, tiers):
+    """Return the tier whose blobs directory holds the real file behind path (or None)."""
+    real = os.path.realpath(path)
+    for tier in tiers:
+        tier_dir = os.path.realpath(tier["blobs"])
+        if os.path.dirname(real) == tier_dir:
+            return tier
+    return None
+
+def collect_models():
+    """Return [{name, blobs: {digest: size}}] for every installed model."""
+    models = []
+    for name, path in list_local_models():
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        blobs = {layer["digest"]: layer.get("size", 0) for layer in manifest_layers(manifest)}
+        models.append({"name": name, "blobs": blobs})
+    return models
+
+def plan_placement(models, tiers, scores):
+    """
+    Assign each blob to a tier: hottest models fill the fastest tier first.
+    A blob shared by several models follows its hottest model.
+    Args:
+        models (list): Output of collect_models().
+        tiers (list): Output of get_tiers().
+        scores (dict): {model: usage score}.
+    Returns:
+        dict: {digest: tier name}.
+    """
+    ranked = sorted(models, key=lambda m: (-scores.get(normalize_model_name(m["name"]), 0.0), m["name"]))
+    placement = {}
+    used = {t["name"]: 0 for t in tiers}
+    for model in ranked:
+        for digest, size in model["blobs"].items():
+            if digest in placement:
+                continue
+            for tier in tiers:
+                capacity = tier["capacity"]
+                if capacity is None or used[tier["name"]] + size <= capacity or tier is tiers[-1]:
+                    placement[digest] = tier["name"]
+                    used[tier["name"]] += size
+                    break
+    return placement
+
+def storage_report(config=None):
+    """
+    Describe where each model's blobs live and the expected load-time impact.
+    Returns:
+        List[dict]: name, size, score, tier (name or "mixed"), load_seconds now,
+        load_seconds on the fastest tier, and the tier the plan wants.
+    """
+    tiers = get_tiers(config)
+    store_dir = store_blob_dir()
+    scores = model_scores()
+    models = collect_models()
+    plan = plan_placement(models, tiers, scores)
+    rows = []
+    for model in models:
+        current, now_seconds = set(), 0.0
+        for digest, size in model["blobs"].items():
+            tier = tier_of(os.path.join(store_dir, digest.replace(":", "-")), tiers) or tiers[-1]
+            current.add(tier["name"])
+            now_seconds += size / (tier["read_mbps"] * MB)
+        total = sum(model["blobs"].values())
+        planned = {plan[d] for d in model["blobs"]}
+        rows.append({
+            "name": model["name"],
+            "size": total,
+            "score": scores.get(normalize_model_name(model["name"]), 0.0),
+            "tier": current.pop() if len(current) == 1 else "mixed",
+            "planned": planned.pop() if len(planned) == 1 else "mixed",
+            "load_seconds": now_seconds,
+            "fast_load_seconds": total / (tiers[0]["read_mbps"] * MB),
+        })
+    rows.sort(key=lambda r: -r["score"])
+    return rows
+
+def copy_and_verify(src, dst, digest):
+    """Copy src to dst, hashing the bytes as they stream, and fsync; raise if the SHA-256 does not match."""
+    algo, expected = digest.split(":", 1)
+    hasher = hashlib.new(algo)
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        while True:
+            chunk = fin.read(COPY_CHUNK)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            fout.write(chunk)
+        fout.flush()
+        os.fsync(fout.fileno())
+    if hasher.hexdigest() != expected or os.path.getsize(dst) != os.path.getsize(src):
+        os.remove(dst)
+        raise IOError(f"Checksum mismatch while copying {digest}")
+
+def migrate_blob(digest, target, tiers):
+    """
+    Move one blob to the target tier with copy, verify and atomic swap of the store entry.
+    Returns:
+        bool: True if the blob moved, False if it was already there.
+    """
+    name = digest.replace(":", "-")
+    entry = os.path.join(store_blob_dir(), name)
+    source = os.path.realpath(entry)
+    was_link = os.path.islink(entry)
+    current = tier_of(entry, tiers)
+    if current and current["name"] == target["name"]:
+        return False
+
+    store_is_target = os.path.realpath(target["blobs"]) == os.path.realpath(store_blob_dir())
+    if store_is_target:
+        tmp = entry + ".facerunner-tmp"
+        copy_and_verify(source, tmp, digest)
+        os.replace(tmp, entry)
+    else:
+        os.makedirs(target["blobs"], exist_ok=True)
+        destination = os.path.join(target["blobs"], name)
+        tmp = destination + ".facerunner-tmp"
+        copy_and_verify(source, tmp, digest)
+        os.replace(tmp, destination)
+        link_tmp = entry + ".facerunner-link"
+        if os.path.lexists(link_tmp):
+            os.remove(link_tmp)
+        os.symlink(destination, link_tmp)
+        os.replace(link_tmp, entry)
+    # A real file in the store was already dropped by the swap; a symlinked one still sits on its old tier
+    if was_link and os.path.realpath(entry) != source and os.path.exists(source):
+        os.remove(source)
+    return True
+
+def busy_models(base_url=None):
+    """Return the set of models Ollama has loaded; their blobs must not be moved."""
+    from facerunner.api_utils import OLLAMA_URL, list_running_models
+    return {normalize_model_name(m.get("name") or m.get("model", ""))
+            for m in list_running_models(base_url or OLLAMA_URL)}
+
+@contextmanager
+def rebalance_lock():
+    """
+    Hold the store's rebalance lock; raise RuntimeError if another rebalance holds it.
+    Yields:
+        float: When the lock was taken (the lock file's mtime).
+    """
+    path = os.path.join(get_models_dir(), REBALANCE_LOCK_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        try:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass  # no advisory locks on this platform
+        except OSError:
+            raise RuntimeError("Another storage rebalance is running") from None
+        os.utime(path)
+        yield os.path.getmtime(path)
+
+def rebalance(dry_run=False, config=None, log=None, base_url=None):
+    """
+    Move blobs so the hottest models sit on the fastest tier, skipping models Ollama has loaded.
+    /api/ps is read again before every move, since a model may be loaded while earlier blobs copy.
+    Returns:
+        dict: moved (list of (digest, from, to)), skipped (list of model names), bytes moved.
+    """
+    log = log or (lambda msg: None)
+    with nullcontext() if dry_run else rebalance_lock() as locked_at:
+        tiers = get_tiers(config)
+        by_name = {t["name"]: t for t in tiers}
+        models = collect_models()
+        plan = plan_placement(models, tiers, model_scores())
+        owners = {}
+        for model in models:
+            for digest in model["blobs"]:
+                owners.setdefault(digest, set()).add(normalize_model_name(model["name"]))
+        sizes = {d: s for m in models for d, s in m["blobs"].items()}
+        loaded = busy_models(base_url)
+        skipped = {normalize_model_name(m["name"]) for m in models} & loaded
+
+        result = {"moved": [], "skipped": [], "bytes": 0}
+        # Demote first so the fast tier has room for promotions
+        order = sorted(plan.items(), key=lambda item: [t["name"] for t in tiers].index(item[1]), reverse=True)
+        for digest, tier_name in order:
+            entry = os.path.join(store_blob_dir(), digest.replace(":", "-"))
+            if not os.path.exists(entry):
+                continue
+            current = tier_of(entry, tiers)
+            if current and current["name"] == tier_name:
+                continue
+            if not dry_run:
+                loaded = busy_models(base_url)
+            if owners[digest] & loaded:
+                skipped.update(owners[digest] & loaded)
+                continue
+            source_name = current["name"] if current else "?"
+            log(f"{digest[:19]}… {source_name} → {tier_name} ({sizes[digest] / GB:.2f} GB)")
+            if not dry_run:
+                migrate_blob(digest, by_name[tier_name], tiers)
+            result["moved"].append((digest, source_name, tier_name))
+            result["bytes"] += sizes[digest]
+        if not dry_run:
+            remove_orphans(tiers, set(sizes), locked_at)
+        result["skipped"] = sorted(skipped)
+        return result
+
+def remove_orphans(tiers, referenced, before):
+    """
+    Delete tier blobs no store entry points at any more (e.g. after `ollama rm`), and partial
+    copies older than `before` (the caller's rebalance lock), which an interrupted rebalance left.
+    """
+    store_dir = os.path.realpath(store_blob_dir())
+    removed = []
+    for tier in tiers:
+        tier_dir = os.path.realpath(tier["blobs"])
+        if not os.path.isdir(tier_dir):
+            continue
+        for name in os.listdir(tier_dir):
+            path = os.path.join(tier_dir, name)
+            if name.endswith(TMP_SUFFIXES):
+                try:
+                    stale = os.lstat(path).st_mtime < before
+                except OSError:
+                    continue
+            elif tier_dir == store_dir:
+                continue
+            else:
+                stale = name.replace("-", ":", 1) not in referenced and not os.path.lexists(os.path.join(store_dir, name))
+            if stale:
+                os.remove(path)
+                removed.append(name)
+    return removed
@@ -0,0 +1,144 @@
+"""
+FaceRunner Update Utilities - Find installed tags whose registry manifest changed and pull only those.
+"""
+
+import os
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from facerunner.api_utils import OLLAMA_URL, make_session
+from facerunner.store_utils import (
+    MANIFEST_ACCEPT, list_local_models, manifest_layers, manifest_size, blob_path,
+    normalize_model_name, registry_manifest_url
+)
+
+def local_manifest_digest(path):
+    """Return the sha256 digest of an installed manifest file, as the registry would report it."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return "sha256:" + hashlib.sha256(raw).hexdigest(), json.loads(raw)
+
+def check_tag(session, model, path, registry_url=None, timeout=10):
+    """
+    Compare one installed tag with its registry manifest.
+    The local digest is sent as If-None-Match, so an unchanged tag costs a single HEAD
+    answered with 304 (or a matching Docker-Content-Digest) and no body.
+    Returns:
+        dict: model, status ("unchanged", "changed" or "error"), local/remote digests, the
+        tag's total size and, for changed tags, the bytes of new blobs the pull will download.
+    """
+    result = {"model": model, "status": "error", "local_digest": None, "remote_digest": None,
+              "size": 0, "download": 0, "error": None}
+    try:
+        digest, manifest = local_manifest_digest(path)
+        result["local_digest"] = digest
+        result["size"] = manifest_size(manifest)
+        url = registry_manifest_url(model, registry_url)
+        headers = {"Accept": MANIFEST_ACCEPT, "If-None-Match": f'"{digest}"'}
+        response = session.head(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            result["remote_digest"] = digest
+            result["status"] = "unchanged"
+            return result
+        if response.status_code != 200:
+            result["error"] = f"HTTP {response.status_code}"
+            return result
+        remote = response.headers.get("Docker-Content-Digest")
+        if remote == digest:
+            result["remote_digest"] = remote
+            result["status"] = "unchanged"
+            return result
+
+        # Changed (or the registry gave no digest): fetch the manifest to size the download
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            result["remote_digest"] = digest
+            result["status"] = "unchanged"
+            return result
+        if response.status_code != 200:
+            result["error"] = f"HTTP {response.status_code}"
+            return result
+        remote = response.headers.get("Docker-Content-Digest") or "sha256:" + hashlib.sha256(response.content).hexdigest()
+        result["remote_digest"] = remote
+        if remote == digest:
+            result["status"] = "unchanged"
+            return result
+        remote_manifest = response.json()
+        result["status"] = "changed"
+        result["size"] = manifest_size(remote_manifest)
+        result["download"] = sum(layer.get("size", 0) for layer in manifest_layers(remote_manifest)
+                                 if not os.path.exists(blob_path(layer["digest"])))
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def check_updates(models=None, workers=16, registry_url=None, timeout=10, progress=None):
+    """
+    Check installed tags against the registry concurrently over one pooled session.
+    Args:
+        models (list, optional): Model names to check (default: every installed tag).
+        workers (int): Concurrent registry requests; also the connection pool size.
+        registry_url (str, optional): Base URL to use instead of https://<registry> (e.g. a local stand-in).
+        progress (callable, optional): Called with each tag's result as it completes.
+    Returns:
+        list: check_tag results in model name order.
+    """
+    installed = list_local_models()
+    if models:
+        wanted = {normalize_model_name(m) for m in models}
+        installed = [(name, path) for name, path in installed if name in wanted]
+    session = make_session(pool_maxsize=max(1, workers))
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(check_tag, session, name, path, registry_url, timeout) for name, path in installed]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if progress:
+                    progress(result)
+    finally:
+        session.close()
+    return sorted(results, key=lambda r: r["model"])
+
+def pull_changed(results, workers=2, base_url=OLLAMA_URL, progress=None, ignore_window=False, config=None):
+    """
+    Pull the tags check_updates marked as changed through a bounded worker pool.
+    Each pull goes through shaping_utils.shaped_pull, so the global bandwidth cap,
+    download windows and load-based pausing apply as they do to `facerunner pull`.
+    Args:
+        ignore_window (bool): Start now even outside the download windows.
+        config (dict, optional): Settings to use instead of ~/.facerunner/config.yaml.
+    Returns:
+        dict: {model: None on success or the error message}.
+    """
+    from facerunner.shaping_utils import shaped_pull
+    changed = [r["model"] for r in results if r["status"] == "changed"]
+    outcome = {}
+    if not changed:
+        return outcome
+
+    def pull_one(model):
+        try:
+            shaped_pull(model, base_url=base_url, ignore_window=ignore_window, config=config)
+            return model, None
+        except Exception as e:
+            return model, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for model, error in pool.map(pull_one, changed):
+            outcome[model] = error
+            if progress:
+                progress(model, error)
+    return outcome
+
+def bytes_saved(results):
+    """Return how many bytes a full re-pull of every checked tag would have downloaded but this run skips."""
+    saved = 0
+    for r in results:
+        if r["status"] == "unchanged":
+            saved += r["size"]
+        elif r["status"] == "changed":
+            saved += max(r["size"] - r["download"], 0)
+    return saved
@@ -0,0 +1,73 @@
+"""
+FaceRunner Usage Utilities - Per-model usage tracking with time-decayed scores.
+"""
+
+import os
+import json
+import math
+import time
+import threading
+
+from facerunner.config_utils import FACERUNNER_HOME
+from facerunner.store_utils import normalize_model_name
+
+USAGE_PATH = os.path.join(FACERUNNER_HOME, "usage.json")
+# A use counts half as much after this many days
+DEFAULT_HALF_LIFE_DAYS = 7
+
+_usage_lock = threading.Lock()
+
+def load_usage():
+    """Return the usage record: {model: {"score", "updated", "last_used", "uses"}}."""
+    try:
+        with open(USAGE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_usage(usage):
+    """Atomically write the usage record."""
+    os.makedirs(FACERUNNER_HOME, exist_ok=True)
+    tmp_path = USAGE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(usage, f)
+    os.replace(tmp_path, USAGE_PATH)
+
+def decayed(score, since, now, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Decay a score accumulated at time `since` to time `now`."""
+    return score * math.pow(0.5, max(now - since, 0) / (half_life_days * 86400.0))
+
+def record_use(models, weight=1.0, now=None):
+    """Add weight to the decayed usage score of one or more models."""
+    if isinstance(models, str):
+        models = [models]
+    now = now or time.time()
+    with _usage_lock:
+        usage = load_usage()
+        for model in models:
+            name = normalize_model_name(model)
+            entry = usage.get(name, {"score": 0.0, "updated": now, "uses": 0})
+            entry["score"] = decayed(entry["score"], entry["updated"], now) + weight
+            entry["updated"] = now
+            entry["last_used"] = now
+            entry["uses"] = entry.get("uses", 0) + 1
+            usage[name] = entry
+        try:
+            save_usage(usage)
+        except OSError:
+            pass
+
+def sample_running_models(base_url=None):
+    """Record one use for every model Ollama currently has loaded (from /api/ps)."""
+    from facerunner.api_utils import OLLAMA_URL, list_running_models
+    running = list_running_models(base_url or OLLAMA_URL)
+    names = [m.get("name") or m.get("model") for m in running if m.get("name") or m.get("model")]
+    if names:
+        record_use(names)
+    return names
+
+def model_scores(now=None):
+    """Return {model: current decayed score} for every model with recorded use."""
+    now = now or time.time()
+    return {name: decayed(entry.get("score", 0.0), entry.get("updated", now), now)
+            for name, entry in load_usage().items()}
@@ -0,0 +1,222 @@
+"""
+FaceRunner Watchdog Utilities - Supervise Ollama and Open WebUI and restart them when they fail.
+"""
+
+import os
+import json
+import time
+import random
+import signal
+import subprocess
+from collections import deque
+
+from facerunner.config_utils import FACERUNNER_HOME
+
+OLLAMA_PORT = 11434
+WEBUI_PORT = 8080
+WATCHDOG_STATE_PATH = os.path.join(FACERUNNER_HOME, "watchdog.json")
+LOG_DIR = os.path.join(FACERUNNER_HOME, "logs")
+
+DEFAULT_POLICY = {
+    # Seconds between exit checks and health probes
+    "interval": 2.0,
+    # Seconds after a (re)start before failed probes count
+    "startup_grace": 30.0,
+    # Consecutive failed probes before a running service is restarted
+    "probe_failures": 3,
+    "probe_timeout": 3.0,
+    # Restart delay: base * 2^(consecutive failures - 1), capped, with jitter
+    "backoff_base": 1.0,
+    "backoff_max": 60.0,
+    # A service that stays up this long has its backoff reset
+    "stable_seconds": 120.0,
+    # Give up after this many restarts within crash_window seconds
+    "crash_loop_restarts": 5,
+    "crash_window": 300.0,
+}
+
+def default_services(include_webui=True):
+    """Return the services `facerunner start` launches, as supervision specs."""
+    services = [{"name": "ollama", "argv": ["ollama", "serve"],
+                 "probe": f"http://localhost:{OLLAMA_PORT}/api/version"}]
+    if include_webui:
+        services.append({"name": "open-webui",
+                         "argv": ["open-webui", "serve", "--host", "0.0.0.0", "--port", str(WEBUI_PORT)],
+                         "probe": f"http://localhost:{WEBUI_PORT}/"})
+    return services
+
+def backoff_delay(failures, base=1.0, cap=60.0, rng=random):
+    """Exponential backoff with "equal jitter": half the delay is fixed, half is random."""
+    delay = min(cap, base * (2 ** max(failures - 1, 0)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+def load_watchdog_state():
+    """Return the last state the watchdog recorded, or {}."""
+    try:
+        with open(WATCHDOG_STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+class SupervisedService:
+    """One supervised process with its restart history."""
+
+    def __init__(self, spec, policy):
+        self.name = spec["name"]
+        self.argv = spec["argv"]
+        self.probe_url = spec.get("probe")
+        self.policy = policy
+        self.proc = None
+        self.state = "stopped"
+        self.started_at = None
+        self.down_since = None
+        self.downtime = 0.0
+        self.restarts = 0
+        self.failures = 0
+        self.failed_probes = 0
+        self.last_exit = None
+        self.next_start = 0.0
+        self.recent = deque()
+
+    def launch(self, now):
+        """Start the process; a missing executable counts as a failure."""
+        os.makedirs(LOG_DIR, exist_ok=True)
+        with open(os.path.join(LOG_DIR, f"{self.name}.log"), "a") as log_file:
+            try:
+                self.proc = subprocess.Popen(self.argv, stdout=log_file, stderr=log_file)
+            except OSError as e:
+                self.proc = None
+                return self.fail(now, f"could not start: {e}")
+        if self.down_since is not None:
+            self.downtime += now - self.down_since
+            self.down_since = None
+        self.started_at = now
+        self.failed_probes = 0
+        self.state = "running"
+        return f"started (pid {self.proc.pid})"
+
+    def fail(self, now, reason):
+        """Record a failure and schedule a restart, or give up if the service is crash-looping."""
+        self.last_exit = reason
+        if self.down_since is None:
+            self.down_since = now
+        if self.started_at is not None and now - self.started_at >= self.policy["stable_seconds"]:
+            self.failures = 0
+        self.failures += 1
+        self.recent.append(now)
+        while self.recent and now - self.recent[0] > self.policy["crash_window"]:
+            self.recent.popleft()
+        if len(self.recent) > self.policy["crash_loop_restarts"]:
+            self.state = "crash-loop"
+            return (f"{reason}; {len(self.recent)} failures in {self.policy['crash_window']:.0f}s, "
+                    f"giving up (crash loop)")
+        delay = backoff_delay(self.failures, self.policy["backoff_base"], self.policy["backoff_max"])
+        self.next_start = now + delay
+        self.state = "backoff"
+        return f"{reason}; restarting in {delay:.1f}s"
+
+    def probe(self):
+        """Return True if the service's health endpoint answers."""
+        if not self.probe_url:
+            return True
+        from facerunner.api_utils import get_session
+        try:
+            return get_session().get(self.probe_url, timeout=self.policy["probe_timeout"]).status_code < 500
+        except Exception:
+            return False
+
+    def check(self, now):
+        """Advance the service one step; return an event message or None."""
+        if self.state == "crash-loop":
+            return None
+        if self.state in ("stopped", "backoff"):
+            if now >= self.next_start:
+                if self.state == "backoff":
+                    self.restarts += 1
+                return self.launch(now)
+            return None
+        code = self.proc.poll()
+        if code is not None:
+            self.proc = None
+            return self.fail(now, f"exited with code {code}")
+        if now - self.started_at < self.policy["startup_grace"]:
+            return None
+        if self.probe():
+            self.failed_probes = 0
+            return None
+        self.failed_probes += 1
+        if self.failed_probes < self.policy["probe_failures"]:
+            return None
+        self.stop()
+        return self.fail(now, f"failed {self.failed_probes} health probes")
+
+    def stop(self, timeout=10):
+        """Terminate the process, killing it if it does not exit in time."""
+        if self.proc is None:
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        except OSError:
+            pass
+        self.proc = None
+
+    def status(self, now):
+        """Return a JSON-serialisable status record."""
+        downtime = self.downtime + (now - self.down_since if self.down_since is not None else 0)
+        return {"state": self.state, "pid": self.proc.pid if self.proc else None, "restarts": self.restarts,
+                "downtime_seconds": round(downtime, 1), "last_exit": self.last_exit,
+                "uptime_seconds": round(now - self.started_at, 1) if self.state == "running" else 0}
+
+def save_watchdog_state(services, now):
+    """Atomically write every service's status for `facerunner watchdog --status`."""
+    os.makedirs(FACERUNNER_HOME, exist_ok=True)
+    state = {"pid": os.getpid(), "updated": now, "services": {s.name: s.status(now) for s in services}}
+    tmp_path = WATCHDOG_STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, WATCHDOG_STATE_PATH)
+
+def run_watchdog(specs=None, policy=None, log=print):
+    """
+    Launch and supervise services until SIGTERM/SIGINT, then stop them.
+    Args:
+        specs (list, optional): {"name", "argv", "probe"} dicts (default: Ollama and Open WebUI).
+        policy (dict, optional): Overrides for DEFAULT_POLICY.
+        log (callable): Receives one line per event.
+    """
+    policy = {**DEFAULT_POLICY, **(policy or {})}
+    services = [SupervisedService(spec, policy) for spec in (specs or default_services())]
+    stopping = []
+
+    def request_stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    last_save = 0.0
+    try:
+        while not stopping:
+            now = time.time()
+            changed = False
+            for service in services:
+                event = service.check(now)
+                if event:
+                    changed = True
+                    log(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {service.name}: {event}")
+            if changed or now - last_save >= 30:
+                save_watchdog_state(services, now)
+                last_save = now
+            if all(s.state == "crash-loop" for s in services):
+                log("All supervised services are crash-looping; exiting.")
+                break
+            time.sleep(policy["interval"])
+    finally:
+        for service in services:
+            service.stop()
+            if service.state != "crash-loop":
+                service.state = "stopped"
+        save_watchdog_state(services, time.time())
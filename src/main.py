@@ -8,20 +8,82 @@ import time
 import logging
 import os
 
-from system_utils import get_gpu_info, get_host_ip
-from network_utils import verify_accessibility, configure_network
+from network_utils import verify_accessibility, check_local_services
 from ui_components import (
     create_system_monitor_sidebar,
     create_model_management_ui,
     create_popular_models_ui,
     create_vscode_integration_ui,
     create_settings_ui,
-    update_system_monitor,
-    create_model_browser_ui
+    create_model_browser_ui,
+    log_viewer_ui
 )
 
 OLLAMA_PORT = 11434
 WEBUI_PORT = 8080
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+# Seconds between service status checks (the fragment reruns alone, not the whole page)
+STATUS_REFRESH_SECONDS = 15
+
+@st.cache_resource
+def load_icon_base64(name):
+    """Read and base64-encode an SVG from src/assets once per process."""
+    import base64
+    with open(os.path.join(ASSETS_DIR, name), "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+@st.fragment(run_every=STATUS_REFRESH_SECONDS)
+def service_status_sidebar():
+    """Concise Ollama / Open WebUI status; call inside `with st.sidebar:`."""
+    ollama_ok, webui_local_ok = check_local_services()
+    st.markdown("**Service Status**")
+    button_style = "display:block;padding:0.5em 1em;margin:0.2em 0;background:#28a745;color:white;border-radius:6px;text-align:center;text-decoration:none;font-weight:600;box-shadow:0 1px 2px rgba(0,0,0,0.04);"
+    # Show Ollama status only as a styled block, not a clickable button to avoid duplicate
+    if ollama_ok:
+        st.markdown(f"<div style='{button_style}'><img src='data:image/svg+xml;base64,{load_icon_base64('ollama.svg')}' alt='Ollama' style='height:1.5em;vertical-align:middle;margin-right:0.5em;'> Ollama</div>", unsafe_allow_html=True)
+    else:
+        st.error("Ollama is not running")
+    if webui_local_ok:
+        st.markdown(f"<a href='http://localhost:{WEBUI_PORT}' target='_blank' style='{button_style}'><img src='data:image/svg+xml;base64,{load_icon_base64('openwebui.svg')}' alt='Open WebUI' style='height:1.5em;vertical-align:middle;margin-right:0.5em;'> Open WebUI</a>", unsafe_allow_html=True)
+    else:
+        st.error("Open WebUI is not running")
+
+def setup_management_ui():
+    """Create the Setup & Management UI section."""
+    st.title("🛠️ Setup & Management")
+    st.markdown("Use this page to setup and manage FaceRunner services locally.")
+    st.markdown("---")
+    st.subheader("Service Status")
+    if st.button("🔍 Check Service Status"):
+        with st.spinner("Checking service status..."):
+            status_msgs = verify_accessibility()
+        st.success("FaceRunner Web UI is running.")
+        ollama_ok = any("Ollama is accessible locally" in msg for msg in status_msgs)
+        webui_ok = any("Open WebUI is accessible locally" in msg for msg in status_msgs)
+        for msg in status_msgs:
+            st.info(msg)
+        if not ollama_ok:
+            st.warning("Ollama is not running.")
+        if not webui_ok:
+            st.warning("Open WebUI is not running.")
+        if not (ollama_ok or webui_ok):
+            st.info("To start FaceRunner services, please run `facerunner setup` in your terminal.")
+    st.markdown("**Ollama Model Management** is available in the Model Management tab.")
+
+def model_browser_page():
+    """Popular models followed by the full model browser."""
+    create_popular_models_ui()
+    create_model_browser_ui()
+
+# Navigation label -> page renderer; only the selected page runs on a rerun
+PAGES = {
+    "🤖 Model Management": create_model_management_ui,
+    "📋 Model Browser": model_browser_page,
+    "🔗 VS Code Integration": create_vscode_integration_ui,
+    "🛠️ Setup & Management": setup_management_ui,
+    "⚙️ Settings": create_settings_ui,
+    "📝 Log Viewer": log_viewer_ui,
+}
 
 def main():
     # Setup logging to ~/.facerunner/logs/facerunner.log
@@ -33,6 +95,9 @@ def main():
         handlers=[logging.FileHandler(log_path), logging.StreamHandler()]
     )
 
+    rerun_start = time.perf_counter()
+    st.set_page_config(page_title="FaceRunner Web UI", layout="wide", page_icon="🤖")
+
     # Custom CSS to reduce top margin and bring sidebar closer to the top
     st.markdown("""
         <style>
@@ -50,7 +115,6 @@ def main():
         }
         </style>
     """, unsafe_allow_html=True)
-    st.set_page_config(page_title="FaceRunner Web UI", layout="wide", page_icon="🤖")
 
     # Initialize session state
     if "sort_col" not in st.session_state:
@@ -60,99 +124,34 @@ def main():
     if "show_vscode_config_modal" not in st.session_state:
         st.session_state["show_vscode_config_modal"] = False
 
-    # Get system info
-    gpu_msg, gpu_count, gpu_types = get_gpu_info()
-    local_ip = get_host_ip()
+    # Resume queued and interrupted pulls/removals as soon as the UI process is up
+    try:
+        from facerunner.job_utils import ensure_workers
+        ensure_workers()
+    except Exception as e:
+        logging.warning(f"Job workers not started: {e}")
+    # Keep the telemetry history going while the UI runs (a `facerunner start` recorder takes precedence)
+    try:
+        from facerunner.telemetry_utils import ensure_recorder
+        ensure_recorder()
+    except Exception as e:
+        logging.warning(f"Telemetry recorder not started: {e}")
 
-    # Concise service status block in sidebar above resource info
+    # Status and monitor are fragments: they refresh on their own timers without rerunning the page
     with st.sidebar:
-        status_msgs = verify_accessibility()
-        st.markdown("**Service Status**")
-        ollama_ok = any("Ollama is accessible locally" in msg for msg in status_msgs)
-        webui_local_ok = any("Open WebUI is accessible locally" in msg for msg in status_msgs)
-        button_style = "display:block;padding:0.5em 1em;margin:0.2em 0;background:#28a745;color:white;border-radius:6px;text-align:center;text-decoration:none;font-weight:600;box-shadow:0 1px 2px rgba(0,0,0,0.04);"
-        import base64
-        def svg_to_base64(path):
-            with open(path, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
-        ollama_icon_b64 = svg_to_base64("src/assets/ollama.svg")
-        openwebui_icon_b64 = svg_to_base64("src/assets/openwebui.svg")
-        # Show Ollama status only as a styled block, not a clickable button to avoid duplicate
-        if ollama_ok:
-            st.markdown(f"<div style='{button_style}'><img src='data:image/svg+xml;base64,{ollama_icon_b64}' alt='Ollama' style='height:1.5em;vertical-align:middle;margin-right:0.5em;'> Ollama</div>", unsafe_allow_html=True)
-        else:
-            st.error("Ollama is not running")
-        if webui_local_ok:
-            st.markdown(f"<a href='http://localhost:{WEBUI_PORT}' target='_blank' style='{button_style}'><img src='data:image/svg+xml;base64,{openwebui_icon_b64}' alt='Open WebUI' style='height:1.5em;vertical-align:middle;margin-right:0.5em;'> Open WebUI</a>", unsafe_allow_html=True)
-        else:
-            st.error("Open WebUI is not running")
+        service_status_sidebar()
         st.markdown("---")
-
-        # Sidebar with live system load bar graphs and Ollama mode toggle
-        st.sidebar.title("FaceRunner")
+        st.title("FaceRunner")
         # Ollama mode is now always local
         st.session_state["ollama_mode"] = "Local"
-        # Create system monitor
         create_system_monitor_sidebar()
-        st.sidebar.markdown("---")
-
-    # Add refresh button for system monitor
-    if st.sidebar.button("🔄 Refresh System Monitor"):
-        update_system_monitor()
-        st.sidebar.success("System monitor updated!")
-
-    # Modern tab-based navigation
-    tab_labels = [
-        "🤖 Model Management",
-        "📋 Model Browser",
-        "🔗 VS Code Integration",
-        "🛠️ Setup & Management",
-        "⚙️ Settings"
-            ,"📝 Log Viewer"
-    ]
-
-    if "active_tab" not in st.session_state:
-        st.session_state["active_tab"] = 0
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(tab_labels)
-    active_tab = st.session_state["active_tab"]
-
-    with tab1:
-        create_model_management_ui()
-
-    with tab2:
-        create_popular_models_ui()
-        create_model_browser_ui()
-
-    with tab3:
-        create_vscode_integration_ui()
-
-    with tab4:
-        st.title("🛠️ Setup & Management")
-        st.markdown("Use this page to setup and manage FaceRunner services locally.")
         st.markdown("---")
-        st.subheader("Service Status")
-        if st.button("🔍 Check Service Status"):
-            with st.spinner("Checking service status..."):
-                status_msgs = verify_accessibility()
-            st.success("FaceRunner Web UI is running.")
-            ollama_ok = any("Ollama is accessible locally" in msg for msg in status_msgs)
-            webui_ok = any("Open WebUI is accessible locally" in msg for msg in status_msgs)
-            for msg in status_msgs:
-                st.info(msg)
-            if not ollama_ok:
-                st.warning("Ollama is not running.")
-            if not webui_ok:
-                st.warning("Open WebUI is not running.")
-            if not (ollama_ok or webui_ok):
-                st.info("To start FaceRunner services, please run `facerunner setup` in your terminal.")
-        st.markdown("**Ollama Model Management** is available in the Model Management tab.")
-
-    with tab5:
-        create_settings_ui()
-
-        with tab6:
-            from ui_components import log_viewer_ui
-            log_viewer_ui()
+
+    # Tab-style navigation; unlike st.tabs, pages that are not selected do no work
+    page = st.radio("Navigation", tuple(PAGES), horizontal=True, key="active_tab", label_visibility="collapsed")
+    PAGES[page]()
+
+    logging.info(f"UI rerun ({page}) took {(time.perf_counter() - rerun_start) * 1000:.0f} ms")
 
 if __name__ == "__main__":
     try:
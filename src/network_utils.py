@@ -4,11 +4,15 @@ FaceRunner Network Utilities - Network configuration and verification functions.
 
 import requests
 import json
-from pathlib import Path
+
+from facerunner.flight_utils import coalesced, get_flights
 
 OLLAMA_PORT = 11434
 WEBUI_PORT = 8080
+# Seconds a finished status probe is shared between sessions
+STATUS_SHARE_SECONDS = 5
 
+@coalesced(ttl=STATUS_SHARE_SECONDS)
 def verify_accessibility():
     """Verify Ollama and WebUI accessibility."""
     from system_utils import get_host_ip
@@ -47,6 +51,21 @@ def verify_accessibility():
 
     return messages
 
+@coalesced(ttl=STATUS_SHARE_SECONDS)
+def check_local_services(timeout=2):
+    """
+    Cheap liveness check for the sidebar: no generation request, loopback only.
+    Returns:
+        (ollama_ok, webui_ok)
+    """
+    results = []
+    for url in (f"http://localhost:{OLLAMA_PORT}/api/version", f"http://localhost:{WEBUI_PORT}"):
+        try:
+            results.append(requests.get(url, timeout=timeout).status_code == 200)
+        except requests.RequestException:
+            results.append(False)
+    return results[0], results[1]
+
 def configure_network():
     """Configure network and firewall settings."""
     from system_utils import get_os, configure_firewall_linux, configure_firewall_windows, configure_firewall_macos, get_host_ip
@@ -66,45 +85,19 @@ def configure_network():
     messages.append("Ensure your network allows connections to ports 11434 and 8080.")
     return messages
 
-def integrate_vscode(ip):
-    """Generate VS Code Continue config for the given host IP."""
-    import yaml
-    from ollama_utils import list_installed_models
+def integrate_vscode(ip, refresh=False):
+    """Generate VS Code Continue config for the given host IP, assigning roles by measured latency."""
+    from facerunner.latency_utils import build_continue_config, write_continue_config
 
     import streamlit as st
     ollama_mode = st.session_state.get("ollama_mode", "Docker")
-    models_output = list_installed_models()
-    models = []
-    lines = models_output.strip().split('\n')
-    for line in lines[1:]:
-        if line.strip():
-            parts = line.split()
-            model_id = parts[0]
-            if ollama_mode == "Local":
-                api_base = f"http://127.0.0.1:{OLLAMA_PORT}"
-            else:
-                api_base = f"http://{ip}:{OLLAMA_PORT}"
-            model_entry = {
-                "name": model_id,
-                "provider": "ollama",
-                "model": model_id,
-                "apiBase": api_base
-            }
-            models.append(model_entry)
-
-    config = {
-        "name": "Local Agent",
-        "version": "1.0.0",
-        "schema": "v1",
-        "models": models
-    }
-
-    config_yaml = yaml.dump(config, sort_keys=False)
-
-    config_dir = Path.home() / ".continue"
-    config_dir.mkdir(exist_ok=True)
-    config_file = config_dir / "config.yaml"
-    with open(config_file, 'w') as f:
-        f.write(config_yaml)
-
-    return config_yaml
+    if ollama_mode == "Local":
+        api_base = f"http://127.0.0.1:{OLLAMA_PORT}"
+    else:
+        api_base = f"http://{ip}:{OLLAMA_PORT}"
+    # Measuring probes every model; sessions generating the same config at once share one run
+    config, roles, measurements = get_flights().do(
+        ("continue-config", api_base, refresh), lambda: build_continue_config(api_base, refresh=refresh))
+    st.session_state["vscode_roles"] = roles
+    st.session_state["vscode_measurements"] = measurements
+    return write_continue_config(config)
@@ -1,4 +1,10 @@
 
+from facerunner.flight_utils import coalesced
+
+# Seconds a finished read (model list, task status) is shared between sessions
+READ_SHARE_SECONDS = 2
+
+@coalesced(ttl=READ_SHARE_SECONDS)
 def get_active_ollama_task():
     """Return a string describing the current Ollama task, if any."""
     try:
@@ -24,6 +30,7 @@ import streamlit as st
 
 OLLAMA_PORT = 11434
 WEBUI_PORT = 8080
+MODEL_CATALOG_URL = "https://ollama-models.zwz.workers.dev/"
 
 def parse_model_name(model_input):
     """Parse and convert various model name formats to Ollama format."""
@@ -79,24 +86,38 @@ def parse_model_name(model_input):
     # If no conversion found, try the original name
     return model_name, f"No conversion found for {model_name}, trying as-is"
 
-def pull_model(model_input):
-    """Pull a model using Ollama."""
+def queue_pull(model_input, priority=0, rate_limit=None, ignore_window=False):
+    """
+    Queue a background pull; progress is shown in the Jobs panel and survives reruns and restarts.
+    Args:
+        rate_limit (float, optional): Per-pull cap in bytes per second (the global cap still applies).
+        ignore_window (bool): Start now even outside the configured download windows.
+    """
     try:
+        from facerunner.job_utils import enqueue, ensure_workers
         ollama_model, conversion_msg = parse_model_name(model_input)
-        if conversion_msg:
+        if conversion_msg and "Converted" in conversion_msg:
             st.info(conversion_msg)
-        result = subprocess.run(["ollama", "pull", ollama_model], capture_output=True, text=True)
-        if result.returncode == 0:
-            return f"✅ Model {ollama_model} pulled successfully."
-        else:
-            return f"❌ Error pulling model {ollama_model}: {result.stderr}"
-    except subprocess.CalledProcessError as e:
-        return f"❌ Error pulling model: {e}"
+        ensure_workers()
+        job_id = enqueue("pull", ollama_model, priority=priority, rate_limit=rate_limit,
+                         ignore_window=ignore_window)
+        return f"📥 Queued pull of {ollama_model} (job #{job_id})."
     except Exception as e:
-        return f"❌ Unexpected error: {e}"
+        return f"❌ Could not queue pull: {e}"
 
+def queue_remove(model_name):
+    """Queue a background removal."""
+    try:
+        from facerunner.job_utils import enqueue, ensure_workers
+        ensure_workers()
+        job_id = enqueue("remove", model_name)
+        return f"🗑️ Queued removal of {model_name} (job #{job_id})."
+    except Exception as e:
+        return f"❌ Could not queue removal: {e}"
+
+@coalesced(ttl=READ_SHARE_SECONDS)
 def list_installed_models():
-    """List all installed Ollama models."""
+    """List all installed Ollama models (one `ollama list` serves every session asking at once)."""
     try:
         result = subprocess.run(["ollama", "list"], capture_output=True, text=True)
         if result.returncode == 0:
@@ -108,15 +129,11 @@ def list_installed_models():
     except Exception as e:
         return f"Unexpected error: {e}"
 
-def remove_model(model_name):
-    """Remove a model from Ollama."""
-    try:
-        result = subprocess.run(["ollama", "rm", model_name], capture_output=True, text=True)
-        if result.returncode == 0:
-            return f"✅ Model {model_name} removed successfully."
-        else:
-            return f"❌ Error removing model {model_name}: {result.stderr}"
-    except subprocess.CalledProcessError as e:
-        return f"❌ Error removing model: {e}"
-    except Exception as e:
-        return f"❌ Unexpected error: {e}"
+@coalesced(ttl=3600)
+def fetch_model_catalog():
+    """Fetch the community Ollama model list; shared by all sessions for an hour (errors are not cached)."""
+    from facerunner.api_utils import get_session
+    response = get_session().get(MODEL_CATALOG_URL, timeout=15)
+    if response.status_code != 200:
+        raise RuntimeError(f"Ollama community list returned HTTP {response.status_code}")
+    return response.json()
@@ -4,7 +4,6 @@ FaceRunner System Utilities - System monitoring and basic utilities.
 
 import subprocess
 import platform
-import socket
 import os
 import re
 from pathlib import Path
@@ -13,31 +12,27 @@ OLLAMA_PORT = 11434
 WEBUI_PORT = 8080
 
 def get_gpu_info():
-    """Utility to get GPU info (type and count)"""
+    """Utility to get GPU info (type and count) from the saved hardware inventory"""
+    from facerunner.hardware_utils import get_inventory
     try:
-        result = subprocess.run([
-            "nvidia-smi", "--query-gpu=name,count", "--format=csv,noheader"
-        ], capture_output=True, text=True)
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')
-            gpus = [line.split(',')[0].strip() for line in lines if line.strip()]
-            count = len(gpus)
-            if count == 0:
-                return "No GPU detected. Running on CPU.", 0, []
-            return f"{count} GPU(s) detected: {', '.join(gpus)}", count, gpus
-        else:
-            return "No GPU detected (nvidia-smi not available). Running on CPU.", 0, []
+        gpus = [gpu["name"] for gpu in get_inventory()["gpus"]]
     except Exception:
-        return "No GPU detected (nvidia-smi error). Running on CPU.", 0, []
+        return "No GPU detected (hardware inventory error). Running on CPU.", 0, []
+    if not gpus:
+        return "No GPU detected. Running on CPU.", 0, []
+    return f"{len(gpus)} GPU(s) detected: {', '.join(gpus)}", len(gpus), gpus
 
-def get_system_load():
-    """Get system load information"""
+def get_system_load(interval=0.5):
+    """Get system load information (interval=None measures CPU since the previous call without blocking)"""
     try:
         import psutil
-        cpu = psutil.cpu_percent(interval=0.5)
+        cpu = psutil.cpu_percent(interval=interval)
         mem = psutil.virtual_memory().percent
         gpu_load = None
+        from facerunner.hardware_utils import has_nvidia_gpu
         try:
+            if not has_nvidia_gpu():
+                return cpu, mem, None
             result = subprocess.run(
                 ["nvidia-smi", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"],
                 capture_output=True, text=True
@@ -51,13 +46,10 @@ def get_system_load():
         return 0, 0, None
 
 def get_host_ip():
-    """Get the host's IP address."""
+    """Get the host's IP address (from the saved hardware inventory)."""
+    from facerunner.hardware_utils import get_primary_ip
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        return get_primary_ip()
     except Exception:
         return "127.0.0.1"
 
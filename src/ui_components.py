@@ -1,18 +1,12 @@
-import requests
-
 def create_model_browser_ui():
     """Create the Model Browser UI section for browsing available models from Ollama."""
     st.title("📋 Model Browser")
     st.markdown("Browse available models from Ollama. Search and pull models directly.")
 
     # Fetch models from the community-maintained Ollama models list
+    from ollama_utils import fetch_model_catalog
     try:
-        response = requests.get("https://ollama-models.zwz.workers.dev/")
-        if response.status_code == 200:
-            models = response.json()
-        else:
-            st.error("Failed to fetch models from Ollama community list.")
-            models = []
+        models = fetch_model_catalog()
     except Exception as e:
         st.error(f"Error fetching models: {e}")
         models = []
@@ -21,44 +15,20 @@ def create_model_browser_ui():
     search = st.text_input("Search models", "")
     filtered_models = [m for m in models if search.lower() in m.get("name", "").lower()]
 
-    # Parameter size options for popular models
-    PARAM_SIZES = {
-        "llama3.1": ["8b", "70b", "405b"],
-        "llama3": ["8b", "70b", "405b"],
-        "codellama": ["7b", "13b", "34b"],
-        "mistral": ["7b", "8x7b"],
-        "phi3": ["3.8b", "14b"],
-        "gemma": ["2b", "7b"],
-        "gemma2": ["2b", "9b", "27b"],
-        "wizardlm2": ["8x22b"],
-        "mixtral": ["8x7b"],
-        # Add more as needed
-    }
-
-    # Estimated filesize (GB) for common models and sizes
-    ESTIMATED_SIZE_GB = {
-        "llama3.1:8b": 4.5,
-        "llama3.1:70b": 40,
-        "llama3.1:405b": 220,
-        "llama3:8b": 4.5,
-        "llama3:70b": 40,
-        "llama3:405b": 220,
-        "codellama:7b": 4.5,
-        "codellama:13b": 8,
-        "codellama:34b": 22,
-        "mistral:7b": 4.5,
-        "mistral:8x7b": 32,
-        "phi3:3.8b": 2.2,
-        "phi3:14b": 8.5,
-        "gemma:2b": 1.2,
-        "gemma:7b": 4.5,
-        "gemma2:2b": 1.2,
-        "gemma2:9b": 5.5,
-        "gemma2:27b": 16.0,
-        "wizardlm2:8x22b": 48.0,
-        "mixtral:8x7b": 32.0,
-        # Add more as needed
-    }
+    # Quantisation / context planner: size every variant against this host's memory
+    from facerunner.planner_utils import QUANT_ORDER, get_param_sizes, plan_model, recommended_variant
+    num_ctx = st.select_slider(
+        "Context length (num_ctx)",
+        options=[2048, 4096, 8192, 16384, 32768, 65536, 131072],
+        value=8192,
+        help="KV cache memory grows linearly with the context length."
+    )
+    host = planner_host()
+    gb = 1024 ** 3
+    st.caption(
+        f"Planning for {host['ram_free'] / gb:.1f} GB free RAM, {host['vram_free'] / gb:.1f} GB free VRAM, "
+        f"{host['cores']} cores"
+    )
 
     if filtered_models:
         for model in filtered_models:
@@ -67,37 +37,62 @@ def create_model_browser_ui():
             st.write(model.get('description', ''))
 
             base_name = model_name.split(':')[0]
-            sizes = PARAM_SIZES.get(base_name, None)
+            sizes = get_param_sizes(base_name)
             if sizes:
-                size = st.selectbox(
+                rows = plan_model(base_name, num_ctx=num_ctx, host=host)
+                col1, col2 = st.columns(2)
+                size = col1.selectbox(
                     f"Select parameter size for {model_name}",
                     sizes,
                     key=f"size_{model_name}"
                 )
-                full_model_name = f"{base_name}:{size}"
-                est_size = ESTIMATED_SIZE_GB.get(full_model_name)
-                size_str = f"{size} ({est_size:.1f} GB)" if est_size else size
-                st.caption(f"Parameter size: {size_str}")
+                best = recommended_variant(rows, size)
+                quant = col2.selectbox(
+                    "Quantisation",
+                    QUANT_ORDER,
+                    index=QUANT_ORDER.index(best["quant"]) if best else QUANT_ORDER.index("q4_K_M"),
+                    key=f"quant_{model_name}_{size}_{num_ctx}"
+                )
+                chosen = next(r for r in rows if r["size"] == size and r["quant"] == quant)
+                full_model_name = chosen["tag"]
+                if chosen["placement"]:
+                    st.caption(
+                        f"Weights {chosen['weights'] / gb:.1f} GB + KV cache {chosen['kv_cache'] / gb:.1f} GB "
+                        f"@ {num_ctx} ctx → {chosen['total'] / gb:.1f} GB on {chosen['placement']}, "
+                        f"~{chosen['tokens_per_sec']:.0f} tokens/s"
+                    )
+                else:
+                    st.warning(f"{full_model_name} needs {chosen['total'] / gb:.1f} GB and will not fit on this host.")
+                if best:
+                    st.caption(f"Recommended: `{best['tag']}`")
+                with st.expander(f"📐 All {base_name} variants"):
+                    st.dataframe([
+                        {
+                            "Tag": r["tag"],
+                            "Weights (GB)": round(r["weights"] / gb, 1),
+                            "KV cache (GB)": round(r["kv_cache"] / gb, 1),
+                            "Total (GB)": round(r["total"] / gb, 1),
+                            "Placement": r["placement"] or "won't fit",
+                            "Tokens/s": round(r["tokens_per_sec"], 1),
+                            "Recommended": "⭐" if r["recommended"] else "",
+                        }
+                        for r in rows
+                    ], use_container_width=True)
             else:
                 full_model_name = model_name
-                est_size = ESTIMATED_SIZE_GB.get(full_model_name)
                 if ':' in model_name:
                     size_str = model_name.split(':')[1]
                 else:
                     size_str = "default"
-                if est_size:
-                    st.caption(f"Parameter size: {size_str} ({est_size:.1f} GB)")
-                else:
-                    st.caption(f"Parameter size: {size_str}")
+                st.caption(f"Parameter size: {size_str}")
 
             if st.button(f"Pull {full_model_name}", key=f"pull_{model_name}"):
-                from ollama_utils import pull_model
-                with st.spinner(f"Pulling {full_model_name}..."):
-                    msg = pull_model(full_model_name)
-                    if "successfully" in msg:
-                        st.success(msg)
-                    else:
-                        st.error(msg)
+                from ollama_utils import queue_pull
+                msg = queue_pull(full_model_name)
+                if msg.startswith("❌"):
+                    st.error(msg)
+                else:
+                    st.toast(msg)
             st.markdown("---")
 
 
@@ -126,68 +121,189 @@ import streamlit as st
 import time
 import threading
 
-def create_system_monitor_sidebar():
-    """Create live-updating system monitor in sidebar."""
-    from system_utils import get_gpu_info, get_system_load
-    import time
+from facerunner.flight_utils import coalesced
 
-    gpu_msg, gpu_count, gpu_types = get_gpu_info()
+# Seconds between system monitor refreshes (the fragment reruns alone, not the whole page)
+MONITOR_REFRESH_SECONDS = 10
+# Seconds the Model Browser plans against the same free RAM/VRAM reading
+PLANNER_HOST_SECONDS = 5
+
+@coalesced(ttl=PLANNER_HOST_SECONDS)
+def planner_host():
+    """Host facts for the planner; re-read every few seconds since free memory changes as models load and unload."""
+    from facerunner.planner_utils import get_host_resources
+    return get_host_resources()
+
+def load_bar(label, value, color, text):
+    """Return the HTML for one monitor bar."""
+    return (f"{label}: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'>"
+            f"<div style='background:{color};width:{value}%;height:10px;border-radius:5px;'></div></div>"
+            f"<span style='font-size:0.9em'>{text}</span>")
 
-    # Create placeholders for the bars
-    cpu_placeholder = st.sidebar.empty()
-    mem_placeholder = st.sidebar.empty()
-    gpu_placeholder = st.sidebar.empty()
+@st.fragment(run_every=MONITOR_REFRESH_SECONDS)
+def create_system_monitor_sidebar():
+    """Live system monitor; call inside `with st.sidebar:`. Refreshes on its own timer as a fragment."""
+    from system_utils import get_system_load
 
-    # Get initial values
-    cpu, mem, gpu_load = get_system_load()
+    # Block for a 0.5s CPU sample only on the first render; later runs measure since the previous one
+    interval = None if st.session_state.get("cpu_sampled") else 0.5
+    cpu, mem, gpu_load = get_system_load(interval=interval)
+    st.session_state["cpu_sampled"] = True
 
-    # Display initial bars
-    cpu_placeholder.markdown(f"CPU: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#4caf50;width:{cpu}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{cpu:.1f}%</span>", unsafe_allow_html=True)
-    mem_placeholder.markdown(f"Memory: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#2196f3;width:{mem}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{mem:.1f}%</span>", unsafe_allow_html=True)
+    st.markdown(load_bar("CPU", cpu, "#4caf50", f"{cpu:.1f}%"), unsafe_allow_html=True)
+    st.markdown(load_bar("Memory", mem, "#2196f3", f"{mem:.1f}%"), unsafe_allow_html=True)
     if gpu_load is not None:
-        gpu_placeholder.markdown(f"GPU: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#ff9800;width:{gpu_load}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{gpu_load}%</span>", unsafe_allow_html=True)
+        st.markdown(load_bar("GPU", gpu_load, "#ff9800", f"{gpu_load}%"), unsafe_allow_html=True)
     else:
-        gpu_placeholder.markdown(f"GPU: <span style='font-size:0.9em'>N/A</span>", unsafe_allow_html=True)
-
-    # Store placeholders in session state for updates
-    if 'system_monitor_placeholders' not in st.session_state:
-        st.session_state['system_monitor_placeholders'] = {
-            'cpu': cpu_placeholder,
-            'mem': mem_placeholder,
-            'gpu': gpu_placeholder,
-            'last_update': time.time()
-        }
-
-    # Auto-refresh every 30 seconds
-    current_time = time.time()
-    if 'system_monitor_placeholders' in st.session_state:
-        last_update = st.session_state['system_monitor_placeholders'].get('last_update', 0)
-        if current_time - last_update > 30:  # 30 seconds
-            update_system_monitor()
-            st.session_state['system_monitor_placeholders']['last_update'] = current_time
-
-def update_system_monitor():
-    """Update the system monitor bars with current values."""
-    from system_utils import get_system_load
-    import time
+        st.markdown(f"GPU: <span style='font-size:0.9em'>N/A</span>", unsafe_allow_html=True)
 
-    if 'system_monitor_placeholders' in st.session_state:
-        cpu, mem, gpu_load = get_system_load()
+    # Per-service usage (whole process trees)
+    render_service_usage(st.empty())
 
-        placeholders = st.session_state['system_monitor_placeholders']
-        placeholders['cpu'].markdown(f"CPU: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#4caf50;width:{cpu}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{cpu:.1f}%</span>", unsafe_allow_html=True)
-        placeholders['mem'].markdown(f"Memory: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#2196f3;width:{mem}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{mem:.1f}%</span>", unsafe_allow_html=True)
-        if gpu_load is not None:
-            placeholders['gpu'].markdown(f"GPU: <div style='background:#eee;width:100%;height:10px;border-radius:5px;'><div style='background:#ff9800;width:{gpu_load}%;height:10px;border-radius:5px;'></div></div><span style='font-size:0.9em'>{gpu_load}%</span>", unsafe_allow_html=True)
-        else:
-            placeholders['gpu'].markdown(f"GPU: <span style='font-size:0.9em'>N/A</span>", unsafe_allow_html=True)
+    # A widget inside a fragment reruns only the fragment
+    if st.button("🔄 Refresh System Monitor"):
+        st.toast("System monitor updated!")
 
-        # Update last update timestamp
-        st.session_state['system_monitor_placeholders']['last_update'] = time.time()
+def render_service_usage(placeholder):
+    """Show CPU, memory, I/O and threads per managed service, flagging suspected memory leaks."""
+    from facerunner.service_utils import get_tracker
+    labels = {"ollama": "🦙 Ollama", "open-webui": "🌐 Open WebUI", "facerunner-webui": "🎛️ FaceRunner UI"}
+    try:
+        tracker = get_tracker()
+        samples = tracker.sample()
+    except Exception:
+        placeholder.markdown("<span style='font-size:0.9em'>Per-service usage unavailable</span>", unsafe_allow_html=True)
+        return
+    mb = 1024 ** 2
+    with placeholder.container():
+        for service, sample in samples.items():
+            name = labels.get(service, service)
+            if not sample["running"]:
+                st.markdown(f"<span style='font-size:0.85em'>{name}: not running</span>", unsafe_allow_html=True)
+                continue
+            memory = sample["pss"] if sample["pss"] is not None else sample["rss"]
+            io = (sample["read_bps"] + sample["write_bps"]) / mb
+            st.markdown(
+                f"<span style='font-size:0.85em'>{name}: CPU {sample['cpu']:.0f}% · "
+                f"{'PSS' if sample['pss'] is not None else 'RSS'} {memory / mb:,.0f} MB · I/O {io:.1f} MB/s · "
+                f"{sample['threads']} threads / {sample['procs']} procs</span>",
+                unsafe_allow_html=True
+            )
+            if sample["leak"]:
+                st.warning(f"{name} memory has grown on every recent sample. Possible leak.")
+        history = {labels.get(service, service): [h["rss"] / mb for h in tracker.history[service]]
+                   for service in samples if tracker.history[service]}
+        if any(len(values) > 1 for values in history.values()):
+            with st.expander("Memory history (RSS, MB)"):
+                width = max(len(values) for values in history.values())
+                st.line_chart({name: [None] * (width - len(values)) + values for name, values in history.items()})
+
+# Ranges offered by the telemetry history chart
+HISTORY_RANGES = {"Last hour": "1h", "Last 24 hours": "24h", "Last 7 days": "7d", "Last 30 days": "30d", "Last year": "1y"}
+HISTORY_DEFAULT_SERIES = ("host.cpu_percent", "host.memory_percent")
+
+def render_telemetry_history():
+    """Chart the persisted host and service history (see telemetry_utils)."""
+    from facerunner.telemetry_utils import list_series, query, parse_since, store_stats
+
+    st.subheader("📈 History")
+    try:
+        names = list_series()
+    except Exception as e:
+        st.warning(f"Telemetry history unavailable: {e}")
+        return
+    if not names:
+        st.caption("No history recorded yet. Samples are stored while the web UI or `facerunner start` is running.")
+        return
+    range_col, series_col = st.columns([1, 3])
+    label = range_col.selectbox("Range", list(HISTORY_RANGES), key="history_range")
+    selected = series_col.multiselect("Series", names, key="history_series",
+                                      default=[n for n in HISTORY_DEFAULT_SERIES if n in names] or names[:1])
+    if not selected:
+        return
+    import pandas as pd
+    now = time.time()
+    points = query(selected, parse_since(HISTORY_RANGES[label], now), max_points=500, now=now)
+    frame = pd.DataFrame({name: pd.Series([p[1] for p in rows], index=pd.to_datetime([p[0] for p in rows], unit="s"))
+                          for name, rows in points.items() if rows})
+    if frame.empty:
+        st.caption("No samples in this range.")
+    else:
+        st.line_chart(frame)
+    stats = store_stats()
+    st.caption(f"{stats['series']} series, {sum(stats['rows'].values()):,} points, "
+               f"{stats['bytes'] / 1024 ** 2:.1f} MB on disk (1 s for an hour, 1 min for a week, 15 min for a year). "
+               f"From the CLI: `facerunner metrics --since 6h`")
+
+# Seconds between Jobs panel refreshes
+JOBS_REFRESH_SECONDS = 2
+
+@st.fragment(run_every=JOBS_REFRESH_SECONDS)
+def render_jobs_panel():
+    """Queued, running and recent pulls/removals; every session sees the same jobs, across UI restarts."""
+    from facerunner.job_utils import list_jobs, cancel_job, set_priority, clear_finished, ensure_workers
+    from facerunner.shaping_utils import shaping_summary, format_rate
+
+    st.subheader("📋 Jobs")
+    try:
+        ensure_workers()
+        jobs = list_jobs(limit=10)
+        shaping = shaping_summary()
+    except Exception as e:
+        st.error(f"Job queue unavailable: {e}")
+        return
+    if shaping:
+        st.caption(f"Pull shaping: {shaping}")
+    # When a job finishes, rerun the whole page once so the installed model list catches up
+    finished = {job["id"] for job in jobs if job["state"] == "done"}
+    seen = st.session_state.get("jobs_done_seen")
+    st.session_state["jobs_done_seen"] = finished
+    if seen is not None and finished - seen:
+        from ollama_utils import list_installed_models
+        list_installed_models.forget()
+        st.rerun()
+    if not jobs:
+        st.caption("No jobs yet. Pulls and removals run here in the background.")
+        return
+    gb = 1024 ** 3
+    icons = {"pull": "📥", "remove": "🗑️"}
+    for job in jobs:
+        cols = st.columns([6, 1, 1, 1])
+        label = f"{icons.get(job['kind'], '')} **{job['model']}** · {job['state']}"
+        if job["state"] == "queued" and job["priority"]:
+            label += f" · priority {job['priority']}"
+        cols[0].markdown(label)
+        if job["state"] == "running" and job["total"]:
+            cols[0].progress(min(job["completed"] / job["total"], 1.0),
+                             text=f"{job['status']} · {job['completed'] / gb:.2f} / {job['total'] / gb:.2f} GB")
+        elif job["error"]:
+            cols[0].caption(f"{job['status']}: {job['error']}")
+        elif job["status"]:
+            cols[0].caption(job["status"])
+        if job["kind"] == "pull" and (job["rate"] or job["paused_seconds"]):
+            detail = f"{format_rate(job['rate'])} effective · paused {job['paused_seconds'] / 60:.1f} min"
+            if job["rate_limit"]:
+                detail += f" · limit {format_rate(job['rate_limit'])}"
+            cols[0].caption(detail)
+        if job["state"] == "queued":
+            if cols[1].button("⬆️", key=f"job_up_{job['id']}", help="Raise priority"):
+                set_priority(job["id"], job["priority"] + 1)
+                st.rerun(scope="fragment")
+            if cols[2].button("⬇️", key=f"job_down_{job['id']}", help="Lower priority"):
+                set_priority(job["id"], job["priority"] - 1)
+                st.rerun(scope="fragment")
+        if job["state"] in ("queued", "running") and not job["cancel_requested"]:
+            if cols[3].button("✖️", key=f"job_cancel_{job['id']}", help="Cancel"):
+                cancel_job(job["id"])
+                st.rerun(scope="fragment")
+    if any(job["state"] not in ("queued", "running") for job in jobs):
+        if st.button("Clear finished jobs", key="jobs_clear"):
+            clear_finished()
+            st.rerun(scope="fragment")
 
 def create_model_management_ui():
     """Create the model management UI section."""
-    from ollama_utils import pull_model, list_installed_models, remove_model
+    from ollama_utils import queue_pull
 
     st.title("🤖 Model Management")
     st.markdown("Manage your Ollama and Open WebUI models below.")
@@ -197,19 +313,32 @@ def create_model_management_ui():
         placeholder="e.g., llama3.1, codellama:7b, mistral:7b",
         help="Enter the name of a model from https://ollama.com/search. Only Ollama-compatible models are supported."
     )
+    limit_col, window_col = st.columns(2)
+    limit_mb = limit_col.number_input("Limit (MB/s)", min_value=0.0, value=0.0, step=5.0,
+                                      help="Per-pull cap; 0 means only the global pull_bandwidth_limit applies.")
+    ignore_window = window_col.checkbox("Start now (ignore download window)",
+                                        help="Bandwidth caps and load-based pausing still apply.")
     if st.button("📥 Pull Model", type="primary") and model:
-        with st.spinner(f"Downloading {model}... This may take several minutes..."):
-            msg = pull_model(model.strip())
-            if "successfully" in msg:
-                st.success(msg)
-                st.balloons()
-            else:
-                st.error(msg)
+        msg = queue_pull(model.strip(), rate_limit=limit_mb * 1024 ** 2 or None, ignore_window=ignore_window)
+        if msg.startswith("❌"):
+            st.error(msg)
+        else:
+            st.success(msg)
+
+    # Pulls and removals run on background workers; this panel refreshes on its own
+    render_jobs_panel()
 
     st.markdown("---")
+    render_installed_models()
+
+@st.fragment
+def render_installed_models():
+    """Installed models with sort and remove buttons; sorting or refreshing reruns only this fragment."""
+    from ollama_utils import list_installed_models, queue_remove
+
     st.subheader("📦 Installed Models")
-    if st.button("🔄 Refresh Model List"):
-        st.rerun()
+    # Any click inside the fragment reruns it; callbacks apply their change before that rerun
+    st.button("🔄 Refresh Model List", on_click=list_installed_models.forget)
 
     models_output = list_installed_models()
     if "Error" in models_output:
@@ -265,16 +394,16 @@ def create_model_management_ui():
                 elif sort_col == "Size":
                     model_data = sorted(model_data, key=lambda x: parse_size(x["Size"]), reverse=not sort_asc)
 
+                def set_sort(col):
+                    st.session_state["sort_asc"] = not (sort_col == col and sort_asc)
+                    st.session_state["sort_col"] = col
+
                 # Header with sort buttons
                 header_cols = st.columns([3, 2, 1])
-                if header_cols[0].button(("Model " + ("↑" if sort_col=="Model" and sort_asc else "↓")), key="sort_model"):
-                    st.session_state["sort_col"] = "Model"
-                    st.session_state["sort_asc"] = not (sort_col=="Model" and sort_asc)
-                    st.rerun()
-                if header_cols[1].button(("Size " + ("↑" if sort_col=="Size" and sort_asc else "↓")), key="sort_size"):
-                    st.session_state["sort_col"] = "Size"
-                    st.session_state["sort_asc"] = not (sort_col=="Size" and sort_asc)
-                    st.rerun()
+                header_cols[0].button(("Model " + ("↑" if sort_col=="Model" and sort_asc else "↓")), key="sort_model",
+                                      on_click=set_sort, args=("Model",))
+                header_cols[1].button(("Size " + ("↑" if sort_col=="Size" and sort_asc else "↓")), key="sort_size",
+                                      on_click=set_sort, args=("Size",))
                 header_cols[2].write("Remove")
 
                 # Model rows
@@ -294,14 +423,11 @@ def create_model_management_ui():
                         display_size = f"{size_str} GB"
                     cols[1].write(display_size)
                     if cols[2].button("🗑️", key=f"remove_{row['Model']}"):
-                        with st.spinner(f"Removing {row['Model']}..."):
-                            remove_msg = remove_model(row['Model'])
-                            if "successfully" in remove_msg:
-                                st.success(remove_msg)
-                                time.sleep(1)
-                                st.rerun()
-                            else:
-                                st.error(remove_msg)
+                        remove_msg = queue_remove(row['Model'])
+                        if remove_msg.startswith("❌"):
+                            st.error(remove_msg)
+                        else:
+                            st.toast(remove_msg)
             else:
                 st.info("No models installed yet. Pull a model above to get started!")
         else:
@@ -309,7 +435,7 @@ def create_model_management_ui():
 
 def create_popular_models_ui():
     """Create the popular models UI section."""
-    from ollama_utils import pull_model
+    from ollama_utils import queue_pull
 
     st.title("💡 Popular Models")
     st.markdown("**Try these popular Ollama models:**")
@@ -327,12 +453,11 @@ def create_popular_models_ui():
         col1, col2 = st.columns([2, 1])
         col1.markdown(f"**{model['name']}** - {model['desc']}")
         if col2.button(f"Install", key=f"install_{model['name']}"):
-            with st.spinner(f"Pulling {model['name']}..."):
-                msg = pull_model(model['name'])
-                if "successfully" in msg:
-                    st.success(msg)
-                else:
-                    st.error(msg)
+            msg = queue_pull(model['name'])
+            if msg.startswith("❌"):
+                st.error(msg)
+            else:
+                st.toast(msg)
 
     with st.expander("🔧 Ollama Model Info"):
         st.markdown("""
@@ -359,10 +484,27 @@ def create_vscode_integration_ui():
     # Always show the local ethernet adapter IP for integration
     ip = get_host_ip()
     st.text_input("Host IP for VS Code integration", value=ip, disabled=True)
+    refresh = st.checkbox("Re-measure model latency", value=False,
+                          help="Probe every model again instead of reusing stored measurements.")
     if st.button("Generate VS Code Config") and ip:
-        config_yaml = integrate_vscode(ip)
-        st.session_state["vscode_config_yaml"] = config_yaml
-        st.session_state["show_vscode_config_modal"] = True
+        with st.spinner("Measuring model latency (cached results are reused)..."):
+            try:
+                config_yaml = integrate_vscode(ip, refresh=refresh)
+                st.session_state["vscode_config_yaml"] = config_yaml
+                st.session_state["show_vscode_config_modal"] = True
+            except Exception as e:
+                st.error(f"Error generating config: {e}")
+
+    if st.session_state.get("vscode_measurements"):
+        roles = st.session_state.get("vscode_roles", {})
+        st.markdown(
+            f"**Autocomplete:** {roles.get('autocomplete') or '—'} · **Chat/Edit:** {roles.get('chat') or '—'}"
+            + (f" · **Embed:** {roles['embed']}" if roles.get("embed") else "")
+        )
+        st.dataframe([
+            {"Model": name, "TTFT (s)": m["ttft"], "Tokens/s": m["tps"], "Load (s)": m["load"]}
+            for name, m in sorted(st.session_state["vscode_measurements"].items(), key=lambda kv: kv[1]["ttft"])
+        ], use_container_width=True)
 
     # Always show the config block if YAML is present in session state
     if st.session_state.get("vscode_config_yaml"):
@@ -418,4 +560,24 @@ def create_settings_ui():
     st.write(f"**Operating System:** {get_os().title()}")
     gpu_msg, gpu_count, gpu_types = get_gpu_info()
     st.write(f"**GPU Info:** {gpu_msg}")
+    try:
+        from facerunner.hardware_utils import get_inventory
+        inventory = get_inventory()
+        cpu = inventory["cpu"]
+        gb = 1024 ** 3
+        st.write(f"**CPU:** {cpu['model']} · {cpu['physical_cores'] or '?'} cores / {cpu['logical_cores']} threads · "
+                 f"{inventory['numa_nodes']} NUMA node(s)")
+        st.write(f"**CPU Flags:** {', '.join(cpu['flags']) or 'none of interest'}")
+        st.write(f"**RAM:** {inventory['ram_total'] / gb:.1f} GB")
+        if inventory["disks"]:
+            st.write("**Disks:** " + ", ".join(
+                f"{d['mountpoint']} ({d['type']}, {d['total'] / gb:.0f} GB)" for d in inventory["disks"]))
+    except Exception as e:
+        st.warning(f"Hardware inventory unavailable: {e}")
+    from facerunner.flight_utils import get_flights
+    stats = get_flights().stats
+    if stats["calls"]:
+        st.caption(f"Backend calls shared between sessions: {stats['shared']} of {stats['calls']} "
+                   f"({stats['executions']} executed)")
+    render_telemetry_history()
     st.markdown("---")
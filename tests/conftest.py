@@ -0,0 +1,48 @@
+"""
+Point ~ (and so ~/.facerunner and ~/.ollama) at a scratch directory before facerunner is imported,
+and provide simulated Ollama servers on free ports.
+"""
+
+import os
+import shutil
+import atexit
+import tempfile
+import threading
+
+import pytest
+
+_home = tempfile.mkdtemp(prefix="facerunner-test-home-")
+os.environ["HOME"] = _home
+os.environ.pop("OLLAMA_MODELS", None)
+atexit.register(shutil.rmtree, _home, ignore_errors=True)
+
+# Fast simulator defaults so every test finishes in a second or two
+FAST_SIMULATION = {"models": {"tiny:latest": 0.001}, "load_seconds_per_gb": 0.0, "tokens_per_second": 1000.0,
+                   "prompt_tokens_per_second": 100000.0, "num_predict": 8, "seed": 1}
+
+@pytest.fixture
+def simulator():
+    """Start simulators on free ports; returns start(settings) -> (base_url, server)."""
+    from facerunner.simulator_utils import serve_simulator
+    servers = []
+
+    def start(settings=None):
+        ready = threading.Event()
+        holder = {}
+
+        def on_ready(server):
+            holder["server"] = server
+            ready.set()
+
+        thread = threading.Thread(target=serve_simulator, daemon=True,
+                                  kwargs={"port": 0, "settings": {**FAST_SIMULATION, **(settings or {})},
+                                          "ready": on_ready})
+        thread.start()
+        assert ready.wait(10), "simulator did not start"
+        server = holder["server"]
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
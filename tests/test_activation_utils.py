@@ -0,0 +1,43 @@
+"""Stopping an idle backend must not stall the event loop that relays every activated port."""
+
+import time
+import asyncio
+
+from facerunner.activation_utils import ActivatedService
+
+class RunningProcess:
+    pid = 0
+
+    def poll(self):
+        return None
+
+def test_idle_stop_does_not_block_the_event_loop():
+    stopped = []
+
+    async def scenario():
+        service = ActivatedService({"name": "slow", "port": 0, "argv": ["true"]}, idle_timeout=1, startup_timeout=1,
+                                   log=lambda message: None)
+        service.proc = RunningProcess()
+        service.last_activity = time.monotonic() - 60
+
+        def slow_stop(reason):
+            # A backend that takes its time to exit after SIGTERM
+            time.sleep(1.0)
+            stopped.append(reason)
+            service.proc = None
+
+        service.stop = slow_stop
+        reaper = asyncio.ensure_future(service.reap_idle())
+        gaps, last = [], time.monotonic()
+        deadline = last + 10
+        while not stopped and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+        reaper.cancel()
+        return max(gaps)
+
+    longest_gap = asyncio.run(scenario())
+    assert stopped and stopped[0].startswith("idle for")
+    assert longest_gap < 0.5
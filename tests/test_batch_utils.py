@@ -0,0 +1,96 @@
+"""Resuming a batch must finish whatever mode the checkpoint was written in."""
+
+import os
+import json
+import threading
+
+import pytest
+
+from facerunner import batch_utils
+
+LINES = 20
+
+def fake_prompt(session, record, index, model=None, base_url=None, **kwargs):
+    return {"index": index, "id": record.get("id", index), "model": model, "response": record["prompt"].upper(),
+            "latency_ms": 0}
+
+def run_with_timeout(timeout=10, **kwargs):
+    result = {}
+
+    def target():
+        result["stats"] = batch_utils.run_batch(**kwargs)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "run_batch did not finish"
+    return result["stats"]
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_utils, "run_prompt", fake_prompt)
+    input_path = tmp_path / "in.jsonl"
+    input_path.write_text("".join(json.dumps({"id": i, "prompt": f"p{i}"}) + "\n" for i in range(LINES)))
+    return str(input_path), str(tmp_path / "out.jsonl")
+
+def unordered_checkpoint(input_path, output_path, written, watermark):
+    """Write the output and checkpoint an --unordered run leaves after finishing `written` then stopping."""
+    with open(output_path, "w") as f:
+        for i in written:
+            f.write(json.dumps(fake_prompt(None, {"prompt": f"p{i}", "id": i}, i, "m")) + "\n")
+    with open(input_path, "rb") as f:
+        lines = f.readlines()
+    state = batch_utils.new_checkpoint(input_path)
+    state.update({"input_offset": sum(len(line) for line in lines[:watermark]), "watermark": watermark,
+                  "output_offset": os.path.getsize(output_path),
+                  "done": sorted(i for i in written if i >= watermark)})
+    batch_utils.save_checkpoint(output_path, state)
+
+def result_ids(output_path):
+    with open(output_path) as f:
+        return [json.loads(line)["id"] for line in f]
+
+def test_ordered_run_writes_in_order(batch):
+    input_path, output_path = batch
+    stats = run_with_timeout(input_path=input_path, output_path=output_path, model="m", concurrency=3)
+    assert stats["completed"] == LINES
+    assert result_ids(output_path) == list(range(LINES))
+
+def test_ordered_resume_of_unordered_checkpoint(batch):
+    input_path, output_path = batch
+    unordered_checkpoint(input_path, output_path, written=[0, 3, 2], watermark=1)
+    stats = run_with_timeout(input_path=input_path, output_path=output_path, model="m", concurrency=2)
+    assert stats["completed"] == LINES - 3
+    ids = result_ids(output_path)
+    assert sorted(ids) == list(range(LINES))
+    assert ids[3:] == [1] + list(range(4, LINES))
+
+def test_unordered_resume(batch):
+    input_path, output_path = batch
+    unordered_checkpoint(input_path, output_path, written=[0, 4], watermark=1)
+    run_with_timeout(input_path=input_path, output_path=output_path, model="m", ordered=False)
+    assert sorted(result_ids(output_path)) == list(range(LINES))
+
+@pytest.mark.parametrize("resume", [True, False])
+def test_fresh_run_appends_to_existing_output(batch, resume):
+    input_path, output_path = batch
+    with open(output_path, "w") as f:
+        f.write("".join(json.dumps({"id": f"old{i}"}) + "\n" for i in range(3)))
+    run_with_timeout(input_path=input_path, output_path=output_path, model="m", resume=resume)
+    assert result_ids(output_path) == ["old0", "old1", "old2"] + list(range(LINES))
+
+def test_checkpoint_for_another_input_keeps_output(batch, tmp_path):
+    input_path, output_path = batch
+    other = tmp_path / "other.jsonl"
+    other.write_text(json.dumps({"prompt": "x"}) + "\n")
+    run_with_timeout(input_path=str(other), output_path=output_path, model="m")
+    run_with_timeout(input_path=input_path, output_path=output_path, model="m")
+    assert result_ids(output_path) == [0] + list(range(LINES))
+
+def test_resume_drops_results_written_after_the_checkpoint(batch):
+    input_path, output_path = batch
+    unordered_checkpoint(input_path, output_path, written=[0], watermark=1)
+    with open(output_path, "a") as f:
+        f.write(json.dumps({"id": "uncheckpointed"}) + "\n")
+    run_with_timeout(input_path=input_path, output_path=output_path, model="m")
+    assert result_ids(output_path) == list(range(LINES))
@@ -0,0 +1,78 @@
+"""Bundle import must keep every write inside the Ollama store and only accept sha256 blobs."""
+
+import io
+import os
+import json
+import tarfile
+import hashlib
+
+import pytest
+
+from facerunner import bundle_utils
+
+def add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+def make_tar(path, members):
+    with tarfile.open(path, "w") as tar:
+        for name, data in members:
+            add_member(tar, name, data)
+    return str(path)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    root = tmp_path / "store"
+    root.mkdir()
+    monkeypatch.setenv("OLLAMA_MODELS", str(root))
+    return root
+
+def test_tar_manifest_traversal_rejected(tmp_path, store):
+    bundle = make_tar(tmp_path / "evil.tar", [("manifests/../../escaped.txt", b"pwned")])
+    with pytest.raises(ValueError):
+        bundle_utils.import_tar(bundle)
+    assert not (tmp_path / "escaped.txt").exists()
+    assert not any(p.name == "escaped.txt" for p in tmp_path.rglob("*"))
+
+def test_tar_blob_name_must_be_sha256(tmp_path, store):
+    bundle = make_tar(tmp_path / "evil.tar", [("blobs/../../escaped.txt", b"pwned")])
+    with pytest.raises(ValueError):
+        bundle_utils.import_tar(bundle)
+    assert not (tmp_path / "escaped.txt").exists()
+
+def test_dir_manifest_traversal_rejected(tmp_path, store):
+    bundle = tmp_path / "bundle"
+    (bundle / "blobs").mkdir(parents=True)
+    index = {"version": 1, "models": ["evil"], "manifests": {"evil": "manifests/../../../escaped.txt"}, "blobs": {}}
+    (bundle / bundle_utils.INDEX_NAME).write_text(json.dumps(index))
+    (tmp_path / "escaped.txt").write_text("outside")
+    with pytest.raises(ValueError):
+        bundle_utils.import_dir(str(bundle))
+    assert (tmp_path / "escaped.txt").read_text() == "outside"
+
+def test_dir_import_hashes_blobs_by_default(tmp_path, store):
+    digest = "sha256:" + hashlib.sha256(b"expected").hexdigest()
+    bundle = tmp_path / "bundle"
+    (bundle / "blobs").mkdir(parents=True)
+    (bundle / "blobs" / digest.replace(":", "-")).write_bytes(b"tampered")
+    index = {"version": 1, "models": [], "manifests": {}, "blobs": {digest: 8}}
+    (bundle / bundle_utils.INDEX_NAME).write_text(json.dumps(index))
+    with pytest.raises(IOError):
+        bundle_utils.import_dir(str(bundle))
+    assert not os.path.exists(os.path.join(store, "blobs", digest.replace(":", "-")))
+
+def test_tar_roundtrip(tmp_path, store):
+    data = b"layer"
+    digest = "sha256:" + hashlib.sha256(data).hexdigest()
+    manifest = json.dumps({"layers": [{"digest": digest, "size": len(data)}]}).encode()
+    rel = "manifests/registry.ollama.ai/library/tiny/latest"
+    bundle = make_tar(tmp_path / "ok.tar", [
+        (bundle_utils.INDEX_NAME, json.dumps({"models": ["tiny:latest"], "blobs": {digest: len(data)}}).encode()),
+        ("blobs/" + digest.replace(":", "-"), data),
+        (rel, manifest),
+    ])
+    report = bundle_utils.import_tar(bundle)
+    assert report["imported"] == 1
+    assert (store / rel).read_bytes() == manifest
+    assert (store / "blobs" / digest.replace(":", "-")).read_bytes() == data
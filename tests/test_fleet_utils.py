@@ -0,0 +1,117 @@
+"""Fleet commands against several local Ollama stand-ins, plus a host that is down and one that hangs."""
+
+import time
+import socket
+import threading
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from facerunner import cli
+from facerunner.fleet_utils import load_hosts, fleet_status, model_matrix, run_fleet, pull_on_host, warm_on_host
+
+@pytest.fixture
+def fleet(simulator, tmp_path):
+    """Write an inventory of three simulators (one on another version), a closed port and a silent listener."""
+    entries = []
+    for version in ("0.5.1", "0.5.1", "0.4.0"):
+        base_url, _ = simulator({"version": version, "pull_size_gb": 0.01})
+        entries.append(base_url.split("://")[1])
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    entries.append(f"127.0.0.1:{closed.getsockname()[1]}")
+    closed.close()
+    # Accepts connections (into the backlog) but never answers
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen(8)
+    entries.append(f"http://127.0.0.1:{silent.getsockname()[1]}")
+    path = tmp_path / "hosts.yaml"
+    path.write_text(yaml.safe_dump({"hosts": entries}))
+    yield str(path), entries
+    silent.close()
+
+def test_status_reports_liveness_and_drift(fleet):
+    path, entries = fleet
+    hosts = load_hosts(path)
+    results, baseline = fleet_status(hosts, timeout=1, concurrency=4)
+    assert [r["host"] for r in results] == [h["name"] for h in hosts]
+    assert [r["ok"] for r in results] == [True, True, True, False, False]
+    assert baseline == "0.5.1"
+    assert [r.get("drift") for r in results[:3]] == [False, False, True]
+    assert "timed out" in results[4]["error"]
+    assert all(r["models"] == ["tiny:latest"] for r in results[:3])
+
+def test_pull_and_warm_every_host(fleet):
+    path, _ = fleet
+    hosts = load_hosts(path)[:3]
+    pulled = run_fleet(hosts, lambda host: pull_on_host(host, "extra"), timeout=10, concurrency=2)
+    assert all(r["ok"] for r in pulled)
+    warmed = run_fleet(hosts, lambda host: warm_on_host(host, "extra", "5m"), timeout=10, concurrency=2)
+    assert all(r["ok"] for r in warmed)
+    results, _ = fleet_status(hosts, timeout=2)
+    models, installed = model_matrix(results)
+    assert models == ["extra:latest", "tiny:latest"]
+    assert all(installed[r["host"]] == set(models) for r in results)
+    assert all(r["loaded"] == ["extra:latest"] for r in results)
+    failed = run_fleet(hosts, lambda host: warm_on_host(host, "missing"), timeout=5)
+    assert not any(r["ok"] for r in failed) and "not found" in failed[0]["error"]
+
+def test_cli_status_table(fleet):
+    path, _ = fleet
+    result = CliRunner().invoke(cli, ["fleet", "--hosts", path, "--timeout", "1", "status"])
+    assert result.exit_code == 0, result.output
+    assert "3/5 host(s) up, 1 not on 0.5.1" in result.output
+
+def test_cli_help_without_inventory():
+    result = CliRunner().invoke(cli, ["fleet", "status", "--help"])
+    assert result.exit_code == 0
+    assert "Liveness" in result.output
+    result = CliRunner().invoke(cli, ["fleet", "status"])
+    assert result.exit_code == 1
+    assert "No hosts inventory found" in result.output
+
+def stand_in(reply, hold=0.0):
+    """A host that answers every request with the raw bytes `reply`, then keeps the connection open for `hold` s."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+
+    def answer(conn):
+        with conn:
+            conn.recv(65536)
+            conn.sendall(reply)
+            time.sleep(hold)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=answer, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server, f"127.0.0.1:{server.getsockname()[1]}"
+
+def test_misbehaving_hosts_fail_alone(simulator, tmp_path):
+    base_url, _ = simulator()
+    body = b"[1]"
+    stand_ins = [
+        stand_in(b"garbage\r\n\r\n"),
+        stand_in(b"HTTP/1.1 200 OK\r\nX-Padding: " + b"a" * 200000, hold=2),
+        stand_in(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)),
+    ]
+    path = tmp_path / "hosts.yaml"
+    path.write_text(yaml.safe_dump([base_url.split("://")[1]] + [address for _, address in stand_ins]))
+    try:
+        results, baseline = fleet_status(load_hosts(str(path)), timeout=5)
+    finally:
+        for server, _ in stand_ins:
+            server.close()
+    assert [r["ok"] for r in results] == [True, False, False, False]
+    assert baseline == results[0]["version"]
+    assert "malformed HTTP status line" in results[1]["error"]
+    assert "headers too large" in results[2]["error"]
+    assert "AttributeError" in results[3]["error"]
@@ -0,0 +1,150 @@
+"""Single-flight coalescing: shared executions, ttl caching, error sharing and forget."""
+
+import threading
+
+import pytest
+
+from facerunner import flight_utils
+from facerunner.flight_utils import SingleFlight, coalesced
+
+class Clock:
+    """Stands in for the time module so ttl expiry needs no sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(flight_utils, "time", clock)
+    return clock
+
+class Gate:
+    """A call that blocks until released, counting how often it ran."""
+
+    def __init__(self, result="value", error=None):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+        self.result = result
+        self.error = error
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+def run_concurrently(flights, key, fn, ttl, callers):
+    """Start a leader, wait until fn is running, then add followers; return each caller's outcome."""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = ("ok", flights.do(key, fn, ttl))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    threads[0].start()
+    assert fn.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Followers register before the leader finishes
+    while flights.stats["calls"] < callers:
+        threading.Event().wait(0.01)
+    fn.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+def test_concurrent_callers_share_one_execution(clock):
+    flights = SingleFlight()
+    gate = Gate()
+    outcomes = run_concurrently(flights, "k", gate, 0, callers=5)
+    assert outcomes == [("ok", "value")] * 5
+    assert gate.runs == 1
+    assert flights.stats == {"calls": 5, "executions": 1, "shared": 4}
+    # Without a ttl nothing is kept once the call finished
+    assert flights.do("k", lambda: "again") == "again"
+
+def test_ttl_shares_a_finished_result_until_it_expires(clock):
+    flights = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert flights.do("k", fn, ttl=2) == 1
+    clock.now += 1.9
+    assert flights.do("k", fn, ttl=2) == 1
+    clock.now += 0.1
+    assert flights.do("k", fn, ttl=2) == 2
+    assert flights.stats["shared"] == 1
+    # Keys are independent
+    assert flights.do("other", fn, ttl=2) == 3
+
+def test_errors_reach_waiters_but_are_not_cached(clock):
+    flights = SingleFlight()
+    error = RuntimeError("backend down")
+    gate = Gate(error=error)
+    outcomes = run_concurrently(flights, "k", gate, 60, callers=3)
+    assert outcomes == [("error", error)] * 3
+    assert gate.runs == 1
+    # A later caller runs the call again, even within the ttl
+    assert flights.do("k", lambda: "recovered", ttl=60) == "recovered"
+
+def test_forget_drops_a_cached_result(clock):
+    flights = SingleFlight()
+    assert flights.do("k", lambda: "old", ttl=60) == "old"
+    flights.forget("k")
+    assert flights.do("k", lambda: "new", ttl=60) == "new"
+    flights.forget("missing")
+
+def test_forget_leaves_a_running_call_shared(clock):
+    flights = SingleFlight()
+    gate = Gate()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", gate, 60)))
+    leader.start()
+    assert gate.started.wait(5)
+    flights.forget("k")
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", lambda: "second run", 60)))
+    follower.start()
+    while flights.stats["calls"] < 2:
+        threading.Event().wait(0.01)
+    gate.release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == ["value", "value"] and gate.runs == 1
+
+def test_finished_entries_are_pruned(clock, monkeypatch):
+    monkeypatch.setattr(flight_utils, "MAX_ENTRIES", 4)
+    flights = SingleFlight()
+    for i in range(4):
+        flights.do(i, lambda: i, ttl=1)
+    clock.now += 1
+    flights.do("fresh", lambda: None, ttl=1)
+    assert list(flights.flights) == ["fresh"]
+
+def test_coalesced_decorator_keys_on_arguments(clock, monkeypatch):
+    monkeypatch.setattr(flight_utils, "_flights", SingleFlight())
+    calls = []
+
+    @coalesced(ttl=5)
+    def lookup(name, verbose=False):
+        calls.append((name, verbose))
+        return f"{name}-{len(calls)}"
+
+    assert lookup("a") == lookup("a") == "a-1"
+    assert lookup("a", verbose=True) == "a-2"
+    assert lookup("b") == "b-3"
+    lookup.forget("a")
+    assert lookup("a") == "a-4"
+    assert lookup("b") == "b-3"
@@ -0,0 +1,88 @@
+"""The job queue: pulls outside their download window wait in the queue, not in a worker."""
+
+import time
+
+import pytest
+
+from facerunner import config_utils, job_utils
+
+MB = 1024 ** 2
+
+def closed_window():
+    """A download window that opens an hour from now and closes two hours from now."""
+    t = time.localtime()
+    minute = t.tm_hour * 60 + t.tm_min
+    start, end = (minute + 60) % (24 * 60), (minute + 120) % (24 * 60)
+    return f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+@pytest.fixture
+def config(monkeypatch):
+    settings = {**config_utils.DEFAULT_CONFIG, "admission": "off", "pull_bandwidth_limit": None,
+                "pull_windows": closed_window()}
+    monkeypatch.setattr(config_utils, "load_config", lambda: dict(settings))
+    return settings
+
+def wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_deferred_pulls_leave_workers_for_removals(simulator, config, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_utils, "POLL_SECONDS", 0.05)
+    base_url, _ = simulator({"pull_size_gb": 4 * MB / 1024 ** 3})
+    path = str(tmp_path / "jobs.db")
+    # Two deferred pulls used to occupy both workers until the window opened
+    pulls = [job_utils.enqueue("pull", name, priority=1, path=path) for name in ("a", "b")]
+    removal = job_utils.enqueue("remove", "tiny:latest", path=path)
+    pool = job_utils.WorkerPool(workers=2, path=path, base_url=base_url).start()
+    try:
+        assert wait_for(lambda: job_utils.get_job(removal, path)["state"] == "done")
+        for job_id in pulls:
+            job = job_utils.get_job(job_id, path)
+            assert job["state"] == "queued" and job["worker"] is None
+            assert job["status"].startswith("Waiting: outside download window")
+            assert job["not_before"] > time.time() + 3000
+        # Nothing is due, so nothing is claimed
+        assert job_utils.claim_next("test", path) is None
+        # A deferred pull can still be cancelled, or run now
+        assert job_utils.cancel_job(pulls[0], path)
+        now = job_utils.enqueue("pull", "c", ignore_window=True, path=path)
+        assert wait_for(lambda: job_utils.get_job(now, path)["state"] == "done")
+        assert job_utils.get_job(pulls[1], path)["state"] == "queued"
+    finally:
+        pool.stop()
+
+def test_deferred_job_is_claimed_when_due(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    job_id = job_utils.enqueue("pull", "a", path=path)
+    job = job_utils.claim_next("test", path)
+    job_utils.JobContext(job["id"], path).defer(0.2, "Waiting: outside download window")
+    assert job_utils.claim_next("test", path) is None
+    time.sleep(0.3)
+    job = job_utils.claim_next("test", path)
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert job_utils.get_job(job_id, path)["not_before"] is None
+
+def test_window_closing_mid_pull_defers(simulator, config, tmp_path, monkeypatch):
+    # The window is open for the checks before the pull starts and closes at the first check mid-download
+    from facerunner import shaping_utils
+    base_url, _ = simulator({"pull_size_gb": 64 * MB / 1024 ** 3, "pull_bytes_per_second": 16 * MB})
+    monkeypatch.setattr(shaping_utils, "CHECK_SECONDS", 0.2)
+    checks = []
+
+    def window_reason(config, ignore_window=False):
+        checks.append(ignore_window)
+        return ("outside download window", 600) if len(checks) > 3 else (None, 0)
+
+    monkeypatch.setattr(shaping_utils, "window_reason", window_reason)
+    path = str(tmp_path / "jobs.db")
+    job_id = job_utils.enqueue("pull", "big", path=path)
+    pool = job_utils.WorkerPool(workers=1, path=path, base_url=base_url)
+    pool.run(job_utils.claim_next(pool.worker_id, path))
+    job = job_utils.get_job(job_id, path)
+    assert job["state"] == "queued" and job["status"] == "Waiting: outside download window"
+    assert 0 < job["completed"] < 64 * MB
+    assert job["not_before"] > time.time() + 500
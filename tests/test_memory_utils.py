@@ -0,0 +1,46 @@
+"""Admission: loads may evict least-recently-used models to fit, pulls never do."""
+
+import pytest
+
+from facerunner import memory_utils
+
+GB = memory_utils.GB
+RUNNING = [{"name": "old:latest", "size": 6 * GB, "expires_at": "2026-01-01T00:00:00Z"},
+           {"name": "recent:latest", "size": 6 * GB, "expires_at": "2026-01-02T00:00:00Z"}]
+
+@pytest.fixture
+def host(monkeypatch):
+    """8 GB free, two 6 GB models loaded, a 10 GB model already fully downloaded."""
+    unloaded = []
+    manifest = {"layers": [{"digest": "sha256:" + "0" * 64, "size": 10 * GB}]}
+    monkeypatch.setattr(memory_utils, "get_model_manifest", lambda model: (manifest, True))
+    monkeypatch.setattr(memory_utils, "missing_blob_bytes", lambda manifest: 0)
+    monkeypatch.setattr(memory_utils, "list_running_models", lambda: list(RUNNING))
+    monkeypatch.setattr(memory_utils, "get_free_memory", lambda: (8 * GB, 0))
+    monkeypatch.setattr(memory_utils, "unload_model", lambda name: unloaded.append(name) or True)
+    return unloaded
+
+CONFIG = {"admission": "refuse", "evict_lru": True, "memory_overhead": 1.0, "disk_reserve_gb": 0}
+
+def test_load_evicts_lru_until_it_fits(host):
+    report = memory_utils.check_admission("big", config=CONFIG)
+    assert report["ok"]
+    assert report["evicted"] == host == ["old:latest"]
+
+def test_load_without_eviction_is_refused(host):
+    report = memory_utils.check_admission("big", evict=False, config=CONFIG)
+    assert not report["ok"] and not memory_utils.admission_allows(report)
+    assert host == []
+
+def test_pull_never_evicts_and_only_warns_about_memory(host):
+    report = memory_utils.check_admission("big", for_pull=True, config=CONFIG)
+    assert host == [] and report["evicted"] == []
+    assert report["ok"] and memory_utils.admission_allows(report)
+    assert "will not load until memory is freed" in report["messages"][0]
+
+def test_pull_is_refused_when_the_disk_is_full(host, monkeypatch):
+    monkeypatch.setattr(memory_utils, "missing_blob_bytes", lambda manifest: 10 * GB)
+    monkeypatch.setattr(memory_utils.shutil, "disk_usage", lambda path: type("Usage", (), {"free": GB})())
+    report = memory_utils.check_admission("big", for_pull=True, config=CONFIG)
+    assert not report["ok"] and not memory_utils.admission_allows(report)
+    assert host == []
@@ -0,0 +1,77 @@
+"""The Prometheus exporter scraped over HTTP against the simulator, including a sampler that breaks."""
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from facerunner import metrics_utils
+
+def series(text):
+    """{'name{labels}': value} for each sample line of an exposition payload."""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+@pytest.fixture
+def exporter(simulator, monkeypatch):
+    """A sampler probing a simulated Ollama, served on a free port; returns (sampler, scrape)."""
+    base_url, _ = simulator()
+    monkeypatch.setattr(metrics_utils, "SERVICES", {"ollama": (["ollama", "serve"], f"{base_url}/api/version")})
+    monkeypatch.setattr(metrics_utils, "pull_progress", lambda models_dir=None: [])
+    sampler = metrics_utils.MetricsSampler(probe_timeout=2, base_url=base_url)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), metrics_utils.make_handler(sampler))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+
+    def scrape():
+        response = requests.get(url, timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == metrics_utils.CONTENT_TYPE
+        return series(response.text)
+
+    requests.post(f"{base_url}/api/generate", json={"model": "tiny:latest", "prompt": "hi", "stream": False},
+                  timeout=10).raise_for_status()
+    yield sampler, scrape
+    server.shutdown()
+    server.server_close()
+
+def test_scrape_reports_probes_and_loaded_models(exporter):
+    sampler, scrape = exporter
+    assert sampler.sample_once()
+    metrics = scrape()
+    assert metrics['facerunner_probe_up{service="ollama"}'] == 1
+    assert metrics['facerunner_probe_latency_seconds{service="ollama"}'] > 0
+    assert metrics["facerunner_ollama_models_loaded"] == 1
+    assert metrics['facerunner_ollama_model_loaded{model="tiny:latest"}'] == 1
+    assert metrics["facerunner_pulls_active"] == 0
+    assert metrics["facerunner_exporter_sample_errors_total"] == 0
+    assert metrics["facerunner_exporter_last_sample_timestamp_seconds"] == round(sampler.last_sample, 3) > 0
+
+def test_failed_samples_are_counted_and_logged(exporter, monkeypatch, capsys):
+    sampler, scrape = exporter
+    assert sampler.sample_once()
+    last_sample = scrape()["facerunner_exporter_last_sample_timestamp_seconds"]
+
+    def broken(self):
+        raise RuntimeError("sampler broke")
+
+    monkeypatch.setattr(metrics_utils.MetricsSampler, "pull_families", broken)
+    assert not sampler.sample_once()
+    assert not sampler.sample_once()
+    metrics = scrape()
+    # The last good sample is still served, marked stale by the timestamp and the error count
+    assert metrics["facerunner_exporter_sample_errors_total"] == 2
+    assert metrics["facerunner_exporter_last_sample_timestamp_seconds"] == last_sample
+    assert metrics['facerunner_ollama_model_loaded{model="tiny:latest"}'] == 1
+    assert "RuntimeError: sampler broke" in capsys.readouterr().err
+
+def test_nothing_sampled_yet(exporter):
+    _, scrape = exporter
+    metrics = scrape()
+    assert metrics == {"facerunner_exporter_last_sample_timestamp_seconds": 0,
+                       "facerunner_exporter_sample_errors_total": 0}
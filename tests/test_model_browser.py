@@ -0,0 +1,68 @@
+"""The Model Browser's planner: per-size quantisation choices and fresh host memory."""
+
+import os
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+from facerunner import flight_utils, planner_utils
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+GB = 1024 ** 3
+
+def model_browser(src_dir):
+    """The Model Browser with a one-model catalogue."""
+    import sys
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    import ollama_utils
+    ollama_utils.fetch_model_catalog = lambda: [{"name": "llama3.1", "description": "Meta Llama 3.1"}]
+    from ui_components import create_model_browser_ui
+    create_model_browser_ui()
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def host(monkeypatch):
+    """A CPU-only host whose free RAM the test can change, read through a controllable clock."""
+    facts = {"ram_total": 64 * GB, "ram_free": 48 * GB, "vram_total": 0, "vram_free": 0, "gpus": [],
+             "cores": 8, "cpu_bandwidth_gbps": 40, "gpu_bandwidth_gbps": 0}
+    clock = Clock()
+    monkeypatch.setattr(planner_utils, "get_host_resources", lambda config=None: dict(facts))
+    monkeypatch.setattr(flight_utils, "time", clock)
+    monkeypatch.setattr(flight_utils, "_flights", flight_utils.SingleFlight())
+    return facts, clock
+
+def quant_select(at):
+    return next(s for s in at.selectbox if s.label == "Quantisation")
+
+def planning_caption(at):
+    return next(c.value for c in at.caption if c.value.startswith("Planning for"))
+
+def test_switching_size_selects_that_sizes_recommended_quant(host):
+    at = AppTest.from_function(model_browser, args=(SRC_DIR,), default_timeout=60).run()
+    assert not at.exception
+    assert quant_select(at).value == "q4_K_M"
+    quant_select(at).select("q8_0").run()
+    assert quant_select(at).value == "q8_0"
+    at.selectbox(key="size_llama3.1").select("70b").run()
+    assert not at.exception
+    assert quant_select(at).value == "q4_K_M"
+
+def test_free_memory_is_reread_on_later_reruns(host):
+    facts, clock = host
+    at = AppTest.from_function(model_browser, args=(SRC_DIR,), default_timeout=60).run()
+    assert planning_caption(at).startswith("Planning for 48.0 GB free RAM")
+    # A model was loaded meanwhile
+    facts["ram_free"] = 8 * GB
+    at.run()
+    assert planning_caption(at).startswith("Planning for 48.0 GB free RAM")
+    clock.now += 10
+    at.run()
+    assert planning_caption(at).startswith("Planning for 8.0 GB free RAM")
@@ -0,0 +1,151 @@
+"""
+The Ollama simulator, served on an ephemeral port: its own behaviour (resumable pulls, streaming,
+the wait-queue limit, error injection) and FaceRunner's batch runner and shaped pulls driven against it.
+"""
+
+import json
+import threading
+
+import pytest
+import requests
+
+from facerunner import shaping_utils
+from facerunner.batch_utils import run_batch
+
+MB = 1024 ** 2
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+def test_version_and_tags(simulator):
+    base_url, _ = simulator()
+    assert requests.get(f"{base_url}/api/version", timeout=5).json()["version"]
+    names = [m["name"] for m in requests.get(f"{base_url}/api/tags", timeout=5).json()["models"]]
+    assert names == ["tiny:latest"]
+
+def test_pull_resumes_after_disconnect(simulator):
+    base_url, server = simulator({"pull_size_gb": 64 * MB / 1024 ** 3, "pull_bytes_per_second": 40 * MB})
+    with requests.post(f"{base_url}/api/pull", json={"model": "big"}, stream=True, timeout=10) as response:
+        progress = []
+        for line in response.iter_lines():
+            chunk = json.loads(line)
+            if "completed" in chunk:
+                progress.append(chunk["completed"])
+            if len(progress) == 3:
+                break
+    # Dropped mid-download: the partial blob is kept
+    assert progress[-1] < 64 * MB
+    with requests.post(f"{base_url}/api/pull", json={"model": "big"}, stream=True, timeout=30) as response:
+        chunks = stream_lines(response)
+    resumed = [c["completed"] for c in chunks if "completed" in c]
+    assert resumed[0] > progress[-1]
+    assert resumed[-1] == chunks[1]["total"] == 64 * MB
+    assert chunks[-1] == {"status": "success"}
+    assert "big:latest" in [m["name"] for m in requests.get(f"{base_url}/api/tags", timeout=5).json()["models"]]
+    # Downloaded bytes are not charged twice for the resumed part (a few steps may land after the disconnect)
+    assert server.sim.stats["bytes_pulled"] < 64 * MB + 4 * 4 * MB
+
+@pytest.mark.parametrize("endpoint", ["generate", "chat"])
+def test_generation_streams_tokens(simulator, endpoint):
+    base_url, _ = simulator()
+    payload = {"model": "tiny", "options": {"num_predict": 5}}
+    if endpoint == "chat":
+        payload["messages"] = [{"role": "user", "content": "hello there"}]
+    else:
+        payload["prompt"] = "hello there"
+    with requests.post(f"{base_url}/api/{endpoint}", json=payload, stream=True, timeout=10) as response:
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        chunks = stream_lines(response)
+    assert [c["done"] for c in chunks] == [False] * 5 + [True]
+    final = chunks[-1]
+    assert final["eval_count"] == 5 and final["prompt_eval_count"] == 2
+    text = "".join(c["message"]["content"] if endpoint == "chat" else c["response"] for c in chunks)
+    assert len(text.split()) == 5
+    response = requests.post(f"{base_url}/api/{endpoint}", json={**payload, "stream": False}, timeout=10)
+    body = response.json()
+    assert (body["message"]["content"] if endpoint == "chat" else body["response"]) == text
+
+def test_full_queue_returns_503(simulator):
+    base_url, server = simulator({"num_parallel": 1, "max_queue": 1, "tokens_per_second": 20.0})
+    payload = {"model": "tiny", "prompt": "hi", "options": {"num_predict": 20}}
+    # The first request holds the only slot, the second waits in the queue...
+    first = requests.post(f"{base_url}/api/generate", json=payload, stream=True, timeout=10)
+    next(first.iter_lines())
+    waiter = threading.Thread(target=requests.post, args=(f"{base_url}/api/generate",),
+                              kwargs={"json": {**payload, "stream": False}, "timeout": 30}, daemon=True)
+    waiter.start()
+    for _ in range(100):
+        if requests.get(f"{base_url}/api/simulator", timeout=5).json()["waiting"] == 1:
+            break
+        threading.Event().wait(0.02)
+    # ...and the third finds the queue full
+    response = requests.post(f"{base_url}/api/generate", json={**payload, "stream": False}, timeout=10)
+    assert response.status_code == 503
+    assert server.sim.stats["rejected_busy"] == 1
+    first.close()
+    waiter.join(10)
+
+def test_error_rate(simulator):
+    base_url, server = simulator({"error_rate": 1.0})
+    response = requests.post(f"{base_url}/api/generate", json={"model": "tiny", "prompt": "x", "stream": False},
+                             timeout=10)
+    assert response.status_code == 500
+    assert requests.post(f"{base_url}/api/embed", json={"model": "tiny", "input": "x"}, timeout=10).status_code == 500
+    with requests.post(f"{base_url}/api/pull", json={"model": "other"}, stream=True, timeout=10) as response:
+        chunks = stream_lines(response)
+    assert "error" in chunks[-1]
+
+    base_url, server = simulator({"error_rate": 0.5})
+    statuses = [requests.post(f"{base_url}/api/generate", timeout=10,
+                              json={"model": "tiny", "prompt": "x", "stream": False}).status_code for _ in range(40)]
+    assert statuses.count(500) == server.sim.stats["errors_injected"]
+    assert 5 < statuses.count(500) < 35 and statuses.count(200) == 40 - statuses.count(500)
+
+def test_run_batch_against_simulator(simulator, tmp_path):
+    base_url, server = simulator({"models": {"tiny:latest": 0.001, "other:latest": 0.001}, "num_parallel": 2})
+    input_path = tmp_path / "prompts.jsonl"
+    records = [{"id": f"r{i}", "prompt": f"prompt {i}"} for i in range(10)]
+    records.append({"id": "chat", "model": "other", "messages": [{"role": "user", "content": "hi"}]})
+    input_path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    output_path = tmp_path / "results.jsonl"
+    stats = run_batch(str(input_path), str(output_path), model="tiny", concurrency=4, base_url=base_url)
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [r["id"] for r in results] == [r["id"] for r in records]
+    assert not any(r.get("error") for r in results)
+    num_predict = server.sim.settings["num_predict"]
+    assert all(r["eval_count"] == num_predict and r["response"] for r in results)
+    assert stats["completed"] == 11 and stats["failed"] == 0
+    assert server.sim.stats["tokens_generated"] == 11 * num_predict
+
+def test_run_batch_retries_injected_errors(simulator, tmp_path):
+    base_url, server = simulator({"error_rate": 0.3})
+    input_path = tmp_path / "prompts.jsonl"
+    input_path.write_text("".join(json.dumps({"prompt": f"p{i}"}) + "\n" for i in range(20)))
+    output_path = tmp_path / "results.jsonl"
+    run_batch(str(input_path), str(output_path), model="tiny", concurrency=4, base_url=base_url)
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert len(results) == 20
+    assert server.sim.stats["errors_injected"] > 0
+    # Injected 500s are retried; only requests that failed on every attempt are reported
+    assert sum(1 for r in results if r.get("error")) < server.sim.stats["errors_injected"]
+
+def test_shaped_pull_against_simulator(simulator):
+    base_url, _ = simulator({"pull_size_gb": 16 * MB / 1024 ** 3, "pull_bytes_per_second": 80 * MB})
+    stats = shaping_utils.shaped_pull("fresh", base_url=base_url, config={"pull_bandwidth_limit": None})
+    assert stats.status == "success"
+    assert stats.downloaded == stats.total == 16 * MB
+    assert stats.paused == 0
+    assert "fresh:latest" in [m["name"] for m in requests.get(f"{base_url}/api/tags", timeout=5).json()["models"]]
+
+def test_shaped_pull_cap_pauses_and_resumes(simulator, monkeypatch):
+    # A 4 MB burst at 8 MB/s: the pull is disconnected after two 8 MB steps and resumed once the budget refills
+    monkeypatch.setattr(shaping_utils, "BURST_SECONDS", 0.5)
+    monkeypatch.setattr(shaping_utils, "MIN_BURST_BYTES", MB)
+    base_url, server = simulator({"pull_size_gb": 32 * MB / 1024 ** 3, "pull_bytes_per_second": 80 * MB})
+    stats = shaping_utils.shaped_pull("capped", base_url=base_url, limit=8 * MB,
+                                      config={"pull_bandwidth_limit": None})
+    assert stats.status == "success"
+    assert stats.completed == stats.total == 32 * MB
+    assert stats.paused > 0.5
+    assert stats.rate() < 20 * MB
+    assert server.sim.stats["requests"] >= 2
@@ -0,0 +1,64 @@
+"""
+Startup budget for the commands scripts and health checks run most: `python -X importtime`
+must show each of them importing within the budget, with no heavy dependency loaded.
+The commands really run (their bodies import lazily), with pkill and docker replaced by no-ops.
+"""
+
+import os
+import sys
+import stat
+import subprocess
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+BUDGET_MS = float(os.environ.get("FACERUNNER_STARTUP_BUDGET_MS", 100))
+RUNS = 3
+COMMANDS = [["stop"], ["list"], ["remove", "facerunner-test:latest"]]
+HEAVY_MODULES = ("docker", "requests", "yaml", "psutil", "numpy", "pandas", "streamlit", "urllib3")
+
+def parse_importtime(stderr):
+    """Return [(module, depth, cumulative microseconds)] from `python -X importtime` output, in print order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(parts[1])))
+    return rows
+
+def command_import_ms(rows):
+    """Cumulative import time of everything loaded after interpreter startup (site) finished."""
+    names = [name for name, _, _ in rows]
+    after_site = names.index("site") + 1 if "site" in names else 0
+    return sum(us for _, depth, us in rows[after_site:] if depth == 0) / 1000
+
+@pytest.fixture(scope="module")
+def env(tmp_path_factory):
+    """Environment whose PATH shadows pkill and docker with no-op scripts."""
+    bin_dir = tmp_path_factory.mktemp("bin")
+    for tool in ("pkill", "docker"):
+        path = bin_dir / tool
+        path.write_text("#!/bin/sh\nexit 0\n")
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return dict(os.environ, PATH=os.pathsep.join([str(bin_dir), os.environ.get("PATH", "")]),
+                PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])))
+
+@pytest.mark.parametrize("args", COMMANDS, ids=lambda args: args[0])
+def test_command_within_startup_budget(args, env):
+    best, heavy = None, set()
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-m", "facerunner", *args],
+                                capture_output=True, text=True, env=env, timeout=60)
+        assert result.returncode == 0, result.stderr[-2000:]
+        rows = parse_importtime(result.stderr)
+        assert any(name == "facerunner" for name, _, _ in rows)
+        heavy |= {name.split(".")[0] for name, _, _ in rows} & set(HEAVY_MODULES)
+        ms = command_import_ms(rows)
+        best = ms if best is None else min(best, ms)
+    assert not heavy, f"`facerunner {args[0]}` imported {sorted(heavy)}"
+    assert best <= BUDGET_MS, f"`facerunner {args[0]}` spent {best:.1f} ms importing (budget {BUDGET_MS:g} ms)"
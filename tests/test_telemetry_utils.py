@@ -0,0 +1,34 @@
+"""Range queries must read the finest tier whose retention covers the range, including at its boundary."""
+
+import time
+
+import pytest
+
+from facerunner import telemetry_utils
+from facerunner.telemetry_utils import choose_tier, parse_since, query
+
+@pytest.mark.parametrize("since, tier", [("30m", 0), ("1h", 0), ("61m", 1), ("24h", 1), ("7d", 1), ("8d", 2),
+                                         ("1y", 2)])
+def test_retention_boundaries(since, tier):
+    now = time.time()
+    assert choose_tier(parse_since(since, now), now, max_points=0, now=now)[0] == tier
+
+def test_small_clock_gap_keeps_the_tier():
+    start = parse_since("1h")
+    # Computed a moment before the query, as a caller without `now` does
+    assert choose_tier(start, start + 3600, max_points=0, now=start + 3600.5)[0] == 0
+
+def test_last_hour_returns_one_second_points(tmp_path):
+    path = str(tmp_path / "telemetry.db")
+    now = int(time.time())
+    conn = telemetry_utils.connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    for ts in range(now - 3599, now + 1):
+        telemetry_utils.write_samples(conn, {"host.cpu_percent": ts % 100}, ts)
+    conn.execute("COMMIT")
+    conn.close()
+    points = query(["host.cpu_percent"], parse_since("1h", now), now, max_points=0, path=path, now=now)
+    rows = points["host.cpu_percent"]
+    assert len(rows) == 3600
+    assert rows[-1][0] == now and rows[-1][1] == now % 100
+    assert telemetry_utils.TIERS[0][0] == rows[1][0] - rows[0][0] == 1
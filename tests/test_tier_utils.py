@@ -0,0 +1,102 @@
+"""Hot/cold rebalancing on a scratch store with a fast tier: promotion, demotion, busy models and cleanup."""
+
+import os
+import json
+import time
+import hashlib
+
+import pytest
+
+from facerunner import tier_utils
+
+BLOB_SIZE = 100
+
+def add_model(store, name, content):
+    """Install a one-blob model; return its digest."""
+    digest = "sha256:" + hashlib.sha256(content).hexdigest()
+    (store / "blobs" / digest.replace(":", "-")).write_bytes(content)
+    path = store / "manifests" / "registry.ollama.ai" / "library" / name / "latest"
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps({"layers": [{"digest": digest, "size": len(content)}]}))
+    return digest
+
+@pytest.fixture
+def tiers(tmp_path, monkeypatch):
+    """A store holding models a and b, and a fast tier with room for one of them."""
+    store, fast = tmp_path / "store", tmp_path / "fast"
+    (store / "blobs").mkdir(parents=True)
+    monkeypatch.setenv("OLLAMA_MODELS", str(store))
+    digests = {name: add_model(store, name, name.encode() * BLOB_SIZE) for name in ("a", "b")}
+    config = {"storage_tiers": [{"name": "fast", "path": str(fast), "kind": "nvme",
+                                 "capacity_gb": 1.5 * BLOB_SIZE / tier_utils.GB}]}
+    scores = {}
+    monkeypatch.setattr(tier_utils, "model_scores", lambda: dict(scores))
+    monkeypatch.setattr(tier_utils, "busy_models", lambda base_url=None: set())
+    return {"store": store, "fast": fast, "digests": digests, "config": config, "scores": scores}
+
+def entry(tiers, name):
+    return tiers["store"] / "blobs" / tiers["digests"][name].replace(":", "-")
+
+def on_fast_tier(tiers, name):
+    path = entry(tiers, name)
+    return path.is_symlink() and os.path.dirname(os.path.realpath(path)) == os.path.realpath(tiers["fast"] / "blobs")
+
+def test_promote_then_demote(tiers):
+    tiers["scores"].update({"a:latest": 2.0, "b:latest": 1.0})
+    result = tier_utils.rebalance(config=tiers["config"])
+    assert [(d, src, dst) for d, src, dst in result["moved"]] == [(tiers["digests"]["a"], "store", "fast")]
+    assert on_fast_tier(tiers, "a") and not entry(tiers, "b").is_symlink()
+    assert entry(tiers, "a").read_bytes() == b"a" * BLOB_SIZE
+
+    # b is now the hotter model: a goes back into the store as a real file, b takes its place
+    tiers["scores"].update({"a:latest": 1.0, "b:latest": 2.0})
+    result = tier_utils.rebalance(config=tiers["config"])
+    assert [(src, dst) for _, src, dst in result["moved"]] == [("fast", "store"), ("store", "fast")]
+    assert not entry(tiers, "a").is_symlink() and entry(tiers, "a").read_bytes() == b"a" * BLOB_SIZE
+    assert on_fast_tier(tiers, "b") and entry(tiers, "b").read_bytes() == b"b" * BLOB_SIZE
+    assert os.listdir(tiers["fast"] / "blobs") == [tiers["digests"]["b"].replace(":", "-")]
+    assert result["bytes"] == 2 * BLOB_SIZE
+
+def test_model_loaded_mid_rebalance_is_not_moved(tiers, monkeypatch):
+    tiers["config"]["storage_tiers"][0]["capacity_gb"] = None
+    tiers["scores"].update({"a:latest": 2.0, "b:latest": 1.0})
+    # b is loaded while a's blob is being copied
+    answers = iter([set(), set(), {"b:latest"}])
+    monkeypatch.setattr(tier_utils, "busy_models", lambda base_url=None: next(answers))
+    result = tier_utils.rebalance(config=tiers["config"])
+    assert [d for d, _, _ in result["moved"]] == [tiers["digests"]["a"]]
+    assert result["skipped"] == ["b:latest"]
+    assert on_fast_tier(tiers, "a") and not entry(tiers, "b").is_symlink()
+
+def test_orphans_and_stale_partial_copies_are_removed(tiers):
+    fast_blobs = tiers["fast"] / "blobs"
+    fast_blobs.mkdir(parents=True)
+    gone = fast_blobs / ("sha256-" + "0" * 64)
+    gone.write_bytes(b"removed by ollama rm")
+    stale = fast_blobs / ("sha256-" + "1" * 64 + ".facerunner-tmp")
+    stale.write_bytes(b"left by an interrupted rebalance")
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+    stale_link = tiers["store"] / "blobs" / ("sha256-" + "2" * 64 + ".facerunner-link")
+    os.symlink(str(gone), stale_link)
+    os.utime(stale_link, (old, old), follow_symlinks=False)
+    # Written after this rebalance took its lock, so still in use
+    current = fast_blobs / ("sha256-" + "3" * 64 + ".facerunner-tmp")
+    current.write_bytes(b"being written")
+    future = time.time() + 3600
+    os.utime(current, (future, future))
+
+    tier_utils.rebalance(config=tiers["config"])
+    assert not gone.exists() and not stale.exists() and not os.path.lexists(stale_link)
+    assert current.exists()
+    # Store blobs are never treated as orphans
+    assert entry(tiers, "a").exists() and entry(tiers, "b").exists()
+
+def test_concurrent_rebalance_is_refused(tiers):
+    with tier_utils.rebalance_lock():
+        with pytest.raises(RuntimeError, match="Another storage rebalance"):
+            tier_utils.rebalance(config=tiers["config"])
+        # A dry run only reads, so it does not need the lock
+        planned = tier_utils.rebalance(dry_run=True, config=tiers["config"])["moved"]
+        assert len(planned) == 1 and not any(entry(tiers, name).is_symlink() for name in ("a", "b"))
+    assert tier_utils.rebalance(config=tiers["config"])["moved"] == planned
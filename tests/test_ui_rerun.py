@@ -0,0 +1,73 @@
+"""
+Rerun latency of the web UI. Sorting the installed models happens inside a fragment, so the
+browser reruns only that fragment; it must cost less than a full-page rerun, which also runs the
+sidebar status probe, the system monitor, the jobs panel and the pull form.
+AppTest always reruns the whole script, so the fragment's rerun is timed as its own app.
+"""
+
+import os
+import time
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+RUNS = 5
+FAKE_OLLAMA = """#!/bin/sh
+if [ "$1" = list ]; then
+    echo "NAME                ID      SIZE      MODIFIED"
+    echo "mistral:7b          aaaa    4.1 GB    2 days ago"
+    echo "llama3.1:8b         bbbb    4.9 GB    3 days ago"
+    echo "qwen2.5:0.5b        cccc    0.4 GB    1 day ago"
+fi
+"""
+
+def installed_models_fragment(src_dir):
+    """The code a sort click reruns in the browser."""
+    import sys
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from ui_components import render_installed_models
+    render_installed_models()
+
+@pytest.fixture(autouse=True)
+def fake_ollama(tmp_path, monkeypatch):
+    path = tmp_path / "ollama"
+    path.write_text(FAKE_OLLAMA)
+    path.chmod(0o755)
+    monkeypatch.setenv("PATH", os.pathsep.join([str(tmp_path), os.environ.get("PATH", "")]))
+
+def model_rows(at):
+    return [md.value.strip("*") for md in at.markdown if md.value.startswith("**") and ":" in md.value]
+
+def fastest(action):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def test_sort_click_sorts_the_full_page():
+    at = AppTest.from_file(os.path.join(SRC_DIR, "main.py"), default_timeout=60).run()
+    assert not at.exception
+    assert model_rows(at) == ["llama3.1:8b", "mistral:7b", "qwen2.5:0.5b"]
+    at.button(key="sort_model").click().run()
+    assert not at.exception
+    assert model_rows(at) == ["qwen2.5:0.5b", "mistral:7b", "llama3.1:8b"]
+    at.button(key="sort_size").click().run()
+    assert model_rows(at) == ["qwen2.5:0.5b", "mistral:7b", "llama3.1:8b"]
+    at.button(key="sort_size").click().run()
+    assert model_rows(at) == ["llama3.1:8b", "mistral:7b", "qwen2.5:0.5b"]
+
+def test_sort_rerun_is_cheaper_than_full_page_rerun():
+    page = AppTest.from_file(os.path.join(SRC_DIR, "main.py"), default_timeout=60).run()
+    fragment = AppTest.from_function(installed_models_fragment, args=(SRC_DIR,), default_timeout=60).run()
+    assert not page.exception and not fragment.exception
+    full_rerun = fastest(page.run)
+    sort_rerun = fastest(lambda: fragment.button(key="sort_model").click().run())
+    assert not fragment.exception
+    print(f"full-page rerun {full_rerun * 1000:.1f} ms, sort rerun {sort_rerun * 1000:.1f} ms")
+    assert sort_rerun < full_rerun
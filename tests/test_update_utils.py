@@ -0,0 +1,142 @@
+"""update-models against a local stand-in registry: conditional HEADs, changed-tag sizing and errors."""
+
+import json
+import hashlib
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from facerunner import update_utils
+
+def digest_of(data):
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+def layer(name, size):
+    return {"digest": digest_of(name.encode()), "size": size}
+
+def manifest_bytes(layers, config):
+    return json.dumps({"schemaVersion": 2, "layers": layers, "config": config}).encode()
+
+SHARED = layer("shared", 100)
+# Installed manifests, and what the registry serves for each repository
+LOCAL = {
+    "same": manifest_bytes([layer("same", 1000)], layer("same-config", 20)),
+    "new": manifest_bytes([SHARED], layer("old-config", 5)),
+    "nodigest": manifest_bytes([layer("nodigest", 50)], layer("nodigest-config", 0)),
+    "gone": manifest_bytes([layer("gone", 70)], layer("gone-config", 0)),
+}
+REMOTE = {
+    "same": LOCAL["same"],
+    "new": manifest_bytes([SHARED, layer("added", 300)], layer("new-config", 10)),
+    "nodigest": LOCAL["nodigest"],
+}
+
+class Registry(BaseHTTPRequestHandler):
+    """Serves /v2/library/<repo>/manifests/latest like registry.ollama.ai (nodigest omits the digest header)."""
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.serve(body=False)
+
+    def do_GET(self):
+        self.serve(body=True)
+
+    def serve(self, body):
+        self.requests.append((self.command, self.path))
+        parts = self.path.strip("/").split("/")
+        data = REMOTE.get(parts[2]) if len(parts) == 5 and parts[:2] == ["v2", "library"] else None
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        digest = digest_of(data)
+        repo = parts[2]
+        if repo != "nodigest" and self.headers.get("If-None-Match") == f'"{digest}"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.distribution.manifest.v2+json")
+        if repo != "nodigest":
+            self.send_header("Docker-Content-Digest", digest)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    models_dir = tmp_path / "models"
+    monkeypatch.setenv("OLLAMA_MODELS", str(models_dir))
+    for repo, data in LOCAL.items():
+        path = models_dir / "manifests" / "registry.ollama.ai" / "library" / repo / "latest"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(data)
+    # The shared layer is already on disk; the new tag's other blobs are not
+    blobs = models_dir / "blobs"
+    blobs.mkdir()
+    (blobs / SHARED["digest"].replace(":", "-")).write_bytes(b"x" * SHARED["size"])
+    Registry.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Registry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_check_updates_classifies_tags(registry):
+    results = {r["model"]: r for r in update_utils.check_updates(registry_url=registry, workers=4)}
+    assert sorted(results) == ["gone:latest", "new:latest", "nodigest:latest", "same:latest"]
+    assert {m: r["status"] for m, r in results.items()} == {
+        "gone:latest": "error", "new:latest": "changed", "nodigest:latest": "unchanged", "same:latest": "unchanged"}
+
+    same = results["same:latest"]
+    assert same["local_digest"] == same["remote_digest"] == digest_of(LOCAL["same"])
+    assert same["size"] == 1020 and same["download"] == 0
+
+    new = results["new:latest"]
+    assert new["remote_digest"] == digest_of(REMOTE["new"]) != new["local_digest"]
+    # 100 shared + 300 added + 10 config, of which only the shared layer is already on disk
+    assert new["size"] == 410 and new["download"] == 310
+
+    assert results["gone:latest"]["error"] == "HTTP 404"
+    assert results["nodigest:latest"]["remote_digest"] == digest_of(LOCAL["nodigest"])
+
+    # Unchanged tags: 1020 + 50; changed tag: the 100 bytes already on disk; errors save nothing
+    assert update_utils.bytes_saved(results.values()) == 1170
+
+def test_unchanged_tag_costs_one_head(registry):
+    results = update_utils.check_updates(models=["same"], registry_url=registry)
+    assert [r["status"] for r in results] == ["unchanged"]
+    assert Registry.requests == [("HEAD", "/v2/library/same/manifests/latest")]
+
+def test_unreachable_registry_is_an_error(registry):
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    results = update_utils.check_updates(models=["same", "new"], registry_url=closed, timeout=2)
+    assert [r["status"] for r in results] == ["error", "error"]
+    assert all(r["error"] for r in results)
+    assert update_utils.bytes_saved(results) == 0
+
+def test_changed_tags_pull_within_the_global_cap(simulator, monkeypatch):
+    # Two 8 MB pulls share an 8 MB/s global cap (4 MB burst), so together they need well over a second
+    from facerunner import shaping_utils
+    monkeypatch.setattr(shaping_utils, "BURST_SECONDS", 0.5)
+    monkeypatch.setattr(shaping_utils, "MIN_BURST_BYTES", 1024 ** 2)
+    base_url, _ = simulator({"pull_size_gb": 8 / 1024, "pull_bytes_per_second": 80 * 1024 ** 2})
+    results = [{"model": "a", "status": "changed"}, {"model": "b", "status": "changed"},
+               {"model": "c", "status": "unchanged"}]
+    start = time.monotonic()
+    outcome = update_utils.pull_changed(results, workers=2, base_url=base_url,
+                                        config={"pull_bandwidth_limit": "8M"})
+    assert outcome == {"a": None, "b": None}
+    assert time.monotonic() - start > 1.2
+    models = [m["name"] for m in requests.get(f"{base_url}/api/tags", timeout=5).json()["models"]]
+    assert {"a:latest", "b:latest"} <= set(models) and "c:latest" not in models